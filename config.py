@@ -25,11 +25,46 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+    JWT_CACHE_ENABLED: bool = os.getenv("JWT_CACHE_ENABLED", "False").lower() == "true"
+    JWT_CACHE_MAX_SIZE: int = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+    JWT_EMBED_PERMISSIONS: bool = os.getenv("JWT_EMBED_PERMISSIONS", "False").lower() == "true"
     
     # SendGrid
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
     SENDGRID_FROM_EMAIL: str = os.getenv("SENDGRID_FROM_EMAIL", "noreply@example.com")
     SENDGRID_FROM_NAME: str = os.getenv("SENDGRID_FROM_NAME", "Sistema Médico")
+    SENDGRID_API_HOST: str = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+    SENDGRID_MAX_PERSONALIZACIONES: int = int(os.getenv("SENDGRID_MAX_PERSONALIZACIONES", "1000"))
+
+    # Despachador de notificaciones (outbox)
+    NOTIFICATION_WORKERS: int = int(os.getenv("NOTIFICATION_WORKERS", "2"))
+    NOTIFICATION_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_BATCH_SIZE", "1000"))
+    NOTIFICATION_POLL_INTERVAL_SECONDS: float = float(os.getenv("NOTIFICATION_POLL_INTERVAL_SECONDS", "1.0"))
+    NOTIFICATION_RETRY_ENABLED: bool = os.getenv("NOTIFICATION_RETRY_ENABLED", "True").lower() == "true"
+    NOTIFICATION_RETRY_BASE_SECONDS: float = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+    NOTIFICATION_RETRY_MAX_SECONDS: float = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+    NOTIFICATION_RETRY_JITTER: float = float(os.getenv("NOTIFICATION_RETRY_JITTER", "0.5"))
+    NOTIFICATION_RETRY_POLL_SECONDS: float = float(os.getenv("NOTIFICATION_RETRY_POLL_SECONDS", "30"))
+    REMINDER_SCHEDULER_ENABLED: bool = os.getenv("REMINDER_SCHEDULER_ENABLED", "True").lower() == "true"
+    REMINDER_LEAD_HOURS: float = float(os.getenv("REMINDER_LEAD_HOURS", "24"))
+    REMINDER_WINDOW_SECONDS: float = float(os.getenv("REMINDER_WINDOW_SECONDS", "300"))
+
+    # Canales SMS / WhatsApp / Push: transporte y límites por canal
+    NOTIFICATION_CHANNEL_TRANSPORT: str = os.getenv("NOTIFICATION_CHANNEL_TRANSPORT", "file")
+    NOTIFICATION_CHANNEL_DIR: str = os.getenv("NOTIFICATION_CHANNEL_DIR", "var/notificaciones")
+    NOTIFICATION_CHANNEL_HTTP_URL: str = os.getenv("NOTIFICATION_CHANNEL_HTTP_URL", "http://127.0.0.1:8026")
+    NOTIFICATION_SMS_CONCURRENCY: int = int(os.getenv("NOTIFICATION_SMS_CONCURRENCY", "4"))
+    NOTIFICATION_SMS_RATE_PER_SECOND: float = float(os.getenv("NOTIFICATION_SMS_RATE_PER_SECOND", "50"))
+    NOTIFICATION_SMS_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_SMS_BATCH_SIZE", "100"))
+    NOTIFICATION_WHATSAPP_CONCURRENCY: int = int(os.getenv("NOTIFICATION_WHATSAPP_CONCURRENCY", "4"))
+    NOTIFICATION_WHATSAPP_RATE_PER_SECOND: float = float(os.getenv("NOTIFICATION_WHATSAPP_RATE_PER_SECOND", "20"))
+    NOTIFICATION_WHATSAPP_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_WHATSAPP_BATCH_SIZE", "50"))
+    NOTIFICATION_PUSH_CONCURRENCY: int = int(os.getenv("NOTIFICATION_PUSH_CONCURRENCY", "8"))
+    NOTIFICATION_PUSH_RATE_PER_SECOND: float = float(os.getenv("NOTIFICATION_PUSH_RATE_PER_SECOND", "500"))
+    NOTIFICATION_PUSH_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_PUSH_BATCH_SIZE", "500"))
     
     # API
     API_V1_PREFIX: str = os.getenv("API_V1_PREFIX", "/api/v1")
@@ -45,8 +80,56 @@ class Settings(BaseSettings):
         "http://127.0.0.1:8000"
     ]
     
+    # Caché de permisos (RBAC)
+    PERMISSION_CACHE_TTL_SECONDS: float = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "60"))
+    PERMISSION_CACHE_MAX_SIZE: int = int(os.getenv("PERMISSION_CACHE_MAX_SIZE", "10000"))
+    PERMISSION_CATALOG_TTL_SECONDS: float = float(os.getenv("PERMISSION_CATALOG_TTL_SECONDS", "300"))
+    
+    # Índice de disponibilidad de agenda
+    AVAILABILITY_INDEX_TTL_SECONDS: float = float(os.getenv("AVAILABILITY_INDEX_TTL_SECONDS", "60"))
+    AVAILABILITY_INDEX_HORIZON_DAYS: int = int(os.getenv("AVAILABILITY_INDEX_HORIZON_DAYS", "60"))
+    
+    # Agenda recurrente
+    AGENDA_BULK_CHUNK_SIZE: int = int(os.getenv("AGENDA_BULK_CHUNK_SIZE", "1000"))
+    AGENDA_RECURRENCIA_MAX_BLOQUES: int = int(os.getenv("AGENDA_RECURRENCIA_MAX_BLOQUES", "50000"))
+    
+    # Paginación (tope del conteo aproximado con filtros)
+    PAGINATION_COUNT_LIMIT: int = int(os.getenv("PAGINATION_COUNT_LIMIT", "10000"))
+    
+    # Sesiones (refresh tokens)
+    SESSION_BLOOM_CAPACITY: int = int(os.getenv("SESSION_BLOOM_CAPACITY", "100000"))
+    SESSION_BLOOM_ERROR_RATE: float = float(os.getenv("SESSION_BLOOM_ERROR_RATE", "0.001"))
+    SESSION_SYNC_INTERVAL_SECONDS: float = float(os.getenv("SESSION_SYNC_INTERVAL_SECONDS", "5"))
+    SESSION_PURGE_INTERVAL_SECONDS: float = float(os.getenv("SESSION_PURGE_INTERVAL_SECONDS", "3600"))
+    
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | sqlite
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "var/rate_limit.sqlite3")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    
+    # Perfilado SQL por petición (sentencias, tiempo en BD, N+1)
+    SQL_PROFILING_ENABLED: bool = os.getenv("SQL_PROFILING_ENABLED", "False").lower() == "true"
+    SQL_PROFILING_TOP_SLOW: int = int(os.getenv("SQL_PROFILING_TOP_SLOW", "5"))
+    SQL_PROFILING_N1_THRESHOLD: int = int(os.getenv("SQL_PROFILING_N1_THRESHOLD", "5"))
+    
+    # Sondas de salud (/health/live, /health/ready)
+    HEALTH_CACHE_SECONDS: float = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+    HEALTH_DB_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "1"))
+    HEALTH_MAX_DB_LATENCY_MS: float = float(os.getenv("HEALTH_MAX_DB_LATENCY_MS", "500"))
+    HEALTH_MAX_POOL_SATURATION: float = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.9"))
+    
+    # Métricas (/metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_NOTIFICATION_BACKLOG_TTL_SECONDS: float = float(os.getenv("METRICS_NOTIFICATION_BACKLOG_TTL_SECONDS", "15"))
+    
+    # Auditoría
+    AUDIT_QUEUE_MAX_SIZE: int = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+    AUDIT_SPOOL_PATH: str = os.getenv("AUDIT_SPOOL_PATH", "var/audit_spool.bin")
+    AUDIT_SPOOL_REPLAY_BATCH_SIZE: int = int(os.getenv("AUDIT_SPOOL_REPLAY_BATCH_SIZE", "1000"))
+    AUDIT_DB_RETRY_SECONDS: float = float(os.getenv("AUDIT_DB_RETRY_SECONDS", "5.0"))
     
     # Logs
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
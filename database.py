@@ -7,6 +7,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 from config import settings
+from services.sql_profiler import sql_profiler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,9 @@ engine = create_engine(
     echo=settings.DEBUG,  # Muestra SQL en modo debug
 )
 
+# Perfilado SQL por petición (SQL_PROFILING_ENABLED)
+sql_profiler.instalar(engine)
+
 # Session factory
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -8,10 +8,23 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models.auditoria import Usuario
 from services.auth_service import AuthService
+from services.permission_cache import permission_cache
+from services.permission_catalog import permission_catalog
+from services.session_store import session_store
 
 security = HTTPBearer()
 
 
+def _verificar_sesion(payload: dict, db: Session) -> None:
+    """Rechaza tokens cuya sesión (sid) fue revocada; sin BD si no está en el filtro"""
+    sid = payload.get("sid")
+    if sid and session_store.esta_revocada(db, sid):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión revocada"
+        )
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -19,6 +32,7 @@ def get_current_user(
     """
     Obtiene el usuario actual desde el token JWT
     Retorna dict con información del usuario
+    Roles y permisos salen de la caché de permisos (sin consultas en un acierto)
     """
     try:
         token = credentials.credentials
@@ -33,19 +47,26 @@ def get_current_user(
                 detail="Token inválido"
             )
         
-        usuario = db.query(Usuario).filter(Usuario.username == username).first()
+        _verificar_sesion(payload, db)
+        
+        if not usuario_id:
+            usuario = db.query(Usuario).filter(Usuario.username == username).first()
+            usuario_id = usuario.id if usuario else None
         
-        if not usuario or not usuario.estado:
+        entrada = permission_cache.obtener(db, usuario_id) if usuario_id else None
+        
+        if not entrada or not entrada.estado or entrada.username != username:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Usuario no encontrado o inactivo"
             )
         
         return {
-            "usuario_id": usuario.id,
-            "username": usuario.username,
-            "email": usuario.email,
-            "roles": [r.nombre for r in usuario.roles]
+            "usuario_id": entrada.usuario_id,
+            "username": entrada.username,
+            "email": entrada.email,
+            "roles": list(entrada.roles),
+            "permisos": entrada.permisos
         }
     
     except HTTPException:
@@ -63,10 +84,20 @@ def check_permission(permission: str):
     Uso: @router.get("/", dependencies=[Depends(check_permission("personas.read"))])
     """
     def _check(
-        current_user: dict = Depends(get_current_user),
+        credentials: HTTPAuthorizationCredentials = Depends(security),
         db: Session = Depends(get_db)
     ):
-        permisos = AuthService.get_user_permissions(db, current_user["usuario_id"])
+        # Camino rápido: permisos embebidos en el token (sin consultas)
+        payload = AuthService.decode_token(credentials.credentials)
+        permisos = permission_catalog.permisos_desde_claims(payload)
+        
+        if permisos is not None:
+            _verificar_sesion(payload, db)
+        else:
+            # Sin claim o catálogo con otra versión: resolver en la BD
+            permisos = get_current_user(credentials, db)["permisos"]
+            if "perm" in payload:
+                permission_catalog.asegurar(db)
         
         if permission not in permisos and "admin.all" not in permisos:
             raise HTTPException(
@@ -4,19 +4,35 @@ Aplicación FastAPI Completa con TODOS los módulos (2.1 a 2.9)
 
 Participante: Mercedes Cordero (30447476)
 """
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 import logging
 
 # Configuración
 from config import settings
-from database import init_db, engine
+from database import init_db, engine, SessionLocal
 
 # Middleware
-from middleware.audit import AuditMiddleware
+from middleware.audit import AuditASGIMiddleware
+from middleware.rate_limit import RateLimitMiddleware
+from middleware.sql_profiler import SQLProfilerMiddleware
+from services.audit_writer import audit_writer
+from services.permission_cache import permission_cache
+from services.password_pool import password_pool
+from services.rate_limiter import rate_limit_backend
+from services.session_store import session_store
+from services.auth_service import token_cache
+from services.sql_profiler import sql_profiler
+from services.metrics import metrics
+from services.health import health_checker
+from services.notification_worker import notification_worker, channel_workers
+from services.notification_channels import channel_dispatcher
+from services.reminder_scheduler import reminder_scheduler
+from services.notification_retry import retry_schedulers
+from dependencies import check_permission
 
 # ==================== IMPORTAR TODOS LOS ROUTERS ====================
 
@@ -26,7 +42,7 @@ from routers.profesionales import router as router_profesionales
 from routers.unidades import router_unidades  # Ver archivo all_routers_complete.py
 
 # Módulo 2.2: Agenda y Citas
-#from routers.agenda import router_agenda
+from routers.agenda import router as router_agenda
 from routers.citas import router as router_citas
 
 # Módulo 2.3: Registro Clínico
@@ -82,10 +98,31 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Error al inicializar BD: {e}")
         raise
     
+    audit_writer.start()
+    password_pool.start()
+    session_store.start()
+    notification_worker.start()
+    channel_dispatcher.start()
+    for worker in channel_workers.values():
+        worker.start()
+    reminder_scheduler.start()
+    for scheduler in retry_schedulers.values():
+        scheduler.start()
+    
     yield
     
     # Shutdown
     logger.info("🛑 Cerrando aplicación...")
+    for scheduler in retry_schedulers.values():
+        await scheduler.stop()
+    await reminder_scheduler.stop()
+    await notification_worker.stop()
+    for worker in channel_workers.values():
+        await worker.stop()
+    await channel_dispatcher.stop()
+    await session_store.stop()
+    await audit_writer.stop()
+    password_pool.shutdown()
     engine.dispose()
 
 
@@ -179,6 +216,13 @@ app = FastAPI(
 )
 
 # ==================== MIDDLEWARE ====================
+# El último agregado es el más externo: Auditoría -> CORS -> Rate limiting -> Perfilado SQL
+
+# Perfilado SQL por petición (SQL_PROFILING_ENABLED)
+app.add_middleware(SQLProfilerMiddleware)
+
+# Rate limiting (token bucket por usuario o IP)
+app.add_middleware(RateLimitMiddleware)
 
 # CORS
 app.add_middleware(
@@ -189,8 +233,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Auditoría
-app.add_middleware(AuditMiddleware)
+# Auditoría (ASGI puro, sin BaseHTTPMiddleware)
+app.add_middleware(AuditASGIMiddleware)
 
 
 # ==================== MANEJADORES DE ERRORES ====================
@@ -235,12 +279,26 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ==================== HEALTH CHECK ====================
 
 @app.get("/health", tags=["Sistema"])
-def health_check():
-    """Verifica el estado del servidor"""
+async def health_check():
+    """Verifica el estado del servidor (la BD con la sonda de readiness cacheada)"""
     return {
         "status": "healthy",
         "version": settings.VERSION,
-        "database": "connected",
+        "database": await health_checker.listo(),
+        "audit_queue": audit_writer.stats(),
+        "permission_cache": permission_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "sessions": session_store.stats(),
+        "jwt_cache": token_cache.stats() if token_cache is not None else None,
+        "rate_limit": rate_limit_backend.stats() if rate_limit_backend is not None else None,
+        "sql_profiler": sql_profiler.stats(),
+        "notification_worker": notification_worker.stats(),
+        "notification_channels": {
+            tipo.value: {**worker.stats(), "pool": channel_dispatcher.pools[tipo].stats()}
+            for tipo, worker in channel_workers.items()
+        },
+        "reminders": reminder_scheduler.stats(),
+        "notification_retries": {tipo.value: s.stats() for tipo, s in retry_schedulers.items()},
         "modules": {
             "identidades": "✅",
             "agenda_citas": "✅",
@@ -255,6 +313,44 @@ def health_check():
     }
 
 
+@app.get("/health/live", tags=["Sistema"])
+async def health_live():
+    """Liveness: el worker responde (no consulta la BD)"""
+    return health_checker.vivo()
+
+
+@app.get("/health/ready", tags=["Sistema"])
+async def health_ready():
+    """Readiness: SELECT 1 cronometrado y saturación del pool; 503 si supera umbrales"""
+    resultado = await health_checker.listo()
+    codigo = status.HTTP_200_OK if resultado["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=codigo, content=resultado)
+
+
+@app.get("/metrics", tags=["Sistema"], response_class=PlainTextResponse, include_in_schema=settings.METRICS_ENABLED)
+def metricas():
+    """Métricas en formato Prometheus: latencia por ruta, pool de BD, colas"""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("", status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(
+        metrics.exponer(engine, audit_writer, SessionLocal),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/debug/sql", tags=["Sistema"], dependencies=[Depends(check_permission("admin.all"))])
+def reporte_sql():
+    """Reporte agregado del perfilado SQL por ruta (sentencias, tiempo, N+1); solo administradores"""
+    return sql_profiler.reporte()
+
+
+@app.delete("/debug/sql", tags=["Sistema"], dependencies=[Depends(check_permission("admin.all"))])
+def reiniciar_reporte_sql():
+    """Descarta los agregados del perfilado SQL; solo administradores"""
+    sql_profiler.reiniciar()
+    return {"success": True, "message": "Perfilado SQL reiniciado"}
+
+
 @app.get("/", tags=["Sistema"])
 def root():
     """Endpoint raíz con información del proyecto"""
@@ -293,7 +389,7 @@ app.include_router(router_profesionales, prefix=prefix)
 app.include_router(router_unidades, prefix=prefix)
 
 # Módulo 2.2: Agenda y Citas
-#app.include_router(router_agenda, prefix=prefix)
+app.include_router(router_agenda, prefix=prefix)
 app.include_router(router_citas, prefix=prefix)
 
 # Módulo 2.3: Registro Clínico
@@ -1,17 +1,73 @@
 """
 Middleware de Auditoría
 Registra todas las peticiones en BitacoraAcceso
+- AuditMiddleware: implementación sobre BaseHTTPMiddleware (compatibilidad)
+- AuditASGIMiddleware: implementación ASGI pura (la que usa main.py)
 """
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models.auditoria import BitacoraAcceso, TipoAccionEnum
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from models.auditoria import TipoAccionEnum
+from services.audit_writer import audit_writer
+from services.metrics import metrics, plantilla_ruta
+from datetime import datetime
 import time
 import json
 
 
+# Sondas y scraping: se miden pero no se registran en la bitácora
+# (la ruta exacta y sus subrutas: /health y /health/ready, no /healthz)
+RUTAS_NO_AUDITADAS = ("/health", "/metrics")
+_PREFIJOS_NO_AUDITADOS = tuple(ruta + "/" for ruta in RUTAS_NO_AUDITADAS)
+
+# Acción auditada según método HTTP
+ACCION_POR_METODO = {
+    "GET": TipoAccionEnum.READ,
+    "POST": TipoAccionEnum.CREATE,
+    "PUT": TipoAccionEnum.UPDATE,
+    "PATCH": TipoAccionEnum.UPDATE,
+    "DELETE": TipoAccionEnum.DELETE
+}
+
+
+def clasificar_resultado(status_code: int) -> str:
+    """Determina el resultado a partir del código HTTP"""
+    if status_code < 300:
+        return "success"
+    elif status_code < 500:
+        return "error"
+    return "server_error"
+
+
+def ruta_auditada(path: str) -> bool:
+    """False para las rutas de RUTAS_NO_AUDITADAS y sus subrutas"""
+    return path not in RUTAS_NO_AUDITADAS and not path.startswith(_PREFIJOS_NO_AUDITADOS)
+
+
+def registrar_auditoria(
+    usuario_id,
+    recurso,
+    metodo_http,
+    ip,
+    user_agent,
+    codigo_http,
+    tiempo_procesamiento
+):
+    """Encola el registro en el escritor de auditoría por lotes"""
+    audit_writer.enqueue({
+        "usuario_id": usuario_id,
+        "recurso": recurso,
+        "accion": ACCION_POR_METODO.get(metodo_http, TipoAccionEnum.READ),
+        "metodo_http": metodo_http,
+        "ip": ip,
+        "user_agent": user_agent[:500],  # Limitar longitud
+        "resultado": clasificar_resultado(codigo_http),
+        "codigo_http": codigo_http,
+        "created_at": datetime.utcnow()
+    })
+
+
 class AuditMiddleware(BaseHTTPMiddleware):
     """
     Middleware que registra todas las peticiones HTTP
@@ -33,38 +89,20 @@ class AuditMiddleware(BaseHTTPMiddleware):
         
         # Ejecutar petición
         response = await call_next(request)
+        if not ruta_auditada(path):
+            return response
         
         # Calcular tiempo de procesamiento
         process_time = time.time() - start_time
         
-        # Determinar acción según método HTTP
-        accion_map = {
-            "GET": TipoAccionEnum.READ,
-            "POST": TipoAccionEnum.CREATE,
-            "PUT": TipoAccionEnum.UPDATE,
-            "PATCH": TipoAccionEnum.UPDATE,
-            "DELETE": TipoAccionEnum.DELETE
-        }
-        accion = accion_map.get(metodo, TipoAccionEnum.READ)
-        
-        # Determinar resultado
-        if response.status_code < 300:
-            resultado = "success"
-        elif response.status_code < 500:
-            resultado = "error"
-        else:
-            resultado = "server_error"
-        
-        # Registrar en base de datos (async para no bloquear)
+        # Encolar para escritura por lotes (no bloquea el event loop)
         try:
-            self._registrar_auditoria(
+            registrar_auditoria(
                 usuario_id=usuario_id,
                 recurso=path,
-                accion=accion,
                 metodo_http=metodo,
                 ip=ip,
                 user_agent=user_agent,
-                resultado=resultado,
                 codigo_http=response.status_code,
                 tiempo_procesamiento=process_time
             )
@@ -73,39 +111,63 @@ class AuditMiddleware(BaseHTTPMiddleware):
             print(f"Error en auditoría: {e}")
         
         return response
+
+
+class AuditASGIMiddleware:
+    """
+    Middleware de auditoría ASGI puro
+    Captura código HTTP, tiempo (también para /metrics) y request.state.usuario_id directamente
+    del mensaje http.response.start, sin envolver la respuesta en una
+    tarea y un stream adicionales (compatible con StreamingResponse)
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
     
-    def _registrar_auditoria(
-        self,
-        usuario_id,
-        recurso,
-        accion,
-        metodo_http,
-        ip,
-        user_agent,
-        resultado,
-        codigo_http,
-        tiempo_procesamiento
-    ):
-        """Registra en base de datos de forma síncrona"""
-        db = SessionLocal()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.time()
+        status_code = 500
+        usuario_id = None
+        
+        async def send_wrapper(message: Message):
+            nonlocal status_code, usuario_id
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # request.state vive en scope["state"]
+                usuario_id = scope.get("state", {}).get("usuario_id")
+            await send(message)
+        
         try:
-            bitacora = BitacoraAcceso(
-                usuario_id=usuario_id,
-                recurso=recurso,
-                accion=accion,
-                metodo_http=metodo_http,
-                ip=ip,
-                user_agent=user_agent[:500],  # Limitar longitud
-                resultado=resultado,
-                codigo_http=codigo_http
-            )
-            db.add(bitacora)
-            db.commit()
-        except Exception as e:
-            db.rollback()
-            print(f"Error guardando auditoría: {e}")
+            await self.app(scope, receive, send_wrapper)
         finally:
-            db.close()
+            process_time = time.time() - start_time
+            metrics.observar(scope["method"], plantilla_ruta(scope), status_code, process_time)
+            if not ruta_auditada(scope["path"]):
+                return
+            client = scope.get("client")
+            user_agent = "unknown"
+            for name, value in scope["headers"]:
+                if name == b"user-agent":
+                    user_agent = value.decode("latin-1")
+                    break
+            
+            try:
+                registrar_auditoria(
+                    usuario_id=usuario_id,
+                    recurso=scope["path"],
+                    metodo_http=scope["method"],
+                    ip=client[0] if client else "unknown",
+                    user_agent=user_agent,
+                    codigo_http=status_code,
+                    tiempo_procesamiento=process_time
+                )
+            except Exception as e:
+                # No fallar la petición si falla el logging
+                print(f"Error en auditoría: {e}")
 
 
 class SensitiveDataFilter:
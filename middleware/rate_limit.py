@@ -0,0 +1,96 @@
+"""
+Middleware de Rate Limiting
+Aplica RATE_LIMIT_PER_MINUTE por usuario (usuario_id del JWT) o, sin
+token válido, por IP del cliente. Responde 429 con Retry-After.
+"""
+import asyncio
+import json
+
+from jose import JWTError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from services.auth_service import token_cache
+from services.rate_limiter import rate_limit_backend, segundos_retry_after
+from utils.token_cache import decodificar_jwt
+
+
+# Rutas que no consumen tokens (probes y documentación)
+RUTAS_EXENTAS = ("/health", "/metrics", "/api-docs", "/redoc", "/openapi.json")
+
+
+def clave_rate_limit(scope: Scope) -> str:
+    """Clave del bucket: usuario del JWT o IP del cliente"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            esquema, _, token = value.decode("latin-1").partition(" ")
+            if esquema.lower() == "bearer" and token:
+                try:
+                    payload = decodificar_jwt(token, settings.SECRET_KEY, [settings.ALGORITHM], token_cache)
+                    usuario = payload.get("usuario_id") or payload.get("sub")
+                    if usuario is not None:
+                        return f"u:{usuario}"
+                except JWTError:
+                    pass
+            break
+
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de rate limiting por token bucket
+    El backend se comparte entre workers si es SQLite
+    """
+
+    def __init__(self, app: ASGIApp, backend=None, limite: int = settings.RATE_LIMIT_PER_MINUTE):
+        self.app = app
+        self.backend = backend if backend is not None else rate_limit_backend
+        self.limite = str(limite).encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or self.backend is None
+            or scope["path"].startswith(RUTAS_EXENTAS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        clave = clave_rate_limit(scope)
+        if self.backend.bloqueante:
+            resultado = await asyncio.to_thread(self.backend.consumir, clave)
+        else:
+            resultado = self.backend.consumir(clave)
+
+        restantes = str(resultado.restantes).encode("latin-1")
+
+        if not resultado.permitido:
+            retry_after = segundos_retry_after(resultado)
+            body = json.dumps({
+                "detail": "Demasiadas solicitudes, intente nuevamente más tarde",
+                "retry_after": retry_after
+            }).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", str(retry_after).encode("latin-1")),
+                    (b"x-ratelimit-limit", self.limite),
+                    (b"x-ratelimit-remaining", restantes),
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-ratelimit-limit", self.limite),
+                    (b"x-ratelimit-remaining", restantes),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,43 @@
+"""
+Middleware de perfilado SQL
+Abre un perfil por petición (services.sql_profiler) y al terminar lo suma
+al reporte de la ruta. En modo debug agrega a la respuesta:
+X-DB-Statements, X-DB-Time-Ms y X-DB-N1 (formas repetidas sospechosas de N+1).
+"""
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from services.metrics import plantilla_ruta
+from services.sql_profiler import SQLProfiler, sql_profiler
+
+
+class SQLProfilerMiddleware:
+    """Middleware ASGI de perfilado SQL por petición"""
+
+    def __init__(self, app: ASGIApp, profiler: SQLProfiler = None, exponer_headers: bool = settings.DEBUG):
+        self.app = app
+        self.profiler = profiler if profiler is not None else sql_profiler
+        self.exponer_headers = exponer_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        perfil, token = self.profiler.iniciar()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and self.exponer_headers:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-statements", str(perfil.sentencias).encode("latin-1")))
+                headers.append((b"x-db-time-ms", f"{perfil.segundos * 1000:.2f}".encode("latin-1")))
+                headers.append((
+                    b"x-db-n1",
+                    str(len(perfil.repetidas(self.profiler.umbral_n_mas_1))).encode("latin-1")
+                ))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.finalizar(f"{scope['method']} {plantilla_ruta(scope)}", perfil, token)
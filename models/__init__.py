@@ -93,6 +93,7 @@ from models.auditoria import (
     Rol,
     Permiso,
     BitacoraAcceso,
+    SesionUsuario,
     TipoAccionEnum,
     usuario_rol,
     rol_permiso
@@ -134,6 +135,6 @@ __all__ = [
     "TipoNotificacionEnum", "EstadoNotificacionEnum", "PlantillaNotificacionEnum",
     
     # Auditoría
-    "Usuario", "Rol", "Permiso", "BitacoraAcceso",
+    "Usuario", "Rol", "Permiso", "BitacoraAcceso", "SesionUsuario",
     "TipoAccionEnum", "usuario_rol", "rol_permiso"
 ]
\ No newline at end of file
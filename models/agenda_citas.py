@@ -4,7 +4,7 @@ Módulo 2.2: Disponibilidad y citas
 - Cita: gestión completa de citas médicas
 - HistorialCita: trazabilidad de cambios
 """
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 import enum
@@ -74,6 +74,10 @@ class Cita(BaseModel):
     REGLA DE NEGOCIO: Debe pertenecer a bloque abierto y no exceder capacidad
     """
     __tablename__ = "citas"
+    __table_args__ = (
+        # Ventanas del programador de recordatorios: CONFIRMADA con inicio en rango
+        Index("ix_citas_estado_inicio", "estado", "inicio"),
+    )
     
     # Relaciones
     persona_id = Column(Integer, ForeignKey("personas_atendidas.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -4,8 +4,9 @@ Módulo 2.9: Auditoría y trazabilidad
 - Usuario: usuarios del sistema
 - Rol: roles de acceso
 - Permiso: permisos granulares
+- SesionUsuario: sesiones de refresh token (una por login)
 """
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum, Text, Table, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum, Text, Table, Boolean, Index
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 import enum
@@ -67,6 +68,7 @@ class Usuario(BaseModel):
     # Relaciones
     roles = relationship("Rol", secondary=usuario_rol, back_populates="usuarios")
     bitacora_accesos = relationship("BitacoraAcceso", back_populates="usuario", cascade="all, delete-orphan")
+    sesiones = relationship("SesionUsuario", back_populates="usuario", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Usuario(id={self.id}, username={self.username})>"
@@ -120,6 +122,10 @@ class BitacoraAcceso(BaseModel):
     REGLA DE NEGOCIO: Registrar lectura/escritura de registros clínicos
     """
     __tablename__ = "bitacora_accesos"
+    __table_args__ = (
+        # Paginación por cursor (created_at, id); InnoDB agrega el PK al índice
+        Index("ix_bitacora_accesos_created_at", "created_at"),
+    )
     
     # Relación
     usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -144,4 +150,28 @@ class BitacoraAcceso(BaseModel):
     usuario = relationship("Usuario", back_populates="bitacora_accesos")
     
     def __repr__(self):
-        return f"<BitacoraAcceso(id={self.id}, usuario_id={self.usuario_id}, recurso={self.recurso})>"
\ No newline at end of file
+        return f"<BitacoraAcceso(id={self.id}, usuario_id={self.usuario_id}, recurso={self.recurso})>"
+
+
+class SesionUsuario(BaseModel):
+    """
+    Modelo 2.9.5: Sesiones de Usuario
+    Un registro por refresh token emitido, indexado por jti.
+    Permite varias sesiones concurrentes por usuario y revocación individual.
+    """
+    __tablename__ = "sesiones_usuario"
+    
+    # Identificador del refresh token (claim jti)
+    jti = Column(String(32), unique=True, nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Vigencia
+    expira_en = Column(DateTime(timezone=True), nullable=False, index=True)
+    revocada = Column(Boolean, default=False, nullable=False)
+    revocada_en = Column(DateTime(timezone=True), nullable=True, index=True)
+    
+    # Relaciones
+    usuario = relationship("Usuario", back_populates="sesiones")
+    
+    def __repr__(self):
+        return f"<SesionUsuario(id={self.id}, usuario_id={self.usuario_id}, jti={self.jti})>"
@@ -5,6 +5,7 @@ Todos los modelos heredan de esta clase
 from sqlalchemy import Column, Integer, DateTime, Boolean
 from sqlalchemy.sql import func
 from database import Base
+from utils.serializacion import serializador
 
 
 class BaseModel(Base):
@@ -21,8 +22,9 @@ class BaseModel(Base):
         return f"<{self.__class__.__name__}(id={self.id})>"
     
     def to_dict(self):
-        """Convierte el modelo a diccionario"""
-        return {
-            column.name: getattr(self, column.name)
-            for column in self.__table__.columns
-        }
\ No newline at end of file
+        """Convierte el modelo a diccionario (columnas compiladas una vez por modelo)"""
+        return serializador(type(self)).a_dict(self)
+
+    def to_json_dict(self):
+        """Como to_dict, con los valores listos para utils.serializacion.dumps"""
+        return serializador(type(self)).a_json(self)
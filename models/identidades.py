@@ -4,7 +4,7 @@ Módulo 2.1: Identidades y vinculación asistencial
 - Profesionales (médicos, enfermería, terapias)
 - UnidadesAtencion (sedes/consultorios/servicios)
 """
-from sqlalchemy import Column, String, Date, Enum, Text, JSON, Boolean
+from sqlalchemy import Column, String, Date, Enum, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 import enum
@@ -47,6 +47,10 @@ class PersonaAtendida(BaseModel):
     Gestiona información de pacientes del sistema
     """
     __tablename__ = "personas_atendidas"
+    __table_args__ = (
+        # Paginación por cursor (created_at, id); InnoDB agrega el PK al índice
+        Index("ix_personas_atendidas_created_at", "created_at"),
+    )
     
     # Identificación
     tipo_documento = Column(Enum(TipoDocumentoEnum), nullable=False)
@@ -3,7 +3,7 @@ Módulo 2.8: Notificaciones y comunicaciones
 - Notificacion: mensajes enviados por email/SMS/WhatsApp
 Integración con SendGrid
 """
-from sqlalchemy import Column, String, DateTime, Integer, Enum, Text, JSON
+from sqlalchemy import Column, String, DateTime, Integer, Enum, Text, JSON, Index
 from models.base import BaseModel
 import enum
 
@@ -23,6 +23,7 @@ class EstadoNotificacionEnum(str, enum.Enum):
     ENTREGADO = "ENTREGADO"
     ERROR = "ERROR"
     REBOTADO = "REBOTADO"
+    DESCARTADO = "DESCARTADO"  # Agotó max_intentos (dead letter)
 
 
 class PlantillaNotificacionEnum(str, enum.Enum):
@@ -44,6 +45,10 @@ class Notificacion(BaseModel):
     REGLA DE NEGOCIO: Idempotencia en reintentos
     """
     __tablename__ = "notificaciones"
+    __table_args__ = (
+        # Reintentos: ERROR con fecha_proximo_intento vencida, en orden
+        Index("ix_notificaciones_estado_proximo_intento", "estado", "fecha_proximo_intento"),
+    )
     
     # Canal
     tipo = Column(Enum(TipoNotificacionEnum), nullable=False, index=True)
@@ -54,7 +59,7 @@ class Notificacion(BaseModel):
     # Contenido
     plantilla = Column(Enum(PlantillaNotificacionEnum), nullable=True)
     asunto = Column(String(255), nullable=True)
-    mensaje = Column(Text, nullable=False)
+    mensaje = Column(Text, nullable=True, comment="NULL si se renderiza desde plantilla + payload")
     payload = Column(JSON, nullable=True, comment="Datos adicionales para renderizar plantilla")
     
     # Control de envío
@@ -66,6 +71,10 @@ class Notificacion(BaseModel):
     fecha_programada = Column(DateTime(timezone=True), nullable=True, index=True)
     fecha_enviado = Column(DateTime(timezone=True), nullable=True)
     fecha_entregado = Column(DateTime(timezone=True), nullable=True)
+    fecha_proximo_intento = Column(DateTime(timezone=True), nullable=True, comment="Próximo reintento (backoff) si estado=ERROR")
+    
+    # Idempotencia: una sola notificación por clave (p. ej. RECORDATORIO_CITA:<cita_id>)
+    clave_idempotencia = Column(String(100), nullable=True, unique=True)
     
     # Tracking externo
     proveedor_id = Column(String(255), nullable=True, comment="ID del proveedor (SendGrid message ID)")
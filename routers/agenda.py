@@ -1,40 +1,272 @@
-# app/routers/agenda.py
-from fastapi import APIRouter, Depends, HTTPException, status
+"""
+Router: Bloques de Agenda - Módulo 2.2
+Publicación de disponibilidad de profesionales, individual o por reglas de recurrencia
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+import time
 
+from config import settings
 from database import get_db
-from models.agenda import Agenda
-from schemas.agenda import AgendaBase, AgendaResponse
-
-router = APIRouter(
-    prefix="/agenda",
-    tags=["2.2 Disponibilidad - Agenda"]
-)
-
-# ----------------- Funciones CRUD Básicas -----------------
-
-def create_agenda_block(db: Session, agenda: AgendaBase):
-    # Regla de negocio: Asegurar inicio < fin (Validación Pydantic o en servicio)
-    if agenda.inicio >= agenda.fin:
-        raise HTTPException(status_code=400, detail="La hora de inicio debe ser anterior a la hora de fin.")
-        
-    db_agenda = Agenda(**agenda.model_dump())
-    db.add(db_agenda)
+from models.agenda_citas import BloqueAgenda, EstadoBloqueEnum
+from models.identidades import Profesional, UnidadAtencion
+from schemas.agenda import BloqueAgendaCreate, ReglaRecurrenciaAgenda, ResultadoRecurrencia
+from schemas.base import ResponseSchema, PaginatedResponse
+from services.availability_index import availability_index
+from dependencies import get_current_user
+from utils.pagination import paginar_por_pagina
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/agenda", tags=["2.2 Disponibilidad - Agenda"])
+
+Intervalo = Tuple[datetime, datetime]
+
+
+class AgendaService:
+    """Servicio con lógica de negocio de bloques de agenda"""
+
+    @staticmethod
+    def contar_bloques(regla: ReglaRecurrenciaAgenda) -> int:
+        """Bloques por profesional que genera la regla, sin expandirla"""
+        total_dias = (regla.fecha_fin - regla.fecha_inicio).days + 1
+        semanas, resto = divmod(total_dias, 7)
+        primero = regla.fecha_inicio.weekday()
+        dias = semanas * len(regla.dias_semana) + sum(
+            1 for i in range(resto) if (primero + i) % 7 in regla.dias_semana
+        )
+        if not regla.duracion_minutos:
+            return dias
+        jornada = datetime.combine(regla.fecha_inicio, regla.hora_fin) - datetime.combine(regla.fecha_inicio, regla.hora_inicio)
+        return dias * (jornada // timedelta(minutes=regla.duracion_minutos))
+
+    @staticmethod
+    def expandir_regla(regla: ReglaRecurrenciaAgenda) -> List[Intervalo]:
+        """Intervalos de un profesional generados por la regla, ordenados por inicio"""
+        duracion = timedelta(minutes=regla.duracion_minutos) if regla.duracion_minutos else None
+        intervalos = []
+        dia = regla.fecha_inicio
+        while dia <= regla.fecha_fin:
+            if dia.weekday() in regla.dias_semana:
+                inicio = datetime.combine(dia, regla.hora_inicio)
+                fin = datetime.combine(dia, regla.hora_fin)
+                if duracion is None:
+                    intervalos.append((inicio, fin))
+                else:
+                    # Cupos completos; el resto que no alcanza la duración se descarta
+                    while inicio + duracion <= fin:
+                        intervalos.append((inicio, inicio + duracion))
+                        inicio += duracion
+            dia += timedelta(days=1)
+        return intervalos
+
+    @staticmethod
+    def filtrar_solapados(candidatos: List[Intervalo], existentes: List[Intervalo]) -> Tuple[List[Intervalo], int]:
+        """
+        REGLA DE NEGOCIO: Un profesional no puede tener bloques solapados
+        Barrido sobre ambas listas ordenadas por inicio. Los candidatos no se
+        solapan entre sí, así que su fin también es creciente: basta con
+        acumular el mayor fin de los existentes que empiezan antes del fin
+        del candidato. O(n + m).
+        """
+        libres = []
+        omitidos = 0
+        j = 0
+        max_fin = None
+        for inicio, fin in candidatos:
+            while j < len(existentes) and existentes[j][0] < fin:
+                if max_fin is None or existentes[j][1] > max_fin:
+                    max_fin = existentes[j][1]
+                j += 1
+            if max_fin is not None and max_fin > inicio:
+                omitidos += 1
+            else:
+                libres.append((inicio, fin))
+        return libres, omitidos
+
+    @staticmethod
+    def bloques_existentes(
+        db: Session,
+        profesional_ids: List[int],
+        desde: datetime,
+        hasta: datetime
+    ) -> Dict[int, List[Intervalo]]:
+        """Bloques vigentes de los profesionales en el rango, en una sola consulta"""
+        filas = db.execute(
+            select(BloqueAgenda.profesional_id, BloqueAgenda.inicio, BloqueAgenda.fin)
+            .where(
+                BloqueAgenda.profesional_id.in_(profesional_ids),
+                BloqueAgenda.is_active.is_(True),
+                BloqueAgenda.inicio < hasta,
+                BloqueAgenda.fin > desde
+            )
+            .order_by(BloqueAgenda.profesional_id, BloqueAgenda.inicio)
+        )
+        existentes: Dict[int, List[Intervalo]] = {pid: [] for pid in profesional_ids}
+        for profesional_id, inicio, fin in filas:
+            existentes[profesional_id].append((inicio, fin))
+        return existentes
+
+    @staticmethod
+    def validar_referencias(db: Session, profesional_ids: List[int], unidad_id: int) -> None:
+        """Verifica que existan la unidad y todos los profesionales"""
+        if not db.query(UnidadAtencion.id).filter(UnidadAtencion.id == unidad_id).first():
+            raise HTTPException(status_code=404, detail="Unidad no encontrada")
+
+        encontrados = {
+            pid for (pid,) in db.query(Profesional.id).filter(Profesional.id.in_(profesional_ids))
+        }
+        faltantes = sorted(set(profesional_ids) - encontrados)
+        if faltantes:
+            raise HTTPException(status_code=404, detail=f"Profesionales no encontrados: {faltantes}")
+
+
+@router.post("/", response_model=ResponseSchema, status_code=status.HTTP_201_CREATED)
+def crear_bloque_agenda(
+    bloque: BloqueAgendaCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Crea un bloque de agenda (rechaza solapes con bloques del mismo profesional)"""
+    AgendaService.validar_referencias(db, [bloque.profesional_id], bloque.unidad_id)
+
+    existentes = AgendaService.bloques_existentes(db, [bloque.profesional_id], bloque.inicio, bloque.fin)
+    if existentes[bloque.profesional_id]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El profesional ya tiene un bloque de agenda en ese horario"
+        )
+
+    db_bloque = BloqueAgenda(**bloque.model_dump())
+    db.add(db_bloque)
+    db.commit()
+    db.refresh(db_bloque)
+
+    return ResponseSchema(
+        success=True,
+        message="Bloque de agenda creado",
+        data=db_bloque.to_dict()
+    )
+
+
+@router.post("/recurrente", response_model=ResponseSchema, status_code=status.HTTP_201_CREATED)
+def crear_bloques_recurrentes(
+    regla: ReglaRecurrenciaAgenda,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Expande una regla de recurrencia en bloques para varios profesionales
+    - Solapes contra bloques existentes por barrido de intervalos ordenados
+    - Inserción con INSERT multi-fila en lotes de AGENDA_BULK_CHUNK_SIZE
+    - Todo en una transacción
+    """
+    profesional_ids = sorted(set(regla.profesional_ids))
+    AgendaService.validar_referencias(db, profesional_ids, regla.unidad_id)
+
+    # El tope se valida antes de expandir: la regla no llega a materializarse
+    generados = AgendaService.contar_bloques(regla) * len(profesional_ids)
+    if generados > settings.AGENDA_RECURRENCIA_MAX_BLOQUES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La regla genera {generados} bloques (máximo {settings.AGENDA_RECURRENCIA_MAX_BLOQUES})"
+        )
+    plantilla = AgendaService.expandir_regla(regla)
+    if not plantilla:
+        return ResponseSchema(
+            success=True,
+            message="La regla no genera bloques",
+            data=ResultadoRecurrencia(generados=0, insertados=0, omitidos_por_solape=0, segundos=0.0, filas_por_segundo=0.0)
+        )
+
+    inicio_proceso = time.perf_counter()
+    existentes = AgendaService.bloques_existentes(db, profesional_ids, plantilla[0][0], plantilla[-1][1])
+
+    filas = []
+    omitidos = 0
+    for profesional_id in profesional_ids:
+        libres, omitidos_prof = AgendaService.filtrar_solapados(plantilla, existentes[profesional_id])
+        omitidos += omitidos_prof
+        filas.extend(
+            {
+                "profesional_id": profesional_id,
+                "unidad_id": regla.unidad_id,
+                "inicio": inicio,
+                "fin": fin,
+                "capacidad": regla.capacidad,
+                "estado": EstadoBloqueEnum.ABIERTO,
+                "observaciones": regla.observaciones,
+            }
+            for inicio, fin in libres
+        )
+
+    if omitidos and not regla.omitir_solapados:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{omitidos} bloques se solapan con bloques existentes"
+        )
+
+    tamano_lote = settings.AGENDA_BULK_CHUNK_SIZE
+    tabla = BloqueAgenda.__table__
     try:
+        for i in range(0, len(filas), tamano_lote):
+            db.execute(insert(tabla), filas[i:i + tamano_lote])
         db.commit()
-        db.refresh(db_agenda)
-        return db_agenda
     except Exception:
         db.rollback()
-        raise HTTPException(status_code=409, detail="Error de conflicto: Bloque de agenda ya existe para ese profesional en ese horario.")
+        raise
+
+    # Las inserciones Core no disparan los eventos del ORM
+    availability_index.marcar(profesional_ids)
+
+    segundos = time.perf_counter() - inicio_proceso
+    resultado = ResultadoRecurrencia(
+        generados=generados,
+        insertados=len(filas),
+        omitidos_por_solape=omitidos,
+        segundos=round(segundos, 3),
+        filas_por_segundo=round(len(filas) / segundos, 1) if segundos > 0 else 0.0
+    )
+    logger.info(
+        f"Agenda recurrente: {resultado.insertados} bloques insertados "
+        f"({resultado.filas_por_segundo} filas/s, {omitidos} omitidos por solape)"
+    )
+
+    return ResponseSchema(
+        success=True,
+        message=f"{resultado.insertados} bloques creados",
+        data=resultado
+    )
+
 
-# ----------------- Endpoints -----------------
+@router.get("/", response_model=PaginatedResponse)
+def listar_bloques_agenda(
+    profesional_id: Optional[int] = None,
+    unidad_id: Optional[int] = None,
+    estado: Optional[EstadoBloqueEnum] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Lista bloques de agenda con filtros y paginación"""
+    query = db.query(BloqueAgenda).filter(BloqueAgenda.is_active == True)
 
-@router.post("/", response_model=AgendaResponse, status_code=status.HTTP_201_CREATED)
-def crear_bloque_agenda(agenda: AgendaBase, db: Session = Depends(get_db)):
-    return create_agenda_block(db, agenda)
+    if profesional_id:
+        query = query.filter(BloqueAgenda.profesional_id == profesional_id)
+    if unidad_id:
+        query = query.filter(BloqueAgenda.unidad_id == unidad_id)
+    if estado:
+        query = query.filter(BloqueAgenda.estado == estado)
+    if desde:
+        query = query.filter(BloqueAgenda.fin > desde)
+    if hasta:
+        query = query.filter(BloqueAgenda.inicio < hasta)
 
-@router.get("/", response_model=List[AgendaResponse])
-def listar_bloques_agenda(db: Session = Depends(get_db)):
-    return db.query(Agenda).all()
\ No newline at end of file
+    return paginar_por_pagina(db, query.order_by(BloqueAgenda.inicio), page, page_size)
@@ -5,7 +5,8 @@ from typing import Optional
 from datetime import datetime
 from database import get_db
 from models.auditoria import BitacoraAcceso, TipoAccionEnum, Usuario, Rol, Permiso
-from schemas.base import ResponseSchema, PaginatedResponse
+from schemas.base import ResponseSchema
+from utils.pagination import ModoConteo, paginar_por_cursor, paginar_por_pagina
 
 router_auditoria = APIRouter(prefix="/auditoria", tags=["Auditoría"])
 
@@ -18,9 +19,14 @@ def consultar_bitacora(
     fecha_hasta: Optional[datetime] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor; vacío = primera página"),
+    conteo: Optional[ModoConteo] = None,
     db: Session = Depends(get_db)
 ):
-    """Consulta bitácora de accesos con filtros"""
+    """
+    Consulta bitácora de accesos con filtros
+    - Por página (page/page_size), o por cursor sobre (created_at, id) descendente
+    """
     query = db.query(BitacoraAcceso)
     
     if usuario_id:
@@ -34,19 +40,15 @@ def consultar_bitacora(
     if fecha_hasta:
         query = query.filter(BitacoraAcceso.created_at <= fecha_hasta)
     
+    if cursor is not None:
+        return paginar_por_cursor(
+            db, query, "bitacora",
+            [BitacoraAcceso.created_at, BitacoraAcceso.id],
+            cursor, page_size, descendente=True, conteo=conteo
+        )
+
     query = query.order_by(BitacoraAcceso.created_at.desc())
-    
-    total = query.count()
-    registros = query.offset((page - 1) * page_size).limit(page_size).all()
-    
-    return PaginatedResponse(
-        success=True,
-        data=[r.to_dict() for r in registros],
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size
-    )
+    return paginar_por_pagina(db, query, page, page_size, conteo)
 
 @router_auditoria.get("/usuarios")
 def listar_usuarios(db: Session = Depends(get_db)):
@@ -96,6 +98,8 @@ from datetime import timedelta
 from database import get_db
 from models.auditoria import Usuario
 from services.auth_service import AuthService
+from services.permission_cache import permission_cache
+from services.session_store import session_store
 from schemas.base import ResponseSchema
 
 router_auth = APIRouter(prefix="/auth", tags=["Autenticación"])
@@ -116,18 +120,18 @@ def login(
             detail="Credenciales incorrectas"
         )
     
+    # Nueva sesión (una por login, varias concurrentes por usuario)
+    jti, _ = session_store.crear(db, usuario.id)
+    db.commit()
+    
     # Generar tokens
     access_token = AuthService.create_access_token(
-        data={"sub": usuario.username, "usuario_id": usuario.id}
+        data=AuthService.build_token_claims(db, usuario.id, usuario.username, sid=jti)
     )
     refresh_token = AuthService.create_refresh_token(
-        data={"sub": usuario.username, "usuario_id": usuario.id}
+        data={"sub": usuario.username, "usuario_id": usuario.id, "jti": jti}
     )
     
-    # Guardar refresh token
-    usuario.token_refresh = refresh_token
-    db.commit()
-    
     return ResponseSchema(
         success=True,
         message="Login exitoso",
@@ -149,29 +153,37 @@ def refresh_token(
     refresh_token: str,
     db: Session = Depends(get_db)
 ):
-    """Refresca el access token usando refresh token"""
-    try:
-        payload = AuthService.decode_token(refresh_token)
-        username = payload.get("sub")
-        
-        usuario = db.query(Usuario).filter(Usuario.username == username).first()
-        if not usuario or usuario.token_refresh != refresh_token:
-            raise HTTPException(status_code=401, detail="Refresh token inválido")
-        
-        # Generar nuevo access token
-        new_access_token = AuthService.create_access_token(
-            data={"sub": usuario.username, "usuario_id": usuario.id}
-        )
-        
-        return ResponseSchema(
-            success=True,
-            data={
-                "access_token": new_access_token,
-                "token_type": "bearer"
-            }
-        )
-    except Exception:
-        raise HTTPException(status_code=401, detail="Token inválido")
+    """
+    Refresca el access token usando refresh token
+    Sin consultas a la BD si la sesión no aparece en el filtro de revocación
+    y los permisos del usuario están en caché
+    """
+    payload = AuthService.decode_token(refresh_token)
+    jti = payload.get("jti")
+    usuario_id = payload.get("usuario_id")
+    
+    if payload.get("type") != "refresh" or not jti or usuario_id is None:
+        raise HTTPException(status_code=401, detail="Refresh token inválido")
+    
+    if session_store.esta_revocada(db, jti):
+        raise HTTPException(status_code=401, detail="Sesión revocada")
+    
+    entrada = permission_cache.obtener(db, usuario_id)
+    if entrada is None or not entrada.estado:
+        raise HTTPException(status_code=401, detail="Usuario inactivo o inexistente")
+    
+    # Generar nuevo access token
+    new_access_token = AuthService.create_access_token(
+        data=AuthService.build_token_claims(db, entrada.usuario_id, entrada.username, sid=jti)
+    )
+    
+    return ResponseSchema(
+        success=True,
+        data={
+            "access_token": new_access_token,
+            "token_type": "bearer"
+        }
+    )
 
 @router_auth.post("/register")
 def register(
@@ -194,15 +206,14 @@ def logout(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
-    """Logout (invalida refresh token)"""
+    """Logout (revoca la sesión del token)"""
     try:
         token = credentials.credentials
         payload = AuthService.decode_token(token)
-        username = payload.get("sub")
+        sid = payload.get("sid") or payload.get("jti")
         
-        usuario = db.query(Usuario).filter(Usuario.username == username).first()
-        if usuario:
-            usuario.token_refresh = None
+        if sid:
+            session_store.revocar(db, sid)
             db.commit()
         
         return ResponseSchema(success=True, message="Logout exitoso")
@@ -3,16 +3,19 @@ Router de Citas (Módulo 2.2)
 Implementa TODAS las reglas de negocio del enunciado
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Union
+from datetime import datetime, timedelta
 from database import get_db
 from models.agenda_citas import Cita, BloqueAgenda, HistorialCita, EstadoCitaEnum, EstadoBloqueEnum
 from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
 from services.auth_service import AuthService
 from services.notification_service import notification_service
-from schemas.base import ResponseSchema, PaginatedResponse
+from services.availability_index import availability_index
+from schemas.base import ResponseSchema, PaginatedResponse, CursorPaginatedResponse
 from dependencies import get_current_user, check_permission
+from utils.pagination import ModoConteo, paginar_por_cursor, paginar_por_pagina
 
 router = APIRouter(prefix="/citas", tags=["Citas"])
 
@@ -21,11 +24,31 @@ class CitaService:
     """Servicio con lógica de negocio de citas"""
     
     @staticmethod
-    def validar_bloque_disponible(db: Session, bloque_id: int, inicio: datetime, fin: datetime) -> BloqueAgenda:
+    def reservar_cupo(db: Session, bloque_id: int, inicio: datetime, fin: datetime) -> BloqueAgenda:
         """
         REGLA DE NEGOCIO: Cita debe pertenecer a bloque abierto y no exceder capacidad
+        Bloquea la fila del bloque (SELECT ... FOR UPDATE) hasta el commit:
+        las reservas concurrentes del mismo bloque se serializan, así que el
+        conteo de citas simultáneas no puede quedar desactualizado.
         """
-        bloque = db.query(BloqueAgenda).filter(BloqueAgenda.id == bloque_id).first()
+        return CitaService.validar_bloque_disponible(db, bloque_id, inicio, fin, bloquear=True)
+    
+    @staticmethod
+    def validar_bloque_disponible(
+        db: Session,
+        bloque_id: int,
+        inicio: datetime,
+        fin: datetime,
+        bloquear: bool = False
+    ) -> BloqueAgenda:
+        """
+        REGLA DE NEGOCIO: Cita debe pertenecer a bloque abierto y no exceder capacidad
+        capacidad = citas activas simultáneas (que se solapan con [inicio, fin))
+        """
+        consulta = db.query(BloqueAgenda).filter(BloqueAgenda.id == bloque_id)
+        if bloquear:
+            consulta = consulta.with_for_update()
+        bloque = consulta.first()
         
         if not bloque:
             raise HTTPException(
@@ -48,12 +71,17 @@ class CitaService:
             )
         
         # Verificar capacidad
-        citas_existentes = db.query(Cita).filter(
+        solapadas = db.query(func.count(Cita.id)).filter(
             Cita.bloque_agenda_id == bloque_id,
             Cita.estado.in_([EstadoCitaEnum.CONFIRMADA, EstadoCitaEnum.SOLICITADA]),
             Cita.inicio < fin,
             Cita.fin > inicio
-        ).count()
+        )
+        if bloquear:
+            # Lectura con bloqueo: en REPEATABLE READ una lectura normal vería
+            # la foto tomada antes de bloquear el bloque
+            solapadas = solapadas.with_for_update()
+        citas_existentes = solapadas.scalar()
         
         if citas_existentes >= bloque.capacidad:
             raise HTTPException(
@@ -139,8 +167,8 @@ def crear_cita(
     if not unidad:
         raise HTTPException(status_code=404, detail="Unidad no encontrada")
     
-    # Validar bloque disponible
-    bloque = CitaService.validar_bloque_disponible(db, bloque_agenda_id, inicio, fin)
+    # Reservar cupo en el bloque (fila bloqueada hasta el commit)
+    CitaService.reservar_cupo(db, bloque_agenda_id, inicio, fin)
     
     # Crear cita
     cita = Cita(
@@ -186,9 +214,15 @@ def confirmar_cita(
 ):
     """
     Confirma una cita solicitada
-    Envía notificación al paciente
+    La notificación al paciente se encola (outbox) en la misma transacción;
+    la envía services.notification_worker fuera de la petición
     """
-    cita = db.query(Cita).filter(Cita.id == cita_id).first()
+    cita = (
+        db.query(Cita)
+        .options(joinedload(Cita.persona), joinedload(Cita.profesional), joinedload(Cita.unidad))
+        .filter(Cita.id == cita_id)
+        .first()
+    )
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
     
@@ -209,21 +243,17 @@ def confirmar_cita(
         usuario_id=current_user.get("usuario_id")
     )
     
-    db.commit()
+    # Notificación en el outbox: se confirma junto con el cambio de estado
+    notification_service.encolar_cita_confirmacion(
+        db=db,
+        email_paciente=cita.persona.correo,
+        nombre_paciente=f"{cita.persona.nombres} {cita.persona.apellidos}",
+        fecha_cita=cita.inicio,
+        profesional=f"{cita.profesional.nombres} {cita.profesional.apellidos}",
+        unidad=cita.unidad.nombre
+    )
     
-    # Enviar notificación
-    try:
-        notification_service.send_cita_confirmacion(
-            db=db,
-            email_paciente=cita.persona.correo,
-            nombre_paciente=f"{cita.persona.nombres} {cita.persona.apellidos}",
-            fecha_cita=cita.inicio,
-            profesional=f"{cita.profesional.nombres} {cita.profesional.apellidos}",
-            unidad=cita.unidad.nombre
-        )
-    except Exception as e:
-        # No fallar si falla la notificación
-        print(f"Error enviando notificación: {e}")
+    db.commit()
     
     return ResponseSchema(
         success=True,
@@ -247,6 +277,7 @@ def cancelar_cita(
     
     estado_anterior = cita.estado
     cita.estado = EstadoCitaEnum.CANCELADA
+    notification_service.descartar_recordatorio(db, cita.id)
     
     CitaService.registrar_historial(
         db=db,
@@ -263,7 +294,7 @@ def cancelar_cita(
     return ResponseSchema(success=True, message="Cita cancelada")
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
 def listar_citas(
     persona_id: Optional[int] = None,
     profesional_id: Optional[int] = None,
@@ -272,10 +303,15 @@ def listar_citas(
     fecha_hasta: Optional[datetime] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor; vacío = primera página"),
+    conteo: Optional[ModoConteo] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Lista citas con filtros y paginación"""
+    """
+    Lista citas con filtros y paginación
+    - Por página (page/page_size), o por cursor sobre (inicio, id) ascendente
+    """
     query = db.query(Cita)
     
     if persona_id:
@@ -289,14 +325,47 @@ def listar_citas(
     if fecha_hasta:
         query = query.filter(Cita.inicio <= fecha_hasta)
     
-    total = query.count()
-    citas = query.offset((page - 1) * page_size).limit(page_size).all()
+    if cursor is not None:
+        return paginar_por_cursor(
+            db, query, "citas", [Cita.inicio, Cita.id], cursor, page_size, conteo=conteo
+        )
+    return paginar_por_pagina(db, query, page, page_size, conteo)
+
+
+@router.get("/disponibilidad", response_model=ResponseSchema)
+def buscar_disponibilidad(
+    especialidad: Optional[str] = None,
+    unidad_id: Optional[int] = None,
+    profesional_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    duracion_minutos: int = Query(20, ge=5, le=480),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Próximos cupos libres por especialidad, unidad o profesional
+    Se resuelve sobre el índice de disponibilidad en memoria
+    (por defecto, los próximos 7 días desde ahora)
+    """
+    desde = (desde or datetime.utcnow()).replace(tzinfo=None)
+    hasta = (hasta or desde + timedelta(days=7)).replace(tzinfo=None)
+    if hasta <= desde:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser posterior a 'desde'")
     
-    return PaginatedResponse(
+    cupos = availability_index.buscar(
+        db,
+        desde=desde,
+        hasta=hasta,
+        especialidad=especialidad,
+        unidad_id=unidad_id,
+        profesional_id=profesional_id,
+        duracion_minutos=duracion_minutos,
+        limit=limit
+    )
+    
+    return ResponseSchema(
         success=True,
-        data=[c.to_dict() for c in citas],
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size
-    )
\ No newline at end of file
+        data=cupos
+    )
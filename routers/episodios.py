@@ -2,12 +2,13 @@
 Router: Episodios de Atención - Módulo 2.3
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
 from database import get_db
-from models.registro_clinico import EpisodioAtencion, TipoEpisodioEnum, EstadoEpisodioEnum
-from models.ordenes import EstadoOrdenEnum
+from models.registro_clinico import EpisodioAtencion, NotaClinica, Diagnostico, TipoEpisodioEnum, EstadoEpisodioEnum
+from models.ordenes import Orden, EstadoOrdenEnum
 from schemas.base import ResponseSchema
 
 router_episodios = APIRouter(prefix="/episodios", tags=["Episodios de Atención"])
@@ -51,14 +52,20 @@ def listar_episodios(
 
 @router_episodios.get("/{episodio_id}")
 def obtener_episodio(episodio_id: int, db: Session = Depends(get_db)):
-    episodio = db.query(EpisodioAtencion).filter(EpisodioAtencion.id == episodio_id).first()
-    if not episodio:
+    """Totales por subconsultas COUNT correlacionadas, sin cargar las colecciones"""
+    totales = [
+        select(func.count(modelo.id)).where(modelo.episodio_id == EpisodioAtencion.id).scalar_subquery()
+        for modelo in (NotaClinica, Diagnostico, Orden)
+    ]
+    fila = db.query(EpisodioAtencion, *totales).filter(EpisodioAtencion.id == episodio_id).first()
+    if not fila:
         raise HTTPException(status_code=404, detail="Episodio no encontrado")
     
+    episodio, notas, diagnosticos, ordenes = fila
     data = episodio.to_dict()
-    data['total_notas'] = len(episodio.notas_clinicas)
-    data['total_diagnosticos'] = len(episodio.diagnosticos)
-    data['total_ordenes'] = len(episodio.ordenes)
+    data['total_notas'] = notas
+    data['total_diagnosticos'] = diagnosticos
+    data['total_ordenes'] = ordenes
     return ResponseSchema(success=True, data=data)
 
 @router_episodios.patch("/{episodio_id}/cerrar")
@@ -96,7 +103,6 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
 from database import get_db
-from models.registro_clinico import NotaClinica
 from schemas.base import ResponseSchema
 
 router_notas = APIRouter(prefix="/notas", tags=["Notas Clínicas"])
@@ -1,5 +1,5 @@
 """Router: Facturas - Módulo 2.7"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from datetime import date
 from typing import Optional
@@ -7,6 +7,7 @@ from database import get_db
 from models.facturacion import Factura, EstadoFacturaEnum
 from models.catalogo import Arancel
 from schemas.base import ResponseSchema
+from utils.serializacion import RespuestaJSON, parsear_campos, proyectar, serializar_lista
 
 router_facturas = APIRouter(prefix="/facturas", tags=["Facturas"])
 
@@ -144,9 +145,11 @@ def listar_facturas(
     persona_id: Optional[int] = None,
     aseguradora_id: Optional[int] = None,
     estado: Optional[EstadoFacturaEnum] = None,
+    fields: Optional[str] = Query(None, description="Columnas a retornar, separadas por coma (id siempre se incluye)"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Factura)
+    campos = parsear_campos(Factura, fields)
+    query = proyectar(db.query(Factura), Factura, campos)
     if persona_id:
         query = query.filter(Factura.persona_id == persona_id)
     if aseguradora_id:
@@ -155,7 +158,7 @@ def listar_facturas(
         query = query.filter(Factura.estado == estado)
     
     facturas = query.all()
-    return ResponseSchema(success=True, data=[f.to_dict() for f in facturas])
+    return RespuestaJSON(ResponseSchema(success=True, data=serializar_lista(facturas, campos)))
 
 @router_facturas.get("/{factura_id}")
 def obtener_factura(factura_id: int, db: Session = Depends(get_db)):
@@ -245,6 +248,7 @@ from typing import Optional
 from database import get_db
 from models.notificaciones import Notificacion, TipoNotificacionEnum, PlantillaNotificacionEnum
 from services.notification_service import notification_service
+from services.notification_worker import notification_worker, channel_workers
 from schemas.base import ResponseSchema
 
 router_notificaciones = APIRouter(prefix="/notificaciones", tags=["Notificaciones"])
@@ -270,19 +274,20 @@ def enviar_notificacion(
             payload=payload
         )
     else:
-        # SMS, WhatsApp simulado
-        notif = Notificacion(
+        # SMS, WhatsApp y Push: outbox; los despacha el pool de su canal
+        notif = notification_service.encolar(
+            db=db,
             tipo=tipo,
             destinatario=destinatario,
             asunto=asunto,
             mensaje=mensaje,
             plantilla=plantilla,
-            payload=payload,
-            estado="ENVIADO"
+            payload=payload
         )
-        db.add(notif)
         db.commit()
         db.refresh(notif)
+        channel_workers[tipo].despertar()
+        return ResponseSchema(success=True, message="Notificación encolada", data=notif.to_dict())
     
     return ResponseSchema(success=True, message="Notificación enviada", data=notif.to_dict())
 
@@ -302,7 +307,12 @@ def listar_notificaciones(
     return ResponseSchema(success=True, data=[n.to_dict() for n in notificaciones])
 
 @router_notificaciones.post("/reintentar-fallidas")
-def reintentar_fallidas(db: Session = Depends(get_db)):
-    """Reintenta notificaciones fallidas"""
-    notification_service.retry_failed_notifications(db, max_retries=3)
-    return ResponseSchema(success=True, message="Reintentos procesados")
+def reintentar_fallidas():
+    """
+    Reintenta ahora un lote por canal de notificaciones fallidas cuyo backoff
+    ya venció (lo mismo que hace services.notification_retry en segundo plano)
+    """
+    procesadas = notification_worker.procesar_reintentos() + sum(
+        worker.procesar_reintentos() for worker in channel_workers.values()
+    )
+    return ResponseSchema(success=True, message="Reintentos procesados", data={"procesadas": procesadas})
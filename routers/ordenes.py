@@ -1,11 +1,12 @@
 """Router: Órdenes Médicas - Módulo 2.4"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
 from database import get_db
 from models.ordenes import Orden, TipoOrdenEnum, PrioridadOrdenEnum, EstadoOrdenEnum
 from schemas.base import ResponseSchema
+from utils.serializacion import RespuestaJSON, parsear_campos, proyectar, serializar_lista
 
 router_ordenes = APIRouter(prefix="/ordenes", tags=["Órdenes Médicas"])
 
@@ -35,9 +36,11 @@ def listar_ordenes(
     episodio_id: Optional[int] = None,
     tipo: Optional[TipoOrdenEnum] = None,
     estado: Optional[EstadoOrdenEnum] = None,
+    fields: Optional[str] = Query(None, description="Columnas a retornar, separadas por coma (id siempre se incluye)"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Orden)
+    campos = parsear_campos(Orden, fields)
+    query = proyectar(db.query(Orden), Orden, campos)
     if episodio_id:
         query = query.filter(Orden.episodio_id == episodio_id)
     if tipo:
@@ -46,7 +49,7 @@ def listar_ordenes(
         query = query.filter(Orden.estado == estado)
     
     ordenes = query.all()
-    return ResponseSchema(success=True, data=[o.to_dict() for o in ordenes])
+    return RespuestaJSON(ResponseSchema(success=True, data=serializar_lista(ordenes, campos)))
 
 @router_ordenes.patch("/{orden_id}/estado")
 def actualizar_estado_orden(
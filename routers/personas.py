@@ -4,12 +4,17 @@ CRUD completo con filtros, paginación y búsqueda
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select
 from typing import List, Optional
 from datetime import date, datetime
+from functools import partial
 from database import get_db
 from models.identidades import PersonaAtendida, TipoDocumentoEnum, SexoEnum, EstadoGeneralEnum
-from schemas.base import ResponseSchema, PaginatedResponse
+from models.agenda_citas import Cita
+from models.registro_clinico import EpisodioAtencion
+from schemas.base import ResponseSchema
+from utils.pagination import ModoConteo, paginar_por_cursor, paginar_por_pagina
+from utils.serializacion import parsear_campos, proyectar, serializar_lista
 
 router = APIRouter(prefix="/personas", tags=["Personas Atendidas"])
 
@@ -95,9 +100,17 @@ def listar_personas(
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor; vacío = primera página"),
+    conteo: Optional[ModoConteo] = None,
+    fields: Optional[str] = Query(None, description="Columnas a retornar, separadas por coma (id siempre se incluye)"),
     db: Session = Depends(get_db)
 ):
-    """Lista personas con filtros múltiples y paginación"""
+    """
+    Lista personas con filtros múltiples y paginación
+    - Por página (page/page_size), o por cursor sobre (created_at, id) descendente
+    - fields=id,nombres,apellidos limita columnas consultadas y serializadas
+    """
+    campos = parsear_campos(PersonaAtendida, fields)
     
     query = db.query(PersonaAtendida)
     
@@ -139,17 +152,16 @@ def listar_personas(
         )
     
     # Paginación
-    total = query.count()
-    personas = query.offset((page - 1) * page_size).limit(page_size).all()
-    
-    return PaginatedResponse(
-        success=True,
-        data=[p.to_dict() for p in personas],
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size
-    )
+    serializar = partial(serializar_lista, campos=campos)
+    if cursor is not None:
+        query = proyectar(query, PersonaAtendida, campos, PersonaAtendida.created_at)
+        return paginar_por_cursor(
+            db, query, "personas",
+            [PersonaAtendida.created_at, PersonaAtendida.id],
+            cursor, page_size, descendente=True, conteo=conteo, serializar=serializar
+        )
+    query = proyectar(query, PersonaAtendida, campos)
+    return paginar_por_pagina(db, query, page, page_size, conteo, serializar=serializar)
 
 
 # READ - GET por ID
@@ -158,22 +170,38 @@ def obtener_persona(
     persona_id: int,
     db: Session = Depends(get_db)
 ):
-    """Obtiene una persona por ID con toda su información"""
-    
-    persona = db.query(PersonaAtendida).filter(PersonaAtendida.id == persona_id).first()
+    """
+    Obtiene una persona por ID con toda su información
+    Los totales salen de subconsultas COUNT correlacionadas en la misma
+    consulta, sin cargar las colecciones de citas y episodios
+    """
+    total_citas = (
+        select(func.count(Cita.id)).where(Cita.persona_id == PersonaAtendida.id).scalar_subquery()
+    )
+    total_episodios = (
+        select(func.count(EpisodioAtencion.id))
+        .where(EpisodioAtencion.persona_id == PersonaAtendida.id)
+        .scalar_subquery()
+    )
+    fila = (
+        db.query(PersonaAtendida, total_citas, total_episodios)
+        .filter(PersonaAtendida.id == persona_id)
+        .first()
+    )
     
-    if not persona:
+    if not fila:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Persona con ID {persona_id} no encontrada"
         )
     
+    persona, citas, episodios = fila
     data = persona.to_dict()
     
     # Agregar información adicional
     data['edad'] = (date.today() - persona.fecha_nacimiento).days // 365
-    data['total_citas'] = len(persona.citas)
-    data['total_episodios'] = len(persona.episodios)
+    data['total_citas'] = citas
+    data['total_episodios'] = episodios
     
     return ResponseSchema(
         success=True,
@@ -4,11 +4,15 @@ CRUD completo para médicos, enfermeras, terapeutas
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select
 from typing import Optional
+from functools import partial
 from database import get_db
 from models.identidades import Profesional, EstadoGeneralEnum
-from schemas.base import ResponseSchema, PaginatedResponse
+from models.agenda_citas import BloqueAgenda, Cita
+from schemas.base import ResponseSchema
+from utils.pagination import paginar_por_pagina
+from utils.serializacion import parsear_campos, proyectar, serializar_lista
 
 router = APIRouter(prefix="/profesionales", tags=["Profesionales"])
 
@@ -81,10 +85,11 @@ def listar_profesionales(
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Columnas a retornar, separadas por coma (id siempre se incluye)"),
     db: Session = Depends(get_db)
 ):
-    """Lista profesionales con filtros"""
-    
+    """Lista profesionales con filtros (fields= limita las columnas)"""
+    campos = parsear_campos(Profesional, fields)
     query = db.query(Profesional)
     
     if nombres:
@@ -115,17 +120,8 @@ def listar_profesionales(
             )
         )
     
-    total = query.count()
-    profesionales = query.offset((page - 1) * page_size).limit(page_size).all()
-    
-    return PaginatedResponse(
-        success=True,
-        data=[p.to_dict() for p in profesionales],
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size
-    )
+    query = proyectar(query, Profesional, campos)
+    return paginar_por_pagina(db, query, page, page_size, serializar=partial(serializar_lista, campos=campos))
 
 
 @router.get("/{profesional_id}")
@@ -133,19 +129,31 @@ def obtener_profesional(
     profesional_id: int,
     db: Session = Depends(get_db)
 ):
-    """Obtiene un profesional por ID"""
-    
-    profesional = db.query(Profesional).filter(Profesional.id == profesional_id).first()
+    """Obtiene un profesional por ID (totales por subconsultas COUNT correlacionadas)"""
+    total_bloques = (
+        select(func.count(BloqueAgenda.id))
+        .where(BloqueAgenda.profesional_id == Profesional.id)
+        .scalar_subquery()
+    )
+    total_citas = (
+        select(func.count(Cita.id)).where(Cita.profesional_id == Profesional.id).scalar_subquery()
+    )
+    fila = (
+        db.query(Profesional, total_bloques, total_citas)
+        .filter(Profesional.id == profesional_id)
+        .first()
+    )
     
-    if not profesional:
+    if not fila:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Profesional con ID {profesional_id} no encontrado"
         )
     
+    profesional, bloques, citas = fila
     data = profesional.to_dict()
-    data['total_bloques_agenda'] = len(profesional.bloques_agenda)
-    data['total_citas'] = len(profesional.citas)
+    data['total_bloques_agenda'] = bloques
+    data['total_citas'] = citas
     
     return ResponseSchema(
         success=True,
@@ -0,0 +1,93 @@
+"""
+Schemas del Módulo 2.2: Agenda
+BloqueAgenda y reglas de recurrencia para publicar agendas en bloque
+"""
+from pydantic import Field, field_validator, model_validator
+from typing import Optional, List
+from datetime import date, datetime, time
+from schemas.base import BaseSchema, AuditInfo
+from models.agenda_citas import EstadoBloqueEnum
+
+
+# ==================== BLOQUE DE AGENDA ====================
+
+class BloqueAgendaBase(BaseSchema):
+    """Schema base de Bloque de Agenda"""
+    profesional_id: int
+    unidad_id: int
+    inicio: datetime
+    fin: datetime
+    capacidad: int = Field(1, ge=1, le=100)
+    estado: EstadoBloqueEnum = EstadoBloqueEnum.ABIERTO
+    observaciones: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validar_horario(self):
+        if self.inicio >= self.fin:
+            raise ValueError("La hora de inicio debe ser anterior a la hora de fin")
+        return self
+
+
+class BloqueAgendaCreate(BloqueAgendaBase):
+    """Schema para crear Bloque de Agenda"""
+    pass
+
+
+class BloqueAgendaResponse(BloqueAgendaBase, AuditInfo):
+    """Schema de respuesta de Bloque de Agenda"""
+    id: int
+
+
+# ==================== RECURRENCIA ====================
+
+# Rango máximo de una regla (fecha_inicio y fecha_fin incluidas)
+MAX_DIAS_RECURRENCIA = 366
+
+class ReglaRecurrenciaAgenda(BaseSchema):
+    """
+    Regla de recurrencia: "lunes a viernes 08:00-12:00, cupos de 20 minutos, capacidad 1"
+    Se expande en el servidor a un bloque por cupo (o uno por día sin duracion_minutos)
+    """
+    profesional_ids: List[int] = Field(..., min_length=1)
+    unidad_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    dias_semana: List[int] = Field(
+        default=[0, 1, 2, 3, 4],
+        description="0 = lunes ... 6 = domingo"
+    )
+    hora_inicio: time
+    hora_fin: time
+    duracion_minutos: Optional[int] = Field(None, ge=5, le=720, description="Tamaño de cada cupo")
+    capacidad: int = Field(1, ge=1, le=100)
+    observaciones: Optional[str] = None
+    omitir_solapados: bool = Field(
+        True,
+        description="True: omite los bloques que se solapan con existentes; False: rechaza toda la regla"
+    )
+
+    @field_validator("dias_semana")
+    @classmethod
+    def validar_dias(cls, v: List[int]) -> List[int]:
+        if not v or any(d < 0 or d > 6 for d in v):
+            raise ValueError("dias_semana debe contener valores entre 0 (lunes) y 6 (domingo)")
+        return sorted(set(v))
+
+    @model_validator(mode="after")
+    def validar_rangos(self):
+        if self.fecha_fin < self.fecha_inicio:
+            raise ValueError("fecha_fin debe ser igual o posterior a fecha_inicio")
+        if (self.fecha_fin - self.fecha_inicio).days + 1 > MAX_DIAS_RECURRENCIA:
+            raise ValueError(f"La regla puede abarcar a lo sumo {MAX_DIAS_RECURRENCIA} días")
+        if self.hora_fin <= self.hora_inicio:
+            raise ValueError("hora_fin debe ser posterior a hora_inicio")
+        return self
+
+
+class ResultadoRecurrencia(BaseSchema):
+    """Resumen de la expansión de una regla de recurrencia"""
+    generados: int
+    insertados: int
+    omitidos_por_solape: int
+    segundos: float
+    filas_por_segundo: float
@@ -48,10 +48,22 @@ class PaginatedResponse(BaseSchema):
     """Respuesta paginada"""
     success: bool = True
     data: List[Any]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    total_aproximado: bool = False
+
+
+class CursorPaginatedResponse(BaseSchema):
+    """Respuesta paginada por cursor (keyset)"""
+    success: bool = True
+    data: List[Any]
+    page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total: Optional[int] = None
+    total_aproximado: bool = False
 
 
 # Schemas de auditoría comunes
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: AuditMiddleware (BaseHTTPMiddleware) vs AuditASGIMiddleware
+Mide peticiones/segundo contra una ruta auditada en proceso (sin red ni base
+de datos). /health no sirve: ninguno de los dos la registra en la bitácora.
+
+Uso: python scripts/bench_audit_middleware.py [peticiones] [concurrencia]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from middleware.audit import AuditMiddleware, AuditASGIMiddleware
+from services.audit_writer import audit_writer
+
+
+def crear_app(middleware_cls) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware_cls)
+
+    @app.get("/recursos")
+    def recursos():
+        return {"status": "ok"}
+
+    return app
+
+
+async def medir(app: FastAPI, total: int, concurrencia: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Calentamiento
+        for _ in range(50):
+            await client.get("/recursos")
+
+        restantes = total
+        inicio = time.perf_counter()
+
+        async def trabajador():
+            nonlocal restantes
+            while restantes > 0:
+                restantes -= 1
+                response = await client.get("/recursos")
+                assert response.status_code == 200
+
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        return total / (time.perf_counter() - inicio)
+
+
+async def main(total: int, concurrencia: int):
+    # Descartar los lotes: solo interesa el costo del middleware
+    audit_writer.flush_func = lambda lote: None
+    audit_writer.start()
+
+    resultados = {}
+    for nombre, cls in (
+        ("BaseHTTPMiddleware", AuditMiddleware),
+        ("ASGI puro", AuditASGIMiddleware),
+    ):
+        resultados[nombre] = await medir(crear_app(cls), total, concurrencia)
+        print(f"{nombre:<20} {resultados[nombre]:>10.0f} req/s")
+
+    await audit_writer.stop()
+    base = resultados["BaseHTTPMiddleware"]
+    print(f"Mejora ASGI puro: {resultados['ASGI puro'] / base:.2f}x")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrencia = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(total, concurrencia))
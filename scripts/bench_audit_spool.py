@@ -0,0 +1,65 @@
+"""
+Benchmark del spool de auditoría
+Mide registros/segundo al escribir lotes con fsync y al reproducirlos
+
+Uso: python scripts/bench_audit_spool.py [registros] [tamaño_lote]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import time
+from datetime import datetime
+from models.auditoria import TipoAccionEnum
+from services.audit_spool import AuditSpool
+
+
+def registro_ejemplo(i: int) -> dict:
+    return {
+        "usuario_id": i % 50 or None,
+        "recurso": f"/api/v1/citas/{i}",
+        "accion": TipoAccionEnum.READ,
+        "metodo_http": "GET",
+        "ip": "10.0.0.1",
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+        "resultado": "success",
+        "codigo_http": 200,
+        "created_at": datetime.utcnow()
+    }
+
+
+def main(total: int, tamano_lote: int):
+    with tempfile.TemporaryDirectory() as directorio:
+        spool = AuditSpool(path=os.path.join(directorio, "audit_spool.bin"))
+        registros = [registro_ejemplo(i) for i in range(tamano_lote)]
+
+        inicio = time.perf_counter()
+        for _ in range(total // tamano_lote):
+            spool.append_batch(registros)
+        escritura = time.perf_counter() - inicio
+        spool.close()
+
+        tamano = os.path.getsize(spool.path)
+        print(f"Escritura: {spool.spooled} registros en {escritura:.3f}s "
+              f"= {spool.spooled / escritura:,.0f} reg/s ({tamano / 1024 / 1024:.1f} MiB, "
+              f"fsync cada {tamano_lote} registros)")
+
+        cargados = 0
+
+        def insertar(lote):
+            nonlocal cargados
+            cargados += len(lote)
+
+        inicio = time.perf_counter()
+        spool.replay(insertar)
+        lectura = time.perf_counter() - inicio
+        print(f"Reproducción: {cargados} registros en {lectura:.3f}s = {cargados / lectura:,.0f} reg/s")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tamano_lote = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(total, tamano_lote)
@@ -0,0 +1,151 @@
+"""
+Prueba de carga de los canales SMS / WhatsApp / Push sin proveedores reales
+Encola N notificaciones por canal (plantilla + payload) en SQLite sobre un
+archivo temporal y las despacha con un NotificationWorker por canal y los
+pools de services.notification_channels, contra el stub HTTP local
+(scripts/canales_stub.py) o el transporte de archivo. Reporta por canal el
+tiempo hasta vaciar su outbox, el throughput frente a la tasa configurada
+(NOTIFICATION_<CANAL>_RATE_PER_SECOND, 0 = sin límite) y las peticiones hechas.
+
+Uso: python scripts/bench_canales.py [notificaciones_por_canal] [http|file] [latencia_ms] [tasa_fallos]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import logging
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from models.notificaciones import Notificacion, TipoNotificacionEnum, EstadoNotificacionEnum
+from services.notification_channels import TransporteArchivo, TransporteHTTP, crear_dispatcher
+from services.notification_service import NotificationService
+from services.notification_worker import NotificationWorker
+from scripts.canales_stub import iniciar_stub
+
+logging.disable(logging.CRITICAL)
+
+DESTINATARIOS = {
+    TipoNotificacionEnum.SMS: "+5691234{:04d}",
+    TipoNotificacionEnum.WHATSAPP: "+5698765{:04d}",
+    TipoNotificacionEnum.PUSH: "token-dispositivo-{:06d}",
+}
+
+
+def encolar(Session, total: int) -> None:
+    service = NotificationService()
+    inicio = datetime(2030, 1, 15, 8, 0)
+    db = Session()
+    for tipo, destinatario in DESTINATARIOS.items():
+        for i in range(total):
+            service.encolar(
+                db=db,
+                tipo=tipo,
+                destinatario=destinatario.format(i),
+                **service.contenido_cita_confirmacion(
+                    nombre_paciente=f"Paciente {i}",
+                    fecha_cita=inicio + timedelta(minutes=20 * i),
+                    profesional=f"Dr. Profesional {i % 50}",
+                    unidad=f"Sede {i % 5}"
+                )
+            )
+    db.commit()
+    db.close()
+
+
+def pendientes_por_canal(Session) -> dict:
+    db = Session()
+    try:
+        filas = (
+            db.query(Notificacion.tipo, func.count(Notificacion.id))
+            .filter(Notificacion.estado == EstadoNotificacionEnum.PENDIENTE)
+            .group_by(Notificacion.tipo)
+            .all()
+        )
+    finally:
+        db.close()
+    return {tipo: n for tipo, n in filas}
+
+
+async def despachar(Session, dispatcher) -> dict:
+    """Corre un despachador por canal hasta vaciar el outbox; retorna segundos por canal"""
+    workers = {
+        tipo: NotificationWorker(
+            session_factory=Session, workers=1, batch_size=pool.batch_size * pool.concurrencia,
+            poll_interval=0.05, tipos=[tipo], canales=dispatcher
+        )
+        for tipo, pool in dispatcher.pools.items()
+    }
+    dispatcher.start()
+    inicio = time.perf_counter()
+    for worker in workers.values():
+        worker.start()
+
+    tiempos = {}
+    while len(tiempos) < len(workers):
+        pendientes = await asyncio.to_thread(pendientes_por_canal, Session)
+        for tipo in workers:
+            if tipo not in tiempos and not pendientes.get(tipo):
+                tiempos[tipo] = time.perf_counter() - inicio
+        await asyncio.sleep(0.05)
+
+    for worker in workers.values():
+        await worker.stop()
+    await dispatcher.stop()
+    return tiempos
+
+
+def main(total: int, transporte: str, latencia_ms: float, tasa_fallos: float):
+    stub = None
+    with tempfile.TemporaryDirectory() as directorio:
+        if transporte == "http":
+            stub = iniciar_stub(latencia_ms=latencia_ms, tasa_fallos=tasa_fallos)
+            dispatcher = crear_dispatcher(TransporteHTTP(stub.url))
+            destino = f"stub HTTP {stub.url} (latencia {latencia_ms:.0f} ms, fallos {tasa_fallos:.0%})"
+        else:
+            dispatcher = crear_dispatcher(TransporteArchivo(os.path.join(directorio, "canales")))
+            destino = "archivos JSONL"
+
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directorio, 'bench.db')}", connect_args={"timeout": 30}
+        )
+        Notificacion.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+        encolar(Session, total)
+
+        print(f"{total} notificaciones por canal -> {destino}")
+        tiempos = asyncio.run(despachar(Session, dispatcher))
+
+        db = Session()
+        estados = dict(
+            ((tipo, estado), n) for tipo, estado, n in
+            db.query(Notificacion.tipo, Notificacion.estado, func.count(Notificacion.id))
+            .group_by(Notificacion.tipo, Notificacion.estado).all()
+        )
+        db.close()
+
+        print(f"{'canal':<10} {'enviadas':>8} {'error':>6} {'seg':>7} {'msg/s':>9} {'límite':>8} "
+              f"{'peticiones':>10} {'espera (suma)':>14}")
+        for tipo, pool in dispatcher.pools.items():
+            enviadas = estados.get((tipo, EstadoNotificacionEnum.ENVIADO), 0)
+            errores = estados.get((tipo, EstadoNotificacionEnum.ERROR), 0)
+            limite = f"{pool.tasa_por_segundo:,.0f}/s" if pool.tasa_por_segundo else "-"
+            print(f"{tipo.value:<10} {enviadas:>8} {errores:>6} {tiempos[tipo]:>7.2f} "
+                  f"{enviadas / tiempos[tipo]:>9,.0f} {limite:>8} {pool.peticiones:>10} "
+                  f"{pool.espera_limite_s:>13.2f}s")
+
+    if stub is not None:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    modo = sys.argv[2] if len(sys.argv) > 2 else "http"
+    latencia = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    fallos = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    main(n, modo, latencia, fallos)
@@ -0,0 +1,46 @@
+"""
+Benchmark de la caché de JWT decodificados
+Mide el costo por petición de decodificar y validar el mismo access token
+con y sin caché (verificación HMAC + parseo de claims vs. acierto en la LRU)
+
+Uso: python scripts/bench_jwt_cache.py [peticiones] [tokens_distintos]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from config import settings
+from services.auth_service import AuthService
+from utils.token_cache import TokenCache, decodificar_jwt
+
+
+def medir(tokens, peticiones: int, cache) -> float:
+    algoritmos = [settings.ALGORITHM]
+    inicio = time.perf_counter()
+    for i in range(peticiones):
+        decodificar_jwt(tokens[i % len(tokens)], settings.SECRET_KEY, algoritmos, cache)
+    return (time.perf_counter() - inicio) / peticiones
+
+
+def main(peticiones: int, distintos: int):
+    tokens = [
+        AuthService.create_access_token({"sub": f"usuario{i}", "usuario_id": i, "roles": ["profesional"]})
+        for i in range(distintos)
+    ]
+
+    sin_cache = medir(tokens, peticiones, None)
+    cache = TokenCache(max_size=10000)
+    con_cache = medir(tokens, peticiones, cache)
+
+    print(f"{peticiones} decodificaciones, {distintos} tokens distintos")
+    print(f"Sin caché: {sin_cache * 1e6:8.2f} µs/petición")
+    print(f"Con caché: {con_cache * 1e6:8.2f} µs/petición  ({sin_cache / con_cache:.1f}x)  {cache.stats()}")
+
+
+if __name__ == "__main__":
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    distintos = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    main(peticiones, distintos)
@@ -0,0 +1,81 @@
+"""
+Benchmark de verificación de contraseñas bajo carga concurrente
+Compara bcrypt en línea (threadpool, sujeto al GIL) contra el pool de procesos
+y reporta logins/segundo, rechazos 503 y espera en cola
+
+Uso: python scripts/bench_login.py [logins] [hilos] [procesos]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from services.password_pool import PasswordHasherPool, pwd_context
+
+
+def ejecutar(pool: PasswordHasherPool, hashed: str, total: int, hilos: int) -> dict:
+    rechazados = 0
+    latencias = []
+
+    def login(_):
+        inicio = time.perf_counter()
+        try:
+            assert pool.verify("Admin123!", hashed)
+        except HTTPException:
+            return None
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for resultado in executor.map(login, range(total)):
+            if resultado is None:
+                rechazados += 1
+            else:
+                latencias.append(resultado)
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "ok": len(latencias),
+        "rechazados": rechazados,
+        "logins_s": len(latencias) / duracion,
+        "p50_ms": latencias[len(latencias) // 2] * 1000 if latencias else 0.0,
+        "p95_ms": latencias[int(len(latencias) * 0.95)] * 1000 if latencias else 0.0,
+    }
+
+
+def imprimir(nombre: str, r: dict, pool: PasswordHasherPool) -> None:
+    stats = pool.stats()
+    print(f"{nombre:<28} {r['logins_s']:8.1f} logins/s  p50={r['p50_ms']:7.1f}ms  "
+          f"p95={r['p95_ms']:7.1f}ms  ok={r['ok']}  503={r['rechazados']}  "
+          f"espera_prom={stats['avg_queue_wait_ms']}ms  espera_max={stats['max_queue_wait_ms']}ms")
+
+
+def main(total: int, hilos: int, procesos: int):
+    hashed = pwd_context.hash("Admin123!")
+    print(f"{total} logins, {hilos} hilos concurrentes, {os.cpu_count()} CPUs\n")
+
+    en_linea = PasswordHasherPool(workers=0)
+    imprimir("En línea", ejecutar(en_linea, hashed, total, hilos), en_linea)
+
+    pool = PasswordHasherPool(workers=procesos, max_pending=hilos)
+    pool.start()
+    imprimir(f"Pool ({procesos} procesos)", ejecutar(pool, hashed, total, hilos), pool)
+    pool.shutdown()
+
+    # Admisión acotada: más hilos que cupos, el exceso recibe 503 inmediato
+    acotado = PasswordHasherPool(workers=procesos, max_pending=procesos * 2)
+    acotado.start()
+    imprimir(f"Pool (max_pending={procesos * 2})", ejecutar(acotado, hashed, total, hilos), acotado)
+    acotado.shutdown()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    procesos = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 2)
+    main(total, hilos, procesos)
@@ -0,0 +1,94 @@
+"""
+Benchmark de envío de emails contra el stub local de SendGrid
+Compara send_email (una petición HTTP y dos commits por destinatario) con
+enviar_lote (peticiones de hasta SENDGRID_MAX_PERSONALIZACIONES
+destinatarios y un solo UPDATE + commit para todo el lote), sobre SQLite
+en un archivo temporal.
+
+Uso: python scripts/bench_notificaciones_lote.py [notificaciones] [latencia_ms]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import tempfile
+import time
+from sendgrid import SendGridAPIClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from models.notificaciones import (
+    Notificacion, TipoNotificacionEnum, EstadoNotificacionEnum, PlantillaNotificacionEnum
+)
+from services.notification_service import NotificationService
+from scripts.sendgrid_stub import iniciar_stub
+
+logging.disable(logging.WARNING)
+
+
+def contador_commits(engine) -> dict:
+    conteo = {"commits": 0}
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        conteo["commits"] += 1
+
+    return conteo
+
+
+def contenido(i: int) -> dict:
+    return {
+        "destinatario": f"paciente{i}@example.com",
+        "asunto": "Recordatorio de Cita Médica",
+        "mensaje": f"<p>Estimado/a Paciente {i}, le recordamos su cita de mañana a las 09:00.</p>",
+        "plantilla": PlantillaNotificacionEnum.RECORDATORIO_CITA,
+    }
+
+
+def main(total: int, latencia_ms: float):
+    stub = iniciar_stub(latencia_ms=latencia_ms)
+    service = NotificationService()
+    service.sg_client = SendGridAPIClient("stub", host=stub.url)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = create_engine(f"sqlite:///{os.path.join(directorio, 'bench.db')}")
+        Notificacion.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+        commits = contador_commits(engine)
+
+        # Por destinatario
+        db = Session()
+        inicio = time.perf_counter()
+        for i in range(total):
+            service.send_email(db=db, **contenido(i))
+        individual = time.perf_counter() - inicio
+        db.close()
+        print(f"send_email:  {total} emails en {individual:.2f}s = {total / individual:,.0f} emails/s "
+              f"({stub.peticiones} peticiones HTTP, {commits['commits']} commits)")
+
+        # Por lote: las filas ya están en el outbox como PENDIENTE
+        db = Session()
+        for i in range(total):
+            db.add(Notificacion(tipo=TipoNotificacionEnum.EMAIL, estado=EstadoNotificacionEnum.PENDIENTE, **contenido(i)))
+        db.commit()
+        pendientes = db.query(Notificacion).filter(Notificacion.estado == EstadoNotificacionEnum.PENDIENTE).all()
+        stub.peticiones = commits["commits"] = 0
+
+        inicio = time.perf_counter()
+        resultado = service.enviar_lote(db, pendientes)
+        db.commit()
+        lote = time.perf_counter() - inicio
+        db.close()
+        print(f"enviar_lote: {resultado['enviadas']} emails en {lote:.2f}s = {resultado['enviadas'] / lote:,.0f} emails/s "
+              f"({stub.peticiones} peticiones HTTP, {commits['commits']} commits)")
+        print(f"Aceleración: {individual / lote:.1f}x")
+
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    main(n, latencia)
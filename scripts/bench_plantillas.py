@@ -0,0 +1,93 @@
+"""
+Benchmark de renderizado de plantillas de notificación
+Renderiza N confirmaciones de cita con:
+- el f-string en línea original (sin escapar HTML)
+- str.format sobre el texto fuente, escapando cada valor (sin precompilar)
+- el registro precompilado (services.notification_templates), uno a uno y en lote
+y compara el tamaño del mensaje HTML guardado antes con el del payload solo.
+
+Uso: python scripts/bench_plantillas.py [mensajes]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import html
+import json
+import time
+from datetime import datetime, timedelta
+from models.notificaciones import PlantillaNotificacionEnum
+from services.notification_templates import PLANTILLAS, plantillas
+
+PLANTILLA = PlantillaNotificacionEnum.CONFIRMACION_CITA
+
+
+def f_string_original(nombre_paciente: str, fecha_cita: datetime, profesional: str, unidad: str) -> str:
+    """Cuerpo como lo armaba send_cita_confirmacion antes del registro"""
+    return f"""
+        <h2>Confirmación de Cita</h2>
+        <p>Estimado/a {nombre_paciente},</p>
+        <p>Su cita ha sido confirmada con los siguientes detalles:</p>
+        <ul>
+            <li><strong>Fecha y hora:</strong> {fecha_cita.strftime('%d/%m/%Y %H:%M')}</li>
+            <li><strong>Profesional:</strong> {profesional}</li>
+            <li><strong>Ubicación:</strong> {unidad}</li>
+        </ul>
+        <p>Por favor llegue 15 minutos antes de su cita.</p>
+        <p>Saludos,<br>Sistema Médico</p>
+        """
+
+
+def format_sin_compilar(payload: dict) -> str:
+    """Lo que haría un motor sin precompilar: parsear el texto en cada render"""
+    fuente = PLANTILLAS[PLANTILLA][1].replace("{fecha_cita:fecha}", "{fecha_cita}")
+    valores = {k: html.escape(str(v)) for k, v in payload.items()}
+    valores["fecha_cita"] = datetime.fromisoformat(payload["fecha_cita"]).strftime("%d/%m/%Y %H:%M")
+    return fuente.format(**valores)
+
+
+def crear_payloads(n: int):
+    inicio = datetime(2030, 1, 15, 8, 0)
+    return [
+        {
+            "nombre_paciente": f"Paciente {i} Pérez",
+            "fecha_cita": (inicio + timedelta(minutes=20 * (i % 2000))).isoformat(),
+            "profesional": f"Dr. Profesional {i % 50}",
+            "unidad": f"Sede {i % 5}",
+        }
+        for i in range(n)
+    ]
+
+
+def medir(nombre: str, funcion, n: int):
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:<28} {segundos * 1000:8.1f} ms  {n / segundos:>12,.0f} mensajes/s")
+    return segundos
+
+
+def main(n: int):
+    payloads = crear_payloads(n)
+    argumentos = [
+        (p["nombre_paciente"], datetime.fromisoformat(p["fecha_cita"]), p["profesional"], p["unidad"])
+        for p in payloads
+    ]
+
+    print(f"{n:,} confirmaciones de cita")
+    medir("f-string original", lambda: [f_string_original(*a) for a in argumentos], n)
+    medir("str.format sin compilar", lambda: [format_sin_compilar(p) for p in payloads], n)
+    medir("precompilada", lambda: [plantillas.renderizar(PLANTILLA, p) for p in payloads], n)
+    medir("precompilada en lote", lambda: plantillas.renderizar_lote(PLANTILLA, payloads), n)
+
+    html_guardado = sum(len(f_string_original(*a).encode("utf-8")) for a in argumentos)
+    payload_guardado = sum(len(json.dumps(p).encode("utf-8")) for p in payloads)
+    print(f"Almacenamiento: mensaje+payload {(html_guardado + payload_guardado) / n:.0f} B/fila "
+          f"-> solo payload {payload_guardado / n:.0f} B/fila "
+          f"({(1 - payload_guardado / (html_guardado + payload_guardado)) * 100:.0f}% menos)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,84 @@
+"""
+Benchmark de serialización de listados
+Compara, sobre N registros en memoria, el camino original (to_dict por
+reflexión + ResponseSchema + jsonable_encoder + json.dumps, como hace
+FastAPI sin response_model) contra el serializador compilado + RespuestaJSON
+
+Uso: python scripts/bench_serializacion.py [registros] [repeticiones]
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from models.facturacion import Factura, EstadoFacturaEnum
+from schemas.base import ResponseSchema
+from utils.serializacion import RespuestaJSON, orjson, serializar_lista
+
+
+def to_dict_reflexion(obj) -> dict:
+    """to_dict original: recorre __table__.columns en cada registro"""
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+def camino_original(registros) -> bytes:
+    respuesta = ResponseSchema(success=True, data=[to_dict_reflexion(r) for r in registros])
+    contenido = jsonable_encoder(respuesta)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def camino_compilado(registros) -> bytes:
+    return RespuestaJSON(ResponseSchema(success=True, data=serializar_lista(registros))).body
+
+
+def crear_registros(n: int):
+    ahora = datetime.now(timezone.utc)
+    return [
+        Factura(
+            id=i,
+            numero=f"F-{i:08d}",
+            moneda="USD",
+            persona_id=i % 500,
+            fecha_emision=date(2026, 1, 1),
+            subtotal=Decimal("100.50"),
+            impuestos_total=Decimal("12.06"),
+            total=Decimal("112.56"),
+            estado=EstadoFacturaEnum.EMITIDA,
+            created_at=ahora,
+            updated_at=ahora,
+            is_active=True,
+        )
+        for i in range(n)
+    ]
+
+
+def medir(funcion, registros, repeticiones: int) -> float:
+    funcion(registros)  # calentamiento (compila el serializador)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(registros)
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main(n: int, repeticiones: int):
+    registros = crear_registros(n)
+    assert json.loads(camino_original(registros)) == json.loads(camino_compilado(registros))
+
+    original = medir(camino_original, registros, repeticiones)
+    compilado = medir(camino_compilado, registros, repeticiones)
+
+    print(f"{n} facturas, {repeticiones} repeticiones, backend JSON: {'orjson' if orjson else 'json'}")
+    print(f"to_dict + ResponseSchema + jsonable_encoder: {original * 1e3:8.2f} ms")
+    print(f"Serializador compilado + RespuestaJSON:      {compilado * 1e3:8.2f} ms  ({original / compilado:.1f}x)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main(n, repeticiones)
@@ -0,0 +1,101 @@
+"""
+Servidor HTTP local para el transporte "http" de services.notification_channels
+POST /<canal> (sms, whatsapp, push) con {"mensajes": [...]} responde
+{"ids": [...]} en el mismo orden. Cuenta peticiones y mensajes por canal,
+con latencia opcional por petición y una tasa de fallos (HTTP 503) para
+ejercitar los reintentos.
+
+Uso: python scripts/canales_stub.py [puerto] [latencia_ms] [tasa_fallos]
+     NOTIFICATION_CHANNEL_TRANSPORT=http NOTIFICATION_CHANNEL_HTTP_URL=http://127.0.0.1:8026 uvicorn main:app
+"""
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+CANALES = {"sms", "whatsapp", "push"}
+
+
+class CanalesStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int], latencia_ms: float = 0.0, tasa_fallos: float = 0.0):
+        super().__init__(direccion, _Handler)
+        self.latencia_ms = latencia_ms
+        self.tasa_fallos = tasa_fallos
+        self.peticiones = Counter()
+        self.mensajes = Counter()
+        self.fallos = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        canal = self.path.strip("/")
+        if canal not in CANALES:
+            self._responder(404, {"error": "canal desconocido"})
+            return
+        try:
+            mensajes = json.loads(cuerpo)["mensajes"]
+            if not isinstance(mensajes, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            self._responder(400, {"error": "cuerpo inválido"})
+            return
+
+        if self.server.latencia_ms:
+            time.sleep(self.server.latencia_ms / 1000)
+        if self.server.tasa_fallos and random.random() < self.server.tasa_fallos:
+            with self.server._lock:
+                self.server.fallos[canal] += len(mensajes)
+            self._responder(503, {"error": "no disponible"})
+            return
+        with self.server._lock:
+            self.server.peticiones[canal] += 1
+            self.server.mensajes[canal] += len(mensajes)
+        self._responder(200, {"ids": [f"{canal}-{uuid.uuid4().hex}" for _ in mensajes]})
+
+    def _responder(self, codigo: int, datos: dict):
+        cuerpo = json.dumps(datos).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_stub(puerto: int = 0, latencia_ms: float = 0.0, tasa_fallos: float = 0.0) -> CanalesStub:
+    """Arranca el stub en un hilo (puerto 0 = libre) y lo retorna"""
+    servidor = CanalesStub(("127.0.0.1", puerto), latencia_ms, tasa_fallos)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else 8026
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    fallos = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    servidor = CanalesStub(("127.0.0.1", puerto), latencia, fallos)
+    print(f"Stub de canales en {servidor.url} (latencia {latencia:.0f} ms, fallos {fallos:.0%})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        for canal in sorted(CANALES):
+            print(f"{canal}: {servidor.peticiones[canal]} peticiones, {servidor.mensajes[canal]} mensajes, "
+                  f"{servidor.fallos[canal]} fallidos")
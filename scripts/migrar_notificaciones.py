@@ -0,0 +1,114 @@
+"""
+Script para actualizar la tabla notificaciones en una BD existente
+create_all no modifica tablas ya creadas; este script agrega lo que falte
+y se puede ejecutar más de una vez (cada paso revisa el esquema antes).
+
+Equivale en MySQL a:
+
+    ALTER TABLE notificaciones MODIFY estado
+        ENUM('PENDIENTE','ENVIADO','ENTREGADO','ERROR','REBOTADO','DESCARTADO') NOT NULL;
+    ALTER TABLE notificaciones ADD COLUMN fecha_proximo_intento DATETIME NULL;
+    CREATE INDEX ix_notificaciones_estado_proximo_intento
+        ON notificaciones (estado, fecha_proximo_intento);
+    ALTER TABLE notificaciones ADD COLUMN clave_idempotencia VARCHAR(100) NULL;
+    CREATE UNIQUE INDEX uq_notificaciones_clave_idempotencia
+        ON notificaciones (clave_idempotencia);
+
+Ejecutar antes de desplegar la versión con reintentos y recordatorios (los
+SELECT sobre Notificacion fallan mientras falten las columnas). Las filas en
+ERROR sin fecha_proximo_intento las adopta el RetryScheduler al arrancar. El
+índice único es el que impide duplicar recordatorios entre workers: sin él
+el INSERT IGNORE del ReminderScheduler no descarta nada.
+
+Uso: python scripts/migrar_notificaciones.py
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from typing import List
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from models.notificaciones import EstadoNotificacionEnum
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLA = "notificaciones"
+
+
+def _estado(engine: Engine, insp) -> List[str]:
+    # Solo MySQL guarda el ENUM en el esquema; en otros motores es VARCHAR
+    if engine.dialect.name != "mysql":
+        return []
+    columna = next(c for c in insp.get_columns(TABLA) if c["name"] == "estado")
+    valores = [e.value for e in EstadoNotificacionEnum]
+    if set(valores) <= set(getattr(columna["type"], "enums", valores)):
+        return []
+    lista = ", ".join(f"'{v}'" for v in valores)
+    return [f"ALTER TABLE {TABLA} MODIFY estado ENUM({lista}) NOT NULL"]
+
+
+def _fecha_proximo_intento(engine: Engine, insp) -> List[str]:
+    if any(c["name"] == "fecha_proximo_intento" for c in insp.get_columns(TABLA)):
+        return []
+    return [f"ALTER TABLE {TABLA} ADD COLUMN fecha_proximo_intento DATETIME NULL"]
+
+
+def _indice_reintentos(engine: Engine, insp) -> List[str]:
+    if any(i["name"] == "ix_notificaciones_estado_proximo_intento" for i in insp.get_indexes(TABLA)):
+        return []
+    return [
+        f"CREATE INDEX ix_notificaciones_estado_proximo_intento ON {TABLA} (estado, fecha_proximo_intento)"
+    ]
+
+
+def _clave_idempotencia(engine: Engine, insp) -> List[str]:
+    sentencias = []
+    if not any(c["name"] == "clave_idempotencia" for c in insp.get_columns(TABLA)):
+        sentencias.append(f"ALTER TABLE {TABLA} ADD COLUMN clave_idempotencia VARCHAR(100) NULL")
+    # La unicidad puede venir de create_all (UNIQUE en la columna) o de este script
+    unicas = [i["column_names"] for i in insp.get_indexes(TABLA) if i["unique"]]
+    unicas += [u["column_names"] for u in insp.get_unique_constraints(TABLA)]
+    if ["clave_idempotencia"] not in unicas:
+        sentencias.append(
+            f"CREATE UNIQUE INDEX uq_notificaciones_clave_idempotencia ON {TABLA} (clave_idempotencia)"
+        )
+    return sentencias
+
+
+# Pasos en orden; cada uno retorna las sentencias pendientes
+PASOS = [_estado, _fecha_proximo_intento, _indice_reintentos, _clave_idempotencia]
+
+
+def migrar(engine: Engine) -> List[str]:
+    """Aplica los pasos pendientes y retorna las sentencias ejecutadas"""
+    ejecutadas = []
+    for paso in PASOS:
+        # Se vuelve a inspeccionar en cada paso: el anterior pudo cambiar la tabla
+        sentencias = paso(engine, inspect(engine))
+        with engine.begin() as conn:
+            for sentencia in sentencias:
+                conn.execute(text(sentencia))
+                ejecutadas.append(sentencia)
+    return ejecutadas
+
+
+def main():
+    from database import engine
+
+    try:
+        ejecutadas = migrar(engine)
+    except Exception as e:
+        logger.error(f"Error migrando {TABLA}: {e}", exc_info=True)
+        return
+    for sentencia in ejecutadas:
+        logger.info(f"  {sentencia}")
+    logger.info(f"✅ {TABLA} al día ({len(ejecutadas)} cambios)")
+
+
+if __name__ == "__main__":
+    main()
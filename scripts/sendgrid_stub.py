@@ -0,0 +1,84 @@
+"""
+Servidor HTTP local que imita POST /v3/mail/send de SendGrid
+Responde 202 con X-Message-Id y cuenta peticiones y destinatarios
+(personalizations), con una latencia opcional por petición para simular
+la red. Sirve para medir el envío de notificaciones sin salir a internet.
+
+Uso: python scripts/sendgrid_stub.py [puerto] [latencia_ms]
+     SENDGRID_API_HOST=http://127.0.0.1:8025 SENDGRID_API_KEY=stub uvicorn main:app
+"""
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class SendGridStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int], latencia_ms: float = 0.0):
+        super().__init__(direccion, _Handler)
+        self.latencia_ms = latencia_ms
+        self.peticiones = 0
+        self.destinatarios = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/v3/mail/send":
+            self._responder(404, b'{"errors":[{"message":"not found"}]}')
+            return
+        try:
+            mensaje = json.loads(cuerpo)
+            destinatarios = sum(len(p.get("to", [])) for p in mensaje["personalizations"])
+        except (ValueError, KeyError, TypeError):
+            self._responder(400, b'{"errors":[{"message":"invalid body"}]}')
+            return
+
+        if self.server.latencia_ms:
+            time.sleep(self.server.latencia_ms / 1000)
+        with self.server._lock:
+            self.server.peticiones += 1
+            self.server.destinatarios += destinatarios
+        self._responder(202, b"", {"X-Message-Id": uuid.uuid4().hex})
+
+    def _responder(self, codigo: int, cuerpo: bytes, headers: dict = None):
+        self.send_response(codigo)
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_stub(puerto: int = 0, latencia_ms: float = 0.0) -> SendGridStub:
+    """Arranca el stub en un hilo (puerto 0 = libre) y lo retorna"""
+    servidor = SendGridStub(("127.0.0.1", puerto), latencia_ms)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else 8025
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    servidor = SendGridStub(("127.0.0.1", puerto), latencia)
+    print(f"Stub de SendGrid en {servidor.url} (latencia {latencia:.0f} ms)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{servidor.peticiones} peticiones, {servidor.destinatarios} destinatarios")
@@ -0,0 +1,172 @@
+"""
+Spool local de auditoría
+Archivo de solo-anexado con registros prefijados por longitud donde se
+guardan los lotes de BitacoraAcceso cuando la base de datos no responde.
+Un reproductor los carga de vuelta por lotes cuando la BD se recupera.
+
+Formato: [4 bytes big-endian con la longitud][JSON UTF-8] por registro
+"""
+import json
+import logging
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from config import settings
+from models.auditoria import TipoAccionEnum
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decodificar(data: bytes) -> Dict:
+    registro = json.loads(data)
+    if registro.get("created_at"):
+        registro["created_at"] = datetime.fromisoformat(registro["created_at"])
+    if registro.get("accion"):
+        registro["accion"] = TipoAccionEnum(registro["accion"])
+    return registro
+
+
+class AuditSpool:
+    """
+    Spool durable para registros de auditoría
+    - append_batch(): escribe un lote completo con un solo write + fsync
+    - replay(): mueve el spool a un archivo de reproducción y lo carga por
+      lotes, guardando el offset confirmado para reanudar tras un fallo
+    """
+
+    def __init__(
+        self,
+        path: str = settings.AUDIT_SPOOL_PATH,
+        replay_batch_size: int = settings.AUDIT_SPOOL_REPLAY_BATCH_SIZE
+    ):
+        self.path = path
+        self.replay_path = path + ".replay"
+        self.offset_path = path + ".offset"
+        self.replay_batch_size = replay_batch_size
+
+        self._lock = threading.Lock()
+        self._file = None
+
+        # Contadores
+        self.spooled = 0
+        self.replayed = 0
+
+    def _abrir(self):
+        if self._file is None:
+            directorio = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directorio, exist_ok=True)
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def _cerrar(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append_batch(self, registros: List[Dict]) -> None:
+        """Anexa un lote con un único fsync"""
+        buffer = bytearray()
+        for registro in registros:
+            data = json.dumps(registro, default=_json_default, separators=(",", ":")).encode("utf-8")
+            buffer += _HEADER.pack(len(data))
+            buffer += data
+
+        with self._lock:
+            f = self._abrir()
+            f.write(buffer)
+            f.flush()
+            os.fsync(f.fileno())
+            self.spooled += len(registros)
+
+    def pending(self) -> bool:
+        """Indica si hay registros esperando ser reproducidos"""
+        if os.path.exists(self.replay_path):
+            return True
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    @staticmethod
+    def _leer(path: str, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Itera (offset_siguiente, registro); ignora un registro final truncado"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                (longitud,) = _HEADER.unpack(header)
+                data = f.read(longitud)
+                if len(data) < longitud:
+                    logger.warning(f"Registro truncado al final de {path}, se descarta")
+                    return
+                offset += _HEADER.size + longitud
+                yield offset, _decodificar(data)
+
+    def _leer_offset(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _guardar_offset(self, offset: int) -> None:
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+
+    def replay(self, insert_func: Callable[[List[Dict]], None]) -> int:
+        """
+        Carga el spool en la base de datos con insert_func por lotes
+        Si insert_func falla, la excepción se propaga y la próxima llamada
+        reanuda desde el último lote confirmado
+        """
+        with self._lock:
+            # Los nuevos registros irán a un spool nuevo mientras se reproduce
+            if not os.path.exists(self.replay_path):
+                if not (os.path.exists(self.path) and os.path.getsize(self.path) > 0):
+                    return 0
+                self._cerrar()
+                os.replace(self.path, self.replay_path)
+
+        cargados = 0
+        offset = self._leer_offset()
+        lote: List[Dict] = []
+        for siguiente, registro in self._leer(self.replay_path, offset):
+            lote.append(registro)
+            if len(lote) >= self.replay_batch_size:
+                insert_func(lote)
+                cargados += len(lote)
+                self._guardar_offset(siguiente)
+                lote = []
+        if lote:
+            insert_func(lote)
+            cargados += len(lote)
+
+        os.remove(self.replay_path)
+        if os.path.exists(self.offset_path):
+            os.remove(self.offset_path)
+
+        self.replayed += cargados
+        logger.info(f"Spool de auditoría reproducido: {cargados} registros")
+        return cargados
+
+    def close(self) -> None:
+        with self._lock:
+            self._cerrar()
+
+
+# Instancia global del spool
+audit_spool = AuditSpool()
@@ -0,0 +1,209 @@
+"""
+Escritor asíncrono de auditoría
+Acumula registros de BitacoraAcceso en una cola acotada en memoria
+y los inserta por lotes desde una tarea en segundo plano.
+Si la BD falla, los lotes van al spool local y se reproducen al recuperarse.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from config import settings
+from database import SessionLocal
+from models.auditoria import BitacoraAcceso
+from services.audit_spool import AuditSpool, audit_spool
+
+logger = logging.getLogger(__name__)
+
+
+def insertar_lote_bitacora(registros: List[Dict]) -> None:
+    """Inserta un lote de registros con un único INSERT multi-fila"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(BitacoraAcceso.__table__), registros)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class AuditWriter:
+    """
+    Cola acotada de registros de auditoría
+    - enqueue() nunca bloquea: si la cola está llena el registro se descarta
+    - Una tarea en segundo plano vacía la cola por tamaño o por tiempo
+    - Las inserciones se ejecutan en un hilo para no bloquear el event loop
+    - Si la BD falla, el lote va al spool y durante db_retry_seconds no se
+      vuelve a intentar la BD (evita esperar conexiones fallidas en cada lote)
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[List[Dict]], None] = insertar_lote_bitacora,
+        max_queue_size: int = settings.AUDIT_QUEUE_MAX_SIZE,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval: float = settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+        spool: Optional[AuditSpool] = None,
+        db_retry_seconds: float = settings.AUDIT_DB_RETRY_SECONDS
+    ):
+        self.flush_func = flush_func
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.db_retry_seconds = db_retry_seconds
+        self._db_down_until = 0.0
+
+        self._queue: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Contadores
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.db_failures = 0
+        self.flush_count = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, registro: Dict) -> bool:
+        """Agrega un registro a la cola sin bloquear"""
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return False
+
+        self._queue.append(registro)
+        self.enqueued += 1
+
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        lote = []
+        while self._queue and len(lote) < self.batch_size:
+            lote.append(self._queue.popleft())
+        return lote
+
+    def _db_disponible(self) -> bool:
+        return time.monotonic() >= self._db_down_until
+
+    def _a_spool(self, lote: List[Dict]) -> None:
+        try:
+            self.spool.append_batch(lote)
+        except Exception as e:
+            self.failed += len(lote)
+            logger.error(f"Error escribiendo spool de auditoría ({len(lote)} registros): {e}")
+
+    def _write_batch(self, lote: List[Dict]) -> None:
+        """Escribe un lote y actualiza las métricas de latencia"""
+        inicio = time.perf_counter()
+        try:
+            if self.spool is not None and not self._db_disponible():
+                self._a_spool(lote)
+                return
+            self.flush_func(lote)
+            self.flushed += len(lote)
+        except Exception as e:
+            self.db_failures += 1
+            self._db_down_until = time.monotonic() + self.db_retry_seconds
+            if self.spool is not None:
+                logger.warning(f"BD no disponible, lote de auditoría enviado al spool: {e}")
+                self._a_spool(lote)
+            else:
+                self.failed += len(lote)
+                logger.error(f"Error guardando lote de auditoría ({len(lote)} registros): {e}")
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.flush_count += 1
+            self.last_flush_seconds = duracion
+            self.total_flush_seconds += duracion
+            self.max_flush_seconds = max(self.max_flush_seconds, duracion)
+
+    def _replay_spool(self) -> None:
+        """Reproduce el spool hacia la BD si está disponible"""
+        if self.spool is None or not self._db_disponible() or not self.spool.pending():
+            return
+        try:
+            self.spool.replay(self.flush_func)
+        except Exception as e:
+            self.db_failures += 1
+            self._db_down_until = time.monotonic() + self.db_retry_seconds
+            logger.warning(f"No se pudo reproducir el spool de auditoría: {e}")
+
+    async def flush(self) -> None:
+        """Vacía la cola completa en lotes de batch_size"""
+        while self._queue:
+            lote = self._take_batch()
+            await asyncio.to_thread(self._write_batch, lote)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            await asyncio.to_thread(self._replay_spool)
+
+    def start(self) -> None:
+        """Arranca la tarea de vaciado (llamar dentro del event loop)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._db_down_until = 0.0
+        self._task = asyncio.create_task(self._run())
+        logger.info("Escritor de auditoría iniciado")
+
+    async def stop(self) -> None:
+        """Detiene la tarea y escribe lo que quede en la cola"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+        pendientes = len(self._queue)
+        await self.flush()
+        if self.spool is not None:
+            self.spool.close()
+        logger.info(f"Escritor de auditoría detenido ({pendientes} registros vaciados al cerrar)")
+
+    def stats(self) -> Dict:
+        """Contadores de la cola para monitoreo"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_size": self.max_queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "db_failures": self.db_failures,
+            "spooled": self.spool.spooled if self.spool is not None else 0,
+            "replayed": self.spool.replayed if self.spool is not None else 0,
+            "spool_pending": self.spool.pending() if self.spool is not None else False,
+            "flush_count": self.flush_count,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            "avg_flush_ms": round(self.total_flush_seconds * 1000 / self.flush_count, 3) if self.flush_count else 0.0
+        }
+
+
+# Instancia global del escritor
+audit_writer = AuditWriter(spool=audit_spool)
@@ -5,14 +5,19 @@ Maneja login, registro, tokens y permisos RBAC
 from datetime import datetime, timedelta
 from typing import Optional, List
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from config import settings
 from models.auditoria import Usuario, Rol, Permiso
+from services.permission_cache import permission_cache
+from services.permission_catalog import permission_catalog
+from utils.token_cache import TokenCache, decodificar_jwt
 
-# Contexto de encriptación
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Contexto de encriptación (bcrypt se ejecuta en el pool de procesos)
+from services.password_pool import password_pool
+
+# Caché de tokens decodificados (opcional)
+token_cache = TokenCache(settings.JWT_CACHE_MAX_SIZE) if settings.JWT_CACHE_ENABLED else None
 
 
 class AuthService:
@@ -21,12 +26,12 @@ class AuthService:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verifica contraseña contra hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_pool.verify(plain_password, hashed_password)
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Genera hash de contraseña"""
-        return pwd_context.hash(password)
+        return password_pool.hash(password)
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -43,6 +48,30 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
     
+    @staticmethod
+    def build_token_claims(db: Session, usuario_id: int, username: str, sid: Optional[str] = None) -> dict:
+        """
+        Claims de identidad para el access token
+        Con JWT_EMBED_PERMISSIONS agrega roles y el bitset de permisos
+        (perm) con la versión del catálogo (pv), para autorizar sin BD.
+        Los cambios de rol se reflejan al renovar el token.
+        sid es el jti de la sesión (refresh token) que emitió el token.
+        """
+        claims = {"sub": username, "usuario_id": usuario_id}
+        if sid is not None:
+            claims["sid"] = sid
+        
+        if settings.JWT_EMBED_PERMISSIONS:
+            entrada = permission_cache.obtener(db, usuario_id)
+            permission_catalog.asegurar(db)
+            claims.update({
+                "roles": sorted(entrada.roles),
+                "perm": permission_catalog.codificar(entrada.permisos),
+                "pv": permission_catalog.version
+            })
+        
+        return claims
+    
     @staticmethod
     def create_refresh_token(data: dict) -> str:
         """Crea token JWT de refresco"""
@@ -56,7 +85,7 @@ class AuthService:
     def decode_token(token: str) -> dict:
         """Decodifica y valida token JWT"""
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = decodificar_jwt(token, settings.SECRET_KEY, [settings.ALGORITHM], token_cache)
             return payload
         except JWTError:
             raise HTTPException(
@@ -105,17 +134,12 @@ class AuthService:
     
     @staticmethod
     def get_user_permissions(db: Session, usuario_id: int) -> List[str]:
-        """Obtiene lista de permisos del usuario"""
-        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
+        """Obtiene lista de permisos del usuario (vía caché de permisos)"""
+        entrada = permission_cache.obtener(db, usuario_id)
+        if not entrada:
             return []
         
-        permisos = set()
-        for rol in usuario.roles:
-            for permiso in rol.permisos:
-                permisos.add(permiso.clave)
-        
-        return list(permisos)
+        return list(entrada.permisos)
     
     @staticmethod
     def check_permission(db: Session, usuario_id: int, permiso_clave: str) -> bool:
@@ -0,0 +1,331 @@
+"""
+Índice de disponibilidad de agenda
+Por profesional mantiene un arreglo ordenado de intervalos libres,
+calculados a partir de los BloqueAgenda abiertos y las citas activas
+(SOLICITADA/CONFIRMADA) de cada bloque. Una búsqueda es un bisect por
+profesional más un merge por fecha de inicio, sin consultas a la BD.
+
+El índice se refresca de forma incremental: los eventos de SQLAlchemy
+sobre BloqueAgenda, Cita y Profesional marcan al profesional como sucio
+al confirmar la transacción y en la siguiente búsqueda sólo se recargan
+esos profesionales. Un TTL fuerza la reconstrucción completa para
+recoger cambios hechos por otros workers.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from config import settings
+from models.agenda_citas import BloqueAgenda, Cita, EstadoBloqueEnum, EstadoCitaEnum
+from models.identidades import Profesional, EstadoGeneralEnum
+
+ESTADOS_CITA_ACTIVA = (EstadoCitaEnum.SOLICITADA, EstadoCitaEnum.CONFIRMADA)
+
+# (inicio, fin, bloque_id, unidad_id)
+Intervalo = Tuple[datetime, datetime, int, int]
+
+
+def intervalos_libres(
+    inicio: datetime,
+    fin: datetime,
+    capacidad: int,
+    citas: Iterable[Tuple[datetime, datetime]]
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Tramos del bloque donde hay menos de `capacidad` citas simultáneas
+    Barrido sobre los extremos de las citas recortadas al bloque
+    """
+    eventos = []
+    for c_inicio, c_fin in citas:
+        c_inicio, c_fin = max(c_inicio, inicio), min(c_fin, fin)
+        if c_inicio < c_fin:
+            eventos.append((c_inicio, 1))
+            eventos.append((c_fin, -1))
+    eventos.sort()
+
+    libres = []
+    ocupacion = 0
+    desde = inicio
+    for instante, delta in eventos:
+        if ocupacion < capacidad and desde < instante:
+            libres.append((desde, instante))
+        ocupacion += delta
+        desde = instante
+    if ocupacion < capacidad and desde < fin:
+        libres.append((desde, fin))
+
+    # Unir tramos contiguos
+    unidos = []
+    for tramo in libres:
+        if unidos and unidos[-1][1] == tramo[0]:
+            unidos[-1] = (unidos[-1][0], tramo[1])
+        else:
+            unidos.append(tramo)
+    return unidos
+
+
+class AvailabilityIndex:
+    """Intervalos libres por profesional, en memoria del proceso"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = settings.AVAILABILITY_INDEX_TTL_SECONDS,
+        horizonte_dias: int = settings.AVAILABILITY_INDEX_HORIZON_DAYS
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.horizonte_dias = horizonte_dias
+
+        # profesional_id -> (intervalos ordenados por inicio, máximo acumulado de fin)
+        self._intervalos: Dict[int, Tuple[List[Intervalo], List[datetime]]] = {}
+        self._especialidad: Dict[int, str] = {}
+        self._por_especialidad: Dict[str, Set[int]] = defaultdict(set)
+
+        self._sucios: Set[int] = set()
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.reconstrucciones = 0
+        self.refrescos = 0
+        self.busquedas = 0
+        self.ultima_reconstruccion_ms = 0.0
+
+    # ==================== CARGA ====================
+
+    def _cargar(self, db: Session, profesional_ids: Optional[Set[int]] = None):
+        """Lee profesionales, bloques abiertos y citas activas del horizonte"""
+        ahora = datetime.utcnow()
+        limite = ahora + timedelta(days=self.horizonte_dias)
+
+        consulta_prof = select(Profesional.id, Profesional.especialidad).where(
+            Profesional.agenda_habilitada.is_(True),
+            Profesional.estado == EstadoGeneralEnum.ACTIVO,
+            Profesional.is_active.is_(True)
+        )
+        consulta_bloques = select(
+            BloqueAgenda.id, BloqueAgenda.profesional_id, BloqueAgenda.unidad_id,
+            BloqueAgenda.inicio, BloqueAgenda.fin, BloqueAgenda.capacidad
+        ).where(
+            BloqueAgenda.estado == EstadoBloqueEnum.ABIERTO,
+            BloqueAgenda.is_active.is_(True),
+            BloqueAgenda.fin > ahora,
+            BloqueAgenda.inicio < limite
+        )
+        consulta_citas = select(Cita.bloque_agenda_id, Cita.inicio, Cita.fin).where(
+            Cita.estado.in_(ESTADOS_CITA_ACTIVA),
+            Cita.bloque_agenda_id.isnot(None),
+            Cita.fin > ahora,
+            Cita.inicio < limite
+        )
+        if profesional_ids is not None:
+            consulta_prof = consulta_prof.where(Profesional.id.in_(profesional_ids))
+            consulta_bloques = consulta_bloques.where(BloqueAgenda.profesional_id.in_(profesional_ids))
+            consulta_citas = consulta_citas.where(Cita.profesional_id.in_(profesional_ids))
+
+        especialidades = {pid: (esp or "").strip().lower() for pid, esp in db.execute(consulta_prof)}
+
+        citas_por_bloque = defaultdict(list)
+        for bloque_id, c_inicio, c_fin in db.execute(consulta_citas):
+            citas_por_bloque[bloque_id].append((c_inicio, c_fin))
+
+        por_profesional = defaultdict(list)
+        # capacidad = citas simultáneas: un bloque con citas puede tener tramos libres
+        for bloque_id, prof_id, unidad_id, inicio, fin, capacidad in db.execute(consulta_bloques):
+            if prof_id not in especialidades:
+                continue
+            for l_inicio, l_fin in intervalos_libres(inicio, fin, capacidad, citas_por_bloque.get(bloque_id, ())):
+                por_profesional[prof_id].append((l_inicio, l_fin, bloque_id, unidad_id))
+
+        intervalos = {}
+        for prof_id, lista in por_profesional.items():
+            lista.sort()
+            max_fin, maximo = [], None
+            for intervalo in lista:
+                maximo = intervalo[1] if maximo is None or intervalo[1] > maximo else maximo
+                max_fin.append(maximo)
+            intervalos[prof_id] = (lista, max_fin)
+
+        return especialidades, intervalos
+
+    def reconstruir(self, db: Session) -> None:
+        """Reconstrucción completa del índice"""
+        inicio = time.perf_counter()
+        with self._lock:
+            sucios_previos = set(self._sucios)
+        especialidades, intervalos = self._cargar(db)
+
+        por_especialidad = defaultdict(set)
+        for prof_id, especialidad in especialidades.items():
+            por_especialidad[especialidad].add(prof_id)
+
+        with self._lock:
+            self._especialidad = especialidades
+            self._por_especialidad = por_especialidad
+            self._intervalos = intervalos
+            # Lo marcado durante la carga se vuelve a leer en la próxima búsqueda
+            self._sucios -= sucios_previos
+            self._expira = time.monotonic() + self.ttl_seconds
+            self.reconstrucciones += 1
+            self.ultima_reconstruccion_ms = (time.perf_counter() - inicio) * 1000
+
+    def refrescar(self, db: Session, profesional_ids: Set[int]) -> None:
+        """Recarga sólo los profesionales indicados"""
+        especialidades, intervalos = self._cargar(db, profesional_ids)
+        with self._lock:
+            for prof_id in profesional_ids:
+                anterior = self._especialidad.pop(prof_id, None)
+                if anterior is not None:
+                    self._por_especialidad[anterior].discard(prof_id)
+                self._intervalos.pop(prof_id, None)
+            for prof_id, especialidad in especialidades.items():
+                self._especialidad[prof_id] = especialidad
+                self._por_especialidad[especialidad].add(prof_id)
+            self._intervalos.update(intervalos)
+            self.refrescos += 1
+
+    def asegurar(self, db: Session) -> None:
+        """Reconstruye si expiró; si no, refresca los profesionales sucios"""
+        if time.monotonic() >= self._expira:
+            self.reconstruir(db)
+            return
+        with self._lock:
+            sucios, self._sucios = self._sucios, set()
+        if sucios:
+            self.refrescar(db, sucios)
+
+    def marcar(self, profesional_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._sucios.update(pid for pid in profesional_ids if pid is not None)
+
+    def invalidar(self) -> None:
+        """Fuerza reconstrucción completa en la próxima búsqueda"""
+        self._expira = 0.0
+
+    # ==================== BÚSQUEDA ====================
+
+    @staticmethod
+    def _libres_desde(
+        prof_id: int,
+        lista: List[Intervalo],
+        max_fin: List[datetime],
+        desde: datetime,
+        hasta: datetime,
+        duracion: timedelta,
+        unidad_id: Optional[int]
+    ):
+        # Los intervalos antes de i terminan todos antes de `desde`
+        i = bisect_right(max_fin, desde)
+        for inicio, fin, bloque_id, unidad in islice(lista, i, None):
+            if inicio >= hasta:
+                break
+            if unidad_id is not None and unidad != unidad_id:
+                continue
+            inicio = max(inicio, desde)
+            if fin - inicio >= duracion:
+                yield (inicio, fin, prof_id, bloque_id, unidad)
+
+    def buscar(
+        self,
+        db: Session,
+        desde: datetime,
+        hasta: datetime,
+        especialidad: Optional[str] = None,
+        unidad_id: Optional[int] = None,
+        profesional_id: Optional[int] = None,
+        duracion_minutos: int = 20,
+        limit: int = 20
+    ) -> List[Dict]:
+        """Primeros `limit` intervalos libres que empiezan antes de `hasta`"""
+        self.asegurar(db)
+        self.busquedas += 1
+
+        with self._lock:
+            if profesional_id is not None:
+                candidatos = {profesional_id}
+            elif especialidad:
+                candidatos = set(self._por_especialidad.get(especialidad.strip().lower(), ()))
+            else:
+                candidatos = set(self._intervalos)
+            indice = {pid: self._intervalos[pid] for pid in candidatos if pid in self._intervalos}
+
+        duracion = timedelta(minutes=duracion_minutos)
+        generadores = [
+            self._libres_desde(pid, lista, max_fin, desde, hasta, duracion, unidad_id)
+            for pid, (lista, max_fin) in indice.items()
+        ]
+        return [
+            {
+                "profesional_id": prof_id,
+                "unidad_id": unidad,
+                "bloque_agenda_id": bloque_id,
+                "inicio": inicio,
+                "fin": fin
+            }
+            for inicio, fin, prof_id, bloque_id, unidad in islice(heapq.merge(*generadores), limit)
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "profesionales": len(self._intervalos),
+            "intervalos": sum(len(lista) for lista, _ in self._intervalos.values()),
+            "sucios": len(self._sucios),
+            "reconstrucciones": self.reconstrucciones,
+            "refrescos": self.refrescos,
+            "busquedas": self.busquedas,
+            "ultima_reconstruccion_ms": round(self.ultima_reconstruccion_ms, 3)
+        }
+
+
+# Instancia global del índice
+availability_index = AvailabilityIndex()
+
+
+# ==================== REFRESCO POR EVENTOS ====================
+# Se marca al confirmar la transacción: marcar antes permitiría que una
+# búsqueda concurrente recargue datos aún no confirmados y limpie la marca.
+
+def _pendientes(target) -> Optional[Set[int]]:
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault("disponibilidad_sucios", set())
+
+
+@event.listens_for(BloqueAgenda, "after_insert")
+@event.listens_for(BloqueAgenda, "after_update")
+@event.listens_for(BloqueAgenda, "after_delete")
+@event.listens_for(Cita, "after_insert")
+@event.listens_for(Cita, "after_update")
+@event.listens_for(Cita, "after_delete")
+def _agenda_cambio(mapper, connection, target):
+    pendientes = _pendientes(target)
+    if pendientes is not None:
+        pendientes.add(target.profesional_id)
+
+
+@event.listens_for(Profesional, "after_insert")
+@event.listens_for(Profesional, "after_update")
+@event.listens_for(Profesional, "after_delete")
+def _profesional_cambio(mapper, connection, target):
+    pendientes = _pendientes(target)
+    if pendientes is not None:
+        pendientes.add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _marcar_tras_commit(session):
+    pendientes = session.info.pop("disponibilidad_sucios", None)
+    if pendientes:
+        availability_index.marcar(pendientes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tras_rollback(session):
+    session.info.pop("disponibilidad_sucios", None)
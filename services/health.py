@@ -0,0 +1,154 @@
+"""
+Sondas de salud para el balanceador
+- live: el proceso responde (no toca la BD)
+- ready: SELECT 1 cronometrado con timeout y saturación del pool; no listo
+  si la latencia o la saturación superan los umbrales
+El resultado de ready se cachea HEALTH_CACHE_SECONDS y las sondas
+concurrentes comparten la misma consulta en curso, así que sondear con
+frecuencia no carga la BD.
+El SELECT 1 corre en un hilo daemon propio, no en el executor por defecto
+(el del escritor de auditoría, los workers y los programadores): si la BD se
+cuelga el timeout deja de esperarlo pero el hilo sigue bloqueado, así que
+mientras no termine no se lanza otro.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from sqlalchemy import text
+from config import settings
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+
+def saturacion_pool(pool) -> Optional[dict]:
+    """Conexiones prestadas frente a la capacidad total (pool_size + max_overflow)"""
+    if not hasattr(pool, "checkedout"):
+        return None
+    capacidad = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    prestadas = pool.checkedout()
+    return {
+        "checked_out": prestadas,
+        "capacidad": capacidad,
+        "saturacion": round(prestadas / capacidad, 3) if capacidad else 0.0,
+    }
+
+
+class HealthChecker:
+    """Sonda de readiness con caché y consulta compartida"""
+
+    def __init__(
+        self,
+        engine,
+        cache_seconds: float = settings.HEALTH_CACHE_SECONDS,
+        timeout_seconds: float = settings.HEALTH_DB_TIMEOUT_SECONDS,
+        max_latency_ms: float = settings.HEALTH_MAX_DB_LATENCY_MS,
+        max_pool_saturation: float = settings.HEALTH_MAX_POOL_SATURATION
+    ):
+        self.engine = engine
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_latency_ms = max_latency_ms
+        self.max_pool_saturation = max_pool_saturation
+        self.iniciado_en = time.monotonic()
+
+        self._resultado: Optional[dict] = None
+        self._resultado_en = 0.0
+        self._en_curso: Optional[asyncio.Future] = None
+        self._consulta: Optional[Future] = None
+
+        # Contadores
+        self.sondeos = 0
+        self.fallos = 0
+
+    def vivo(self) -> dict:
+        return {"status": "alive", "uptime_seconds": round(time.monotonic() - self.iniciado_en, 1)}
+
+    async def listo(self) -> dict:
+        if self._resultado is not None and time.monotonic() - self._resultado_en < self.cache_seconds:
+            return self._resultado
+        if self._en_curso is None:
+            self._en_curso = asyncio.ensure_future(self._sondear())
+        # shield: si un cliente se desconecta no se cancela la sonda de los demás
+        return await asyncio.shield(self._en_curso)
+
+    def _select_1(self) -> float:
+        inicio = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return (time.perf_counter() - inicio) * 1000
+
+    def _lanzar_select_1(self) -> Future:
+        futuro = Future()
+
+        def correr():
+            # En curso: el timeout de wait_for ya no puede cancelarlo, sigue
+            # contando como consulta pendiente hasta que el hilo termine
+            if not futuro.set_running_or_notify_cancel():
+                return
+            try:
+                futuro.set_result(self._select_1())
+            except Exception as e:
+                futuro.set_exception(e)
+
+        threading.Thread(target=correr, name="health-db", daemon=True).start()
+        return futuro
+
+    async def _sondear(self) -> dict:
+        try:
+            self.sondeos += 1
+            pool = saturacion_pool(self.engine.pool)
+            motivos = []
+            latencia_ms = None
+
+            if pool is not None and pool["saturacion"] >= self.max_pool_saturation:
+                # Con el pool agotado el SELECT 1 solo esperaría una conexión
+                motivos.append(f"pool saturado ({pool['checked_out']}/{pool['capacidad']})")
+            elif self._consulta is not None and not self._consulta.done():
+                motivos.append("SELECT 1 anterior aún sin respuesta")
+            else:
+                self._consulta = self._lanzar_select_1()
+                try:
+                    latencia_ms = await asyncio.wait_for(
+                        asyncio.wrap_future(self._consulta), timeout=self.timeout_seconds
+                    )
+                    if latencia_ms > self.max_latency_ms:
+                        motivos.append(f"latencia de BD {latencia_ms:.1f} ms > {self.max_latency_ms:.0f} ms")
+                except asyncio.TimeoutError:
+                    motivos.append(f"SELECT 1 sin respuesta en {self.timeout_seconds:.1f} s")
+                except Exception as e:
+                    motivos.append(f"BD no disponible: {e.__class__.__name__}")
+
+            if motivos:
+                self.fallos += 1
+                logger.warning(f"Readiness: no listo ({'; '.join(motivos)})")
+
+            self._resultado = {
+                "status": "ready" if not motivos else "not_ready",
+                "database": {
+                    "latency_ms": round(latencia_ms, 2) if latencia_ms is not None else None,
+                    "max_latency_ms": self.max_latency_ms,
+                },
+                "pool": pool,
+                "motivos": motivos,
+                "checked_at": time.time(),
+            }
+            self._resultado_en = time.monotonic()
+            return self._resultado
+        finally:
+            self._en_curso = None
+
+    def stats(self) -> dict:
+        return {
+            "sondeos": self.sondeos,
+            "fallos": self.fallos,
+            "ultimo_estado": self._resultado["status"] if self._resultado else None,
+        }
+
+
+# Instancia global
+health_checker = HealthChecker(engine)
@@ -0,0 +1,157 @@
+"""
+Métricas en formato de exposición de Prometheus (texto 0.0.4)
+- Contadores e histogramas de latencia por ruta, alimentados por el
+  middleware de auditoría. Solo se escriben desde el event loop del
+  worker, así que se acumulan en dicts y listas sin locks; cada worker
+  de uvicorn expone sus propias series (Prometheus las agrega)
+- Gauges calculados al exponer: pool de conexiones, cola de auditoría y
+  backlog de notificaciones (este último con caché para no consultar la BD
+  en cada scrape)
+"""
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from starlette.types import Scope
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets, en segundos
+BUCKETS_LATENCIA: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def plantilla_ruta(scope: Scope) -> str:
+    """Plantilla de la ruta (/personas/{persona_id}), no la URL concreta: cardinalidad acotada"""
+    route = scope.get("route")
+    return route.path if route is not None else "<sin ruta>"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(**etiquetas) -> str:
+    return "{" + ",".join(f'{k}="{_escapar(str(v))}"' for k, v in etiquetas.items()) + "}"
+
+
+class HistogramaLatencia:
+    """Conteos por bucket (no acumulados; se acumulan al exponer), suma y total"""
+
+    __slots__ = ("conteos", "suma", "total")
+
+    def __init__(self):
+        self.conteos: List[int] = [0] * (len(BUCKETS_LATENCIA) + 1)  # último = +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float) -> None:
+        self.conteos[bisect_left(BUCKETS_LATENCIA, segundos)] += 1
+        self.suma += segundos
+        self.total += 1
+
+
+class MetricsRegistry:
+    """Registro de métricas HTTP y colectores de gauges"""
+
+    def __init__(self, backlog_ttl_seconds: float = settings.METRICS_NOTIFICATION_BACKLOG_TTL_SECONDS):
+        self.backlog_ttl_seconds = backlog_ttl_seconds
+        self._peticiones: Dict[Tuple[str, str, int], int] = {}
+        self._latencias: Dict[Tuple[str, str], HistogramaLatencia] = {}
+        self._backlog: Dict[str, int] = {}
+        self._backlog_en = 0.0
+        self.iniciado_en = time.time()
+
+    # ==================== ACUMULACIÓN (event loop) ====================
+
+    def observar(self, metodo: str, ruta: str, codigo: int, segundos: float) -> None:
+        clave = (metodo, ruta, codigo)
+        self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+        histograma = self._latencias.get((metodo, ruta))
+        if histograma is None:
+            histograma = self._latencias[(metodo, ruta)] = HistogramaLatencia()
+        histograma.observar(segundos)
+
+    # ==================== GAUGES ====================
+
+    def backlog_notificaciones(self, session_factory: Callable) -> Dict[str, int]:
+        """Notificaciones por estado (COUNT agrupado, cacheado backlog_ttl_seconds)"""
+        ahora = time.monotonic()
+        if ahora - self._backlog_en < self.backlog_ttl_seconds:
+            return self._backlog
+        from models.notificaciones import Notificacion
+
+        db = session_factory()
+        try:
+            filas = db.query(Notificacion.estado, func.count(Notificacion.id)).group_by(Notificacion.estado).all()
+            self._backlog = {estado.value: total for estado, total in filas}
+        except Exception as e:
+            logger.warning(f"No se pudo calcular el backlog de notificaciones: {e}")
+        finally:
+            db.close()
+        self._backlog_en = ahora
+        return self._backlog
+
+    # ==================== EXPOSICIÓN ====================
+
+    def exponer(self, engine, audit_writer, session_factory: Optional[Callable] = None) -> str:
+        """Texto en formato de exposición de Prometheus"""
+        lineas: List[str] = []
+
+        # Copias atómicas bajo el GIL: el event loop puede seguir escribiendo
+        peticiones = list(self._peticiones.items())
+        latencias = [(clave, list(h.conteos), h.suma, h.total) for clave, h in list(self._latencias.items())]
+
+        lineas.append("# HELP http_requests_total Peticiones HTTP por método, ruta y código")
+        lineas.append("# TYPE http_requests_total counter")
+        for (metodo, ruta, codigo), total in sorted(peticiones):
+            lineas.append(f"http_requests_total{_etiquetas(method=metodo, route=ruta, status=codigo)} {total}")
+
+        lineas.append("# HELP http_request_duration_seconds Latencia de peticiones HTTP por método y ruta")
+        lineas.append("# TYPE http_request_duration_seconds histogram")
+        for (metodo, ruta), conteos, suma, total in sorted(latencias, key=lambda l: l[0]):
+            acumulado = 0
+            for limite, conteo in zip(BUCKETS_LATENCIA + ("+Inf",), conteos):
+                acumulado += conteo
+                lineas.append(
+                    f"http_request_duration_seconds_bucket{_etiquetas(method=metodo, route=ruta, le=limite)} {acumulado}"
+                )
+            lineas.append(f"http_request_duration_seconds_sum{_etiquetas(method=metodo, route=ruta)} {suma:.6f}")
+            lineas.append(f"http_request_duration_seconds_count{_etiquetas(method=metodo, route=ruta)} {total}")
+
+        pool = engine.pool
+        if hasattr(pool, "checkedout"):
+            gauges_pool = (
+                ("db_pool_size", "Tamaño configurado del pool", pool.size()),
+                ("db_pool_checked_out", "Conexiones prestadas", pool.checkedout()),
+                ("db_pool_checked_in", "Conexiones libres en el pool", pool.checkedin()),
+                ("db_pool_overflow", "Conexiones por encima de pool_size (negativo = huecos libres)", pool.overflow()),
+            )
+            for nombre, ayuda, valor in gauges_pool:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} gauge")
+                lineas.append(f"{nombre} {valor}")
+
+        lineas.append("# HELP audit_queue_depth Registros de auditoría en cola")
+        lineas.append("# TYPE audit_queue_depth gauge")
+        lineas.append(f"audit_queue_depth {audit_writer.queue_depth}")
+        lineas.append("# HELP audit_dropped_total Registros de auditoría descartados por cola llena")
+        lineas.append("# TYPE audit_dropped_total counter")
+        lineas.append(f"audit_dropped_total {audit_writer.dropped}")
+
+        if session_factory is not None:
+            lineas.append("# HELP notificaciones Notificaciones por estado")
+            lineas.append("# TYPE notificaciones gauge")
+            for estado, total in sorted(self.backlog_notificaciones(session_factory).items()):
+                lineas.append(f"notificaciones{_etiquetas(estado=estado)} {total}")
+
+        lineas.append("# HELP process_start_time_seconds Inicio del worker (epoch)")
+        lineas.append("# TYPE process_start_time_seconds gauge")
+        lineas.append(f"process_start_time_seconds {self.iniciado_en:.3f}")
+        return "\n".join(lineas) + "\n"
+
+
+# Instancia global (una por worker)
+metrics = MetricsRegistry()
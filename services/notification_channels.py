@@ -0,0 +1,337 @@
+"""
+Canales de notificación distintos de email (SMS, WhatsApp, Push)
+- ChannelDriver: adapta la notificación (renderizada desde su plantilla si
+  solo tiene payload) al mensaje del canal
+- Transportes intercambiables para operar y hacer pruebas de carga sin
+  proveedores reales: archivo JSONL por canal, o HTTP a un servicio local
+  (scripts/canales_stub.py)
+- ChannelPool: un pool asíncrono por TipoNotificacionEnum con su propio
+  límite de concurrencia (peticiones en vuelo), token bucket (mensajes/s) y
+  tamaño de lote por petición al transporte
+
+El email sigue por SendGrid con personalizations (NotificationService.enviar_lote).
+Los despachadores de services.notification_worker reclaman las filas y llaman
+a ChannelDispatcher.entregar desde su hilo; el envío corre en el event loop.
+"""
+import asyncio
+import html
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from config import settings
+from models.notificaciones import Notificacion, TipoNotificacionEnum
+from services.notification_service import NotificationService
+from services.rate_limiter import TokenBucket
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - solo hace falta con el transporte http
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+_SALTOS = re.compile(r"<br\s*/?>|</(?:p|h\d|li|ul|ol|div)>", re.IGNORECASE)
+_ETIQUETAS = re.compile(r"<[^>]+>")
+_ESPACIOS = re.compile(r"\s*\n\s*|[ \t]+")
+
+
+def texto_plano(mensaje_html: str) -> str:
+    """HTML de la plantilla a texto: quita etiquetas (los bloques pasan a salto de línea)"""
+    texto = _ETIQUETAS.sub("", _SALTOS.sub("\n", mensaje_html.replace("\n", " ")))
+    texto = _ESPACIOS.sub(lambda m: "\n" if "\n" in m.group(0) else " ", html.unescape(texto))
+    return texto.strip()
+
+
+# ==================== DRIVERS ====================
+
+class ChannelDriver:
+    """Convierte una notificación en el mensaje que entiende el canal"""
+
+    tipo: TipoNotificacionEnum
+    max_caracteres: int = 0  # 0 = sin límite
+
+    def preparar(self, notificacion: Notificacion) -> Dict[str, Any]:
+        asunto, mensaje = NotificationService.contenido(notificacion)
+        texto = texto_plano(mensaje)
+        if self.max_caracteres and len(texto) > self.max_caracteres:
+            texto = texto[:self.max_caracteres - 1] + "…"
+        return self.mensaje(notificacion, asunto, texto)
+
+    def mensaje(self, notificacion: Notificacion, asunto: Optional[str], texto: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class SMSDriver(ChannelDriver):
+    tipo = TipoNotificacionEnum.SMS
+    max_caracteres = 459  # 3 segmentos concatenados de 153
+
+    def mensaje(self, notificacion, asunto, texto):
+        return {"to": notificacion.destinatario, "text": texto}
+
+
+class WhatsAppDriver(ChannelDriver):
+    tipo = TipoNotificacionEnum.WHATSAPP
+    max_caracteres = 4096
+
+    def mensaje(self, notificacion, asunto, texto):
+        return {
+            "to": notificacion.destinatario,
+            "template": notificacion.plantilla.value if notificacion.plantilla else None,
+            "text": f"*{asunto}*\n{texto}" if asunto else texto,
+        }
+
+
+class PushDriver(ChannelDriver):
+    tipo = TipoNotificacionEnum.PUSH
+    max_caracteres = 240
+
+    def mensaje(self, notificacion, asunto, texto):
+        return {
+            "token": notificacion.destinatario,
+            "title": asunto or "",
+            "body": texto,
+            "data": {"notificacion_id": notificacion.id},
+        }
+
+
+# ==================== TRANSPORTES ====================
+
+class TransporteArchivo:
+    """Agrega cada mensaje como una línea JSON en <directorio>/<canal>.jsonl"""
+
+    def __init__(self, directorio: str = settings.NOTIFICATION_CHANNEL_DIR):
+        self.directorio = directorio
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def _escribir(self, canal: str, mensajes: List[Dict[str, Any]]) -> List[str]:
+        ids = [f"{canal.lower()}-{uuid.uuid4().hex}" for _ in mensajes]
+        lineas = "".join(
+            json.dumps({"id": id_, **m}, ensure_ascii=False, default=str) + "\n" for id_, m in zip(ids, mensajes)
+        )
+        with self._locks.setdefault(canal, threading.Lock()):
+            with open(os.path.join(self.directorio, f"{canal.lower()}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(lineas)
+        return ids
+
+    async def enviar(self, canal: str, mensajes: List[Dict[str, Any]]) -> List[str]:
+        os.makedirs(self.directorio, exist_ok=True)
+        return await asyncio.to_thread(self._escribir, canal, mensajes)
+
+    async def cerrar(self) -> None:
+        pass
+
+
+class TransporteHTTP:
+    """
+    POST {url}/<canal> con {"mensajes": [...]}; espera {"ids": [...]} en el mismo orden
+    Un cliente httpx por event loop (conexiones keep-alive reutilizadas)
+    """
+
+    def __init__(self, url: str = settings.NOTIFICATION_CHANNEL_HTTP_URL, timeout: float = 10.0):
+        if httpx is None:
+            raise RuntimeError("El transporte http de notificaciones requiere httpx")
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._clientes: Dict[int, "httpx.AsyncClient"] = {}
+
+    def _cliente(self) -> "httpx.AsyncClient":
+        clave = id(asyncio.get_running_loop())
+        cliente = self._clientes.get(clave)
+        if cliente is None:
+            cliente = self._clientes[clave] = httpx.AsyncClient(timeout=self.timeout)
+        return cliente
+
+    async def enviar(self, canal: str, mensajes: List[Dict[str, Any]]) -> List[str]:
+        respuesta = await self._cliente().post(f"{self.url}/{canal.lower()}", json={"mensajes": mensajes})
+        respuesta.raise_for_status()
+        ids = respuesta.json()["ids"]
+        if len(ids) != len(mensajes):
+            raise ValueError(f"El transporte devolvió {len(ids)} ids para {len(mensajes)} mensajes")
+        return ids
+
+    async def cerrar(self) -> None:
+        cliente = self._clientes.pop(id(asyncio.get_running_loop()), None)
+        if cliente is not None:
+            await cliente.aclose()
+
+
+def crear_transporte(nombre: str = settings.NOTIFICATION_CHANNEL_TRANSPORT):
+    if nombre == "http":
+        return TransporteHTTP()
+    if nombre == "file":
+        return TransporteArchivo()
+    raise ValueError(f"NOTIFICATION_CHANNEL_TRANSPORT desconocido: {nombre}")
+
+
+# ==================== POOLS ====================
+
+class ChannelPool:
+    """
+    Envío de un canal con límites propios
+    - concurrencia: peticiones al transporte en vuelo (semáforo por event loop)
+    - tasa_por_segundo: token bucket de mensajes (0 = sin límite); cada
+      petición consume tantos tokens como mensajes lleva
+    - batch_size: mensajes por petición al transporte
+    """
+
+    def __init__(self, driver: ChannelDriver, transporte, concurrencia: int, tasa_por_segundo: float, batch_size: int):
+        self.driver = driver
+        self.transporte = transporte
+        self.concurrencia = max(concurrencia, 1)
+        self.batch_size = max(batch_size, 1)
+        self.tasa_por_segundo = tasa_por_segundo
+        # Capacidad >= un lote para que un lote completo pueda pasar; recarga a tasa_por_segundo
+        capacidad = max(tasa_por_segundo, self.batch_size)
+        self.bucket = TokenBucket(capacidad, capacidad / tasa_por_segundo) if tasa_por_segundo > 0 else None
+        self._tokens = capacidad
+        self._actualizado = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaforos: Dict[int, asyncio.Semaphore] = {}
+
+        # Contadores
+        self.enviados = 0
+        self.fallidos = 0
+        self.peticiones = 0
+        self.espera_limite_s = 0.0
+
+    def _semaforo(self) -> asyncio.Semaphore:
+        clave = id(asyncio.get_running_loop())
+        semaforo = self._semaforos.get(clave)
+        if semaforo is None:
+            semaforo = self._semaforos[clave] = asyncio.Semaphore(self.concurrencia)
+        return semaforo
+
+    async def _esperar_tokens(self, costo: int) -> None:
+        if self.bucket is None:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens, resultado = self.bucket.consumir(self._tokens, self._actualizado, ahora, costo)
+                self._actualizado = ahora
+            if resultado.permitido:
+                return
+            self.espera_limite_s += resultado.retry_after
+            await asyncio.sleep(resultado.retry_after)
+
+    async def _enviar(self, lote: List[Tuple[int, Dict[str, Any]]], resultados: Dict) -> None:
+        async with self._semaforo():
+            await self._esperar_tokens(len(lote))
+            self.peticiones += 1
+            try:
+                ids = await self.transporte.enviar(self.driver.tipo.value, [m for _, m in lote])
+            except Exception as e:
+                logger.error(f"Error enviando lote de {len(lote)} por {self.driver.tipo.value}: {e}")
+                self.fallidos += len(lote)
+                for id_, _ in lote:
+                    resultados[id_] = e
+                return
+            self.enviados += len(lote)
+            for (id_, _), proveedor_id in zip(lote, ids):
+                resultados[id_] = proveedor_id
+
+    async def despachar(self, notificaciones: List[Notificacion]) -> Dict[int, Union[str, Exception]]:
+        """id -> proveedor_id, o la excepción si falló (preparación o transporte)"""
+        resultados: Dict[int, Union[str, Exception]] = {}
+        mensajes = []
+        for n in notificaciones:
+            try:
+                mensajes.append((n.id, self.driver.preparar(n)))
+            except Exception as e:
+                self.fallidos += 1
+                resultados[n.id] = e
+        await asyncio.gather(*(
+            self._enviar(mensajes[i:i + self.batch_size], resultados)
+            for i in range(0, len(mensajes), self.batch_size)
+        ))
+        return resultados
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrencia,
+            "rate_per_second": self.tasa_por_segundo,
+            "batch_size": self.batch_size,
+            "requests": self.peticiones,
+            "sent": self.enviados,
+            "failed": self.fallidos,
+            "rate_limited_seconds": round(self.espera_limite_s, 3),
+        }
+
+
+class ChannelDispatcher:
+    """Pools por canal y puente desde los hilos de los despachadores al event loop"""
+
+    def __init__(self, pools: Dict[TipoNotificacionEnum, ChannelPool]):
+        self.pools = pools
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Fija el event loop donde corren los envíos (llamar dentro del loop)"""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        for transporte in {id(p.transporte): p.transporte for p in self.pools.values()}.values():
+            await transporte.cerrar()
+        self._loop = None
+
+    async def despachar(self, notificaciones: List[Notificacion]) -> Dict[int, Union[str, Exception]]:
+        por_canal: Dict[TipoNotificacionEnum, List[Notificacion]] = {}
+        resultados: Dict[int, Union[str, Exception]] = {}
+        for n in notificaciones:
+            if n.tipo in self.pools:
+                por_canal.setdefault(n.tipo, []).append(n)
+            else:
+                resultados[n.id] = ValueError(f"Canal {n.tipo.value} sin driver configurado")
+        for parcial in await asyncio.gather(*(self.pools[t].despachar(ns) for t, ns in por_canal.items())):
+            resultados.update(parcial)
+        return resultados
+
+    def entregar(self, notificaciones: List[Notificacion]) -> Dict[int, Union[str, Exception]]:
+        """Versión síncrona para los hilos de los despachadores"""
+        if not notificaciones:
+            return {}
+        if self._loop is not None and self._loop.is_running():
+            return asyncio.run_coroutine_threadsafe(self.despachar(notificaciones), self._loop).result()
+        # Sin la app corriendo (scripts): loop propio
+        return asyncio.run(self._despachar_y_cerrar(notificaciones))
+
+    async def _despachar_y_cerrar(self, notificaciones: List[Notificacion]):
+        try:
+            return await self.despachar(notificaciones)
+        finally:
+            for transporte in {id(p.transporte): p.transporte for p in self.pools.values()}.values():
+                await transporte.cerrar()
+
+    def stats(self) -> Dict:
+        return {tipo.value: pool.stats() for tipo, pool in self.pools.items()}
+
+
+def crear_dispatcher(transporte=None) -> ChannelDispatcher:
+    transporte = transporte if transporte is not None else crear_transporte()
+    return ChannelDispatcher({
+        TipoNotificacionEnum.SMS: ChannelPool(
+            SMSDriver(), transporte,
+            settings.NOTIFICATION_SMS_CONCURRENCY, settings.NOTIFICATION_SMS_RATE_PER_SECOND,
+            settings.NOTIFICATION_SMS_BATCH_SIZE
+        ),
+        TipoNotificacionEnum.WHATSAPP: ChannelPool(
+            WhatsAppDriver(), transporte,
+            settings.NOTIFICATION_WHATSAPP_CONCURRENCY, settings.NOTIFICATION_WHATSAPP_RATE_PER_SECOND,
+            settings.NOTIFICATION_WHATSAPP_BATCH_SIZE
+        ),
+        TipoNotificacionEnum.PUSH: ChannelPool(
+            PushDriver(), transporte,
+            settings.NOTIFICATION_PUSH_CONCURRENCY, settings.NOTIFICATION_PUSH_RATE_PER_SECOND,
+            settings.NOTIFICATION_PUSH_BATCH_SIZE
+        ),
+    })
+
+
+# Instancia global de los canales
+channel_dispatcher = crear_dispatcher()
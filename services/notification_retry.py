@@ -0,0 +1,142 @@
+"""
+Programador de reintentos de notificaciones
+Los envíos fallidos quedan en ERROR con fecha_proximo_intento calculada por
+PoliticaReintentos (backoff exponencial con jitter); al agotar max_intentos
+pasan a DESCARTADO. Esta tarea reclama las vencidas por lotes acotados con el
+índice (estado, fecha_proximo_intento) y las reenvía sobre la misma fila
+(NotificationWorker.procesar_reintentos). Entre lotes duerme hasta el
+próximo vencimiento (MIN por el mismo índice), con tope poll_seconds.
+
+Hay un programador por despachador (email y cada canal de
+channel_workers): los reintentos de un canal lento o limitado por su token
+bucket no ocupan el hilo ni las filas del resto.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, update
+from config import settings
+from database import SessionLocal
+from models.notificaciones import Notificacion, EstadoNotificacionEnum, TipoNotificacionEnum
+from services.notification_worker import NotificationWorker, notification_worker, channel_workers
+
+logger = logging.getLogger(__name__)
+
+
+class RetryScheduler:
+    """Reintenta en su lugar las notificaciones en ERROR de los tipos de su despachador"""
+
+    def __init__(
+        self,
+        worker: NotificationWorker = notification_worker,
+        session_factory: Callable = SessionLocal,
+        enabled: bool = settings.NOTIFICATION_RETRY_ENABLED,
+        poll_seconds: float = settings.NOTIFICATION_RETRY_POLL_SECONDS
+    ):
+        self.worker = worker
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+
+        # Contadores
+        self.lotes = 0
+        self.reintentadas = 0
+        self.errores = 0
+
+    def _por_tipo(self) -> List:
+        """Condición sobre los tipos del despachador (ninguna si atiende todos)"""
+        return [Notificacion.tipo.in_(self.worker.tipos)] if self.worker.tipos else []
+
+    def adoptar_huerfanas(self) -> int:
+        """Programa ya las filas en ERROR sin fecha_proximo_intento (fallidas antes del backoff)"""
+        db = self.session_factory()
+        try:
+            resultado = db.execute(
+                update(Notificacion)
+                .where(
+                    Notificacion.estado == EstadoNotificacionEnum.ERROR,
+                    Notificacion.fecha_proximo_intento.is_(None),
+                    *self._por_tipo()
+                )
+                .values(fecha_proximo_intento=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return resultado.rowcount
+        finally:
+            db.close()
+
+    def proximo_vencimiento(self) -> Optional[datetime]:
+        db = self.session_factory()
+        try:
+            proximo = (
+                db.query(func.min(Notificacion.fecha_proximo_intento))
+                .filter(Notificacion.estado == EstadoNotificacionEnum.ERROR, *self._por_tipo())
+                .scalar()
+            )
+        finally:
+            db.close()
+        return proximo.replace(tzinfo=None) if proximo is not None else None
+
+    # ==================== TAREA ====================
+
+    async def _run(self) -> None:
+        try:
+            adoptadas = await asyncio.to_thread(self.adoptar_huerfanas)
+            if adoptadas:
+                logger.info(f"Reintentos: {adoptadas} notificaciones en ERROR sin programar")
+        except Exception as e:
+            logger.error(f"No se pudieron programar las notificaciones en ERROR: {e}")
+
+        while True:
+            espera = self.poll_seconds
+            try:
+                procesadas = await asyncio.to_thread(self.worker.procesar_reintentos)
+                if procesadas:
+                    self.lotes += 1
+                    self.reintentadas += procesadas
+                if procesadas >= self.worker.batch_size:
+                    continue
+                proximo = await asyncio.to_thread(self.proximo_vencimiento)
+                if proximo is not None:
+                    espera = min(espera, (proximo - datetime.utcnow()).total_seconds())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Error en el programador de reintentos: {e}", exc_info=True)
+            await asyncio.sleep(max(espera, 0.05))
+
+    def start(self) -> None:
+        """Arranca la tarea (llamar dentro del event loop)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "batches": self.lotes,
+            "retried": self.reintentadas,
+            "errors": self.errores
+        }
+
+
+# Un programador por despachador: emails y cada canal con el suyo
+retry_schedulers: Dict[TipoNotificacionEnum, RetryScheduler] = {
+    TipoNotificacionEnum.EMAIL: RetryScheduler(notification_worker),
+    **{tipo: RetryScheduler(worker) for tipo, worker in channel_workers.items()}
+}
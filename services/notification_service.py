@@ -4,9 +4,12 @@ Integración con SendGrid para envío de emails
 """
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
+from sqlalchemy import case, literal, update
 from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import Optional, Dict
+from datetime import datetime, timedelta
+from itertools import groupby
+import random
+from typing import Optional, Dict, List, Tuple
 from config import settings
 from models.notificaciones import (
     Notificacion, 
@@ -14,10 +17,61 @@ from models.notificaciones import (
     EstadoNotificacionEnum,
     PlantillaNotificacionEnum
 )
+from services.notification_templates import plantillas
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Los envíos por lote usan el mensaje de cada destinatario como sustitución
+# del cuerpo; SendGrid limita las sustituciones a 10.000 bytes por personalization
+TAG_MENSAJE = "-mensaje-"
+LIMITE_SUSTITUCIONES = 10000
+
+# Clave de idempotencia de los recordatorios: PREFIJO_RECORDATORIO + id de la cita
+PREFIJO_RECORDATORIO = f"{PlantillaNotificacionEnum.RECORDATORIO_CITA.value}:"
+
+
+class PoliticaReintentos:
+    """
+    Backoff exponencial con jitter para notificaciones fallidas
+    El intento n espera base * 2^(n-1) segundos (tope max_seconds), reducido
+    por un factor aleatorio en [1 - jitter, 1] para que los fallos de un mismo
+    lote no se reintenten todos a la vez. Al llegar a max_intentos la
+    notificación pasa a DESCARTADO (dead letter).
+    """
+    
+    def __init__(
+        self,
+        base_seconds: float = settings.NOTIFICATION_RETRY_BASE_SECONDS,
+        max_seconds: float = settings.NOTIFICATION_RETRY_MAX_SECONDS,
+        jitter: float = settings.NOTIFICATION_RETRY_JITTER
+    ):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.jitter = jitter
+    
+    def retraso(self, intentos: int) -> float:
+        """Segundos hasta el próximo intento tras `intentos` intentos fallidos"""
+        retraso = min(self.base_seconds * 2 ** max(intentos - 1, 0), self.max_seconds)
+        return retraso * (1 - self.jitter * random.random())
+    
+    @staticmethod
+    def agotada(notificacion: Notificacion, intentos: int) -> bool:
+        return intentos >= notificacion.max_intentos
+    
+    def estado_fallo(self, notificacion: Notificacion, intentos: int, ahora: datetime) -> Tuple[EstadoNotificacionEnum, Optional[datetime]]:
+        """Estado y fecha del próximo intento tras un fallo (ya contado en `intentos`)"""
+        if self.agotada(notificacion, intentos):
+            return EstadoNotificacionEnum.DESCARTADO, None
+        return EstadoNotificacionEnum.ERROR, ahora + timedelta(seconds=self.retraso(intentos))
+    
+    def registrar_fallo(self, notificacion: Notificacion, error: str) -> None:
+        """Aplica el fallo sobre la fila (intentos ya incrementado)"""
+        notificacion.estado, notificacion.fecha_proximo_intento = self.estado_fallo(
+            notificacion, notificacion.intentos, datetime.utcnow()
+        )
+        notificacion.error_mensaje = error[:1000]
+
 
 class NotificationService:
     """
@@ -28,72 +82,294 @@ class NotificationService:
     def __init__(self):
         self.sg_client = None
         if settings.SENDGRID_API_KEY:
-            self.sg_client = SendGridAPIClient(settings.SENDGRID_API_KEY)
+            self.sg_client = SendGridAPIClient(settings.SENDGRID_API_KEY, host=settings.SENDGRID_API_HOST)
+        self.max_personalizaciones = settings.SENDGRID_MAX_PERSONALIZACIONES
+        self.reintentos = PoliticaReintentos()
     
-    def send_email(
+    def encolar(
         self,
         db: Session,
+        tipo: TipoNotificacionEnum,
         destinatario: str,
-        asunto: str,
-        mensaje: str,
+        asunto: Optional[str] = None,
+        mensaje: Optional[str] = None,
         plantilla: Optional[PlantillaNotificacionEnum] = None,
-        payload: Optional[Dict] = None
+        payload: Optional[Dict] = None,
+        fecha_programada: Optional[datetime] = None
     ) -> Notificacion:
         """
-        Envía email usando SendGrid
-        Registra en tabla de notificaciones
+        Outbox: agrega la notificación PENDIENTE a la transacción de quien llama
+        No hace commit ni envía; la despacha services.notification_worker
+        Con una plantilla registrada basta el payload: el mensaje se renderiza al enviar
         """
-        # Crear registro de notificación
+        if mensaje is None and not (plantillas.tiene(plantilla) and payload is not None):
+            raise ValueError("La notificación requiere mensaje, o plantilla registrada y payload")
         notificacion = Notificacion(
-            tipo=TipoNotificacionEnum.EMAIL,
+            tipo=tipo,
             destinatario=destinatario,
             plantilla=plantilla,
             asunto=asunto,
             mensaje=mensaje,
             payload=payload,
-            estado=EstadoNotificacionEnum.PENDIENTE
+            estado=EstadoNotificacionEnum.PENDIENTE,
+            fecha_programada=fecha_programada
         )
         db.add(notificacion)
+        return notificacion
+    
+    @staticmethod
+    def contenido(notificacion: Notificacion) -> Tuple[Optional[str], str]:
+        """(asunto, mensaje): el guardado o, si solo hay payload, renderizado desde la plantilla"""
+        if notificacion.mensaje is not None:
+            return notificacion.asunto, notificacion.mensaje
+        return plantillas.renderizar(notificacion.plantilla, notificacion.payload)
+    
+    def entregar(self, notificacion: Notificacion) -> str:
+        """
+        Envía un email ya registrado (los demás canales salen por
+        services.notification_channels)
+        Retorna el ID del proveedor; lanza excepción si el envío falla
+        """
+        if notificacion.tipo != TipoNotificacionEnum.EMAIL:
+            raise ValueError(f"Canal {notificacion.tipo.value}: usar services.notification_channels")
+        
+        if not self.sg_client:
+            logger.warning("SendGrid no configurado, simulando envío")
+            return ""
+        
+        # Construir email
+        asunto, mensaje = self.contenido(notificacion)
+        from_email = Email(settings.SENDGRID_FROM_EMAIL, settings.SENDGRID_FROM_NAME)
+        to_email = To(notificacion.destinatario)
+        content = Content("text/html", mensaje)
+        mail = Mail(from_email, to_email, asunto, content)
+        
+        # Enviar
+        response = self.sg_client.send(mail)
+        return response.headers.get('X-Message-Id', '')
+    
+    def enviar_lote(self, db: Session, notificaciones: List[Notificacion]) -> Dict[str, int]:
+        """
+        Envía un lote de emails ya registrados
+        - Agrupa por plantilla y manda una petición a SendGrid por cada
+          max_personalizaciones destinatarios: cada uno es una personalization
+          con su asunto y su mensaje (sustitución de TAG_MENSAJE)
+        - Los mensajes que no caben como sustitución (LIMITE_SUSTITUCIONES)
+          se envían uno a uno, cada uno con su propio resultado
+        - El estado de todo el lote se escribe con un solo UPDATE (sin commit);
+          los fallidos quedan en ERROR con su próximo intento, o DESCARTADO
+        Sirve tanto para PENDIENTE como para reintentos (actualiza las mismas filas)
+        """
+        resultado = {"enviadas": 0, "fallidas": 0}
+        if not notificaciones:
+            return resultado
+        
+        enviados: List[Tuple[List[int], str]] = []  # (ids, X-Message-Id)
+        errores: List[Tuple[List[Notificacion], str]] = []  # (notificaciones, error)
+        
+        por_plantilla = sorted(notificaciones, key=lambda n: n.plantilla.value if n.plantilla else "")
+        for plantilla, grupo in groupby(por_plantilla, key=lambda n: n.plantilla):
+            listos = []
+            for n, contenido in self._renderizar_grupo(plantilla, list(grupo)):
+                if isinstance(contenido, Exception):
+                    errores.append(([n], str(contenido)[:1000]))
+                    resultado["fallidas"] += 1
+                elif len(contenido[1].encode("utf-8")) > LIMITE_SUSTITUCIONES:
+                    # No cabe como sustitución: se envía solo
+                    try:
+                        enviados.append(([n.id], self.entregar(n)))
+                        resultado["enviadas"] += 1
+                    except Exception as e:
+                        logger.error(f"Error enviando notificación {n.id}: {e}")
+                        errores.append(([n], str(e)[:1000]))
+                        resultado["fallidas"] += 1
+                else:
+                    listos.append((n, *contenido))
+            
+            for i in range(0, len(listos), self.max_personalizaciones):
+                bloque = listos[i:i + self.max_personalizaciones]
+                notificaciones_bloque = [n for n, _, _ in bloque]
+                try:
+                    enviados.append(([n.id for n in notificaciones_bloque], self._enviar_personalizaciones(bloque)))
+                    resultado["enviadas"] += len(bloque)
+                except Exception as e:
+                    logger.error(f"Error enviando lote de {len(bloque)} emails: {e}")
+                    errores.append((notificaciones_bloque, str(e)[:1000]))
+                    resultado["fallidas"] += len(bloque)
+        
+        self._actualizar_estados(db, enviados, errores)
+        return resultado
+    
+    @staticmethod
+    def _renderizar_grupo(plantilla: Optional[PlantillaNotificacionEnum], grupo: List[Notificacion]) -> List[Tuple]:
+        """
+        (notificación, (asunto, mensaje) o la excepción) para un grupo de la misma plantilla
+        Las que solo tienen payload se renderizan juntas; si alguna falla se aíslan una a una
+        """
+        pendientes = [n for n in grupo if n.mensaje is None]
+        renderizados = {}
+        if pendientes:
+            try:
+                renderizados = dict(zip(
+                    (n.id for n in pendientes),
+                    plantillas.renderizar_lote(plantilla, [n.payload for n in pendientes])
+                ))
+            except Exception:
+                for n in pendientes:
+                    try:
+                        renderizados[n.id] = plantillas.renderizar(plantilla, n.payload)
+                    except Exception as e:
+                        renderizados[n.id] = e
+        return [(n, renderizados[n.id] if n.mensaje is None else (n.asunto, n.mensaje)) for n in grupo]
+    
+    def _enviar_personalizaciones(self, bloque: List[Tuple[Notificacion, Optional[str], str]]) -> str:
+        """Una petición a /v3/mail/send con (notificación, asunto, mensaje); retorna el X-Message-Id (común a todo el bloque)"""
+        if not self.sg_client:
+            logger.warning(f"SendGrid no configurado, simulando envío de {len(bloque)} emails")
+            return ""
+        
+        # Se arma el cuerpo como dict: con cientos de destinatarios los helpers
+        # de sendgrid (Mail/Personalization) cuestan más que la propia petición
+        personalizaciones = [
+            {
+                "to": [{"email": n.destinatario}],
+                "subject": asunto or "",
+                "substitutions": {TAG_MENSAJE: mensaje},
+                "custom_args": {"notificacion_id": str(n.id)}
+            }
+            for n, asunto, mensaje in bloque
+        ]
+        
+        response = self.sg_client.send({
+            "from": {"email": settings.SENDGRID_FROM_EMAIL, "name": settings.SENDGRID_FROM_NAME},
+            "personalizations": personalizaciones,
+            "content": [{"type": "text/html", "value": TAG_MENSAJE}]
+        })
+        return response.headers.get('X-Message-Id', '')
+    
+    def _actualizar_estados(
+        self,
+        db: Session,
+        enviados: List[Tuple[List[int], str]],
+        errores: List[Tuple[List[Notificacion], str]]
+    ) -> None:
+        """
+        UPDATE único para todo el lote con CASE: proveedor_id y error por
+        bloque; estado y próximo intento por fila para los fallidos
+        """
+        ids = [i for bloque, _ in enviados for i in bloque] + [n.id for bloque, _ in errores for n in bloque]
+        if not ids:
+            return
+        ahora = datetime.utcnow()
+        tipo_estado = Notificacion.__table__.c.estado.type
+        valores = {"intentos": Notificacion.intentos + 1}
+        
+        if errores:
+            estados = {}
+            proximos = {}
+            for bloque, _ in errores:
+                for n in bloque:
+                    estados[n.id], proximo = self.reintentos.estado_fallo(n, n.intentos + 1, ahora)
+                    if proximo is not None:
+                        proximos[n.id] = proximo
+            descartadas = [i for i, estado in estados.items() if estado == EstadoNotificacionEnum.DESCARTADO]
+            fallo = Notificacion.id.in_(list(estados))
+            
+            ramas = [(fallo, literal(EstadoNotificacionEnum.ERROR, tipo_estado))]
+            if descartadas:
+                ramas.insert(0, (Notificacion.id.in_(descartadas), literal(EstadoNotificacionEnum.DESCARTADO, tipo_estado)))
+            valores["estado"] = case(*ramas, else_=literal(EstadoNotificacionEnum.ENVIADO, tipo_estado))
+            valores["fecha_enviado"] = case((fallo, Notificacion.fecha_enviado), else_=ahora)
+            valores["error_mensaje"] = case(
+                *[(Notificacion.id.in_([n.id for n in bloque]), error) for bloque, error in errores], else_=None
+            )
+            valores["fecha_proximo_intento"] = (
+                case(proximos, value=Notificacion.id, else_=None) if proximos else None
+            )
+        else:
+            valores["estado"] = EstadoNotificacionEnum.ENVIADO
+            valores["fecha_enviado"] = ahora
+            valores["error_mensaje"] = None
+            valores["fecha_proximo_intento"] = None
+        
+        if enviados:
+            valores["proveedor_id"] = case(
+                *[(Notificacion.id.in_(bloque), mensaje_id) for bloque, mensaje_id in enviados],
+                else_=Notificacion.proveedor_id
+            )
+        
+        db.execute(
+            update(Notificacion)
+            .where(Notificacion.id.in_(ids))
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+    
+    def send_email(
+        self,
+        db: Session,
+        destinatario: str,
+        asunto: Optional[str] = None,
+        mensaje: Optional[str] = None,
+        plantilla: Optional[PlantillaNotificacionEnum] = None,
+        payload: Optional[Dict] = None
+    ) -> Notificacion:
+        """
+        Envía email usando SendGrid (síncrono, dentro de la petición)
+        Registra en tabla de notificaciones (solo el payload si la plantilla está registrada)
+        """
+        # Crear registro de notificación
+        notificacion = self.encolar(
+            db=db,
+            tipo=TipoNotificacionEnum.EMAIL,
+            destinatario=destinatario,
+            asunto=asunto,
+            mensaje=mensaje,
+            plantilla=plantilla,
+            payload=payload
+        )
         db.commit()
         db.refresh(notificacion)
         
         # Intentar envío
         try:
-            if not self.sg_client:
-                logger.warning("SendGrid no configurado, simulando envío")
-                notificacion.estado = EstadoNotificacionEnum.ENVIADO
-                notificacion.fecha_enviado = datetime.utcnow()
-                db.commit()
-                return notificacion
-            
-            # Construir email
-            from_email = Email(settings.SENDGRID_FROM_EMAIL, settings.SENDGRID_FROM_NAME)
-            to_email = To(destinatario)
-            content = Content("text/html", mensaje)
-            mail = Mail(from_email, to_email, asunto, content)
-            
-            # Enviar
-            response = self.sg_client.send(mail)
+            notificacion.proveedor_id = self.entregar(notificacion)
             
             # Actualizar estado
             notificacion.estado = EstadoNotificacionEnum.ENVIADO
             notificacion.fecha_enviado = datetime.utcnow()
-            notificacion.proveedor_id = response.headers.get('X-Message-Id', '')
             notificacion.intentos += 1
             
             db.commit()
-            logger.info(f"Email enviado a {destinatario}: {asunto}")
+            logger.info(f"Email enviado a {destinatario}: {asunto or plantilla.value}")
             
         except Exception as e:
-            # Marcar error
-            notificacion.estado = EstadoNotificacionEnum.ERROR
-            notificacion.error_mensaje = str(e)
+            # Marcar error (lo reintenta services.notification_retry)
             notificacion.intentos += 1
+            self.reintentos.registrar_fallo(notificacion, str(e))
             db.commit()
             logger.error(f"Error enviando email: {e}")
         
         return notificacion
     
+    @staticmethod
+    def contenido_cita_confirmacion(
+        nombre_paciente: str,
+        fecha_cita: datetime,
+        profesional: str,
+        unidad: str
+    ) -> Dict:
+        """Plantilla y payload de la confirmación de cita (el HTML está en services.notification_templates)"""
+        return {
+            "plantilla": PlantillaNotificacionEnum.CONFIRMACION_CITA,
+            "payload": {
+                "nombre_paciente": nombre_paciente,
+                "fecha_cita": fecha_cita.isoformat(),
+                "profesional": profesional,
+                "unidad": unidad
+            }
+        }
+    
     def send_cita_confirmacion(
         self,
         db: Session,
@@ -104,32 +380,62 @@ class NotificationService:
         unidad: str
     ) -> Notificacion:
         """Envía confirmación de cita"""
-        asunto = "Confirmación de Cita Médica"
-        mensaje = f"""
-        <h2>Confirmación de Cita</h2>
-        <p>Estimado/a {nombre_paciente},</p>
-        <p>Su cita ha sido confirmada con los siguientes detalles:</p>
-        <ul>
-            <li><strong>Fecha y hora:</strong> {fecha_cita.strftime('%d/%m/%Y %H:%M')}</li>
-            <li><strong>Profesional:</strong> {profesional}</li>
-            <li><strong>Ubicación:</strong> {unidad}</li>
-        </ul>
-        <p>Por favor llegue 15 minutos antes de su cita.</p>
-        <p>Saludos,<br>Sistema Médico</p>
-        """
-        
         return self.send_email(
             db=db,
             destinatario=email_paciente,
-            asunto=asunto,
-            mensaje=mensaje,
-            plantilla=PlantillaNotificacionEnum.CONFIRMACION_CITA,
-            payload={
+            **self.contenido_cita_confirmacion(nombre_paciente, fecha_cita, profesional, unidad)
+        )
+    
+    def encolar_cita_confirmacion(
+        self,
+        db: Session,
+        email_paciente: str,
+        nombre_paciente: str,
+        fecha_cita: datetime,
+        profesional: str,
+        unidad: str
+    ) -> Notificacion:
+        """Encola la confirmación de cita en la transacción de quien llama"""
+        return self.encolar(
+            db=db,
+            tipo=TipoNotificacionEnum.EMAIL,
+            destinatario=email_paciente,
+            **self.contenido_cita_confirmacion(nombre_paciente, fecha_cita, profesional, unidad)
+        )
+    
+    @staticmethod
+    def contenido_recordatorio_cita(
+        nombre_paciente: str,
+        fecha_cita: datetime,
+        profesional: str,
+        unidad: str
+    ) -> Dict:
+        """Plantilla y payload del recordatorio de cita"""
+        return {
+            "plantilla": PlantillaNotificacionEnum.RECORDATORIO_CITA,
+            "payload": {
                 "nombre_paciente": nombre_paciente,
                 "fecha_cita": fecha_cita.isoformat(),
                 "profesional": profesional,
                 "unidad": unidad
             }
+        }
+    
+    @staticmethod
+    def clave_recordatorio(cita_id: int) -> str:
+        """Clave de idempotencia del recordatorio de una cita"""
+        return f"{PREFIJO_RECORDATORIO}{cita_id}"
+    
+    def descartar_recordatorio(self, db: Session, cita_id: int) -> None:
+        """Desactiva el recordatorio pendiente de una cita (en la transacción de quien llama)"""
+        db.execute(
+            update(Notificacion)
+            .where(
+                Notificacion.clave_idempotencia == self.clave_recordatorio(cita_id),
+                Notificacion.estado == EstadoNotificacionEnum.PENDIENTE
+            )
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
         )
     
     def send_resultado_disponible(
@@ -140,20 +446,9 @@ class NotificationService:
         tipo_examen: str
     ) -> Notificacion:
         """Notifica disponibilidad de resultados"""
-        asunto = "Resultados Disponibles"
-        mensaje = f"""
-        <h2>Resultados de Examen Disponibles</h2>
-        <p>Estimado/a {nombre_paciente},</p>
-        <p>Sus resultados de <strong>{tipo_examen}</strong> ya están disponibles.</p>
-        <p>Por favor acceda a su portal de paciente o comuníquese con nosotros para obtenerlos.</p>
-        <p>Saludos,<br>Sistema Médico</p>
-        """
-        
         return self.send_email(
             db=db,
             destinatario=email_paciente,
-            asunto=asunto,
-            mensaje=mensaje,
             plantilla=PlantillaNotificacionEnum.RESULTADO_DISPONIBLE,
             payload={
                 "nombre_paciente": nombre_paciente,
@@ -171,20 +466,9 @@ class NotificationService:
         moneda: str = "USD"
     ) -> Notificacion:
         """Notifica emisión de factura"""
-        asunto = f"Factura {numero_factura} Emitida"
-        mensaje = f"""
-        <h2>Nueva Factura Emitida</h2>
-        <p>Estimado/a {nombre},</p>
-        <p>Se ha emitido la factura <strong>{numero_factura}</strong> por un monto de <strong>{moneda} {total:.2f}</strong>.</p>
-        <p>Por favor proceda con el pago a la brevedad posible.</p>
-        <p>Saludos,<br>Departamento de Facturación</p>
-        """
-        
         return self.send_email(
             db=db,
             destinatario=email_destinatario,
-            asunto=asunto,
-            mensaje=mensaje,
             plantilla=PlantillaNotificacionEnum.FACTURA_EMITIDA,
             payload={
                 "nombre": nombre,
@@ -194,24 +478,6 @@ class NotificationService:
             }
         )
     
-    def retry_failed_notifications(self, db: Session, max_retries: int = 3):
-        """Reintenta notificaciones fallidas"""
-        notificaciones_pendientes = db.query(Notificacion).filter(
-            Notificacion.estado == EstadoNotificacionEnum.ERROR,
-            Notificacion.intentos < max_retries
-        ).all()
-        
-        for notif in notificaciones_pendientes:
-            if notif.tipo == TipoNotificacionEnum.EMAIL:
-                self.send_email(
-                    db=db,
-                    destinatario=notif.destinatario,
-                    asunto=notif.asunto,
-                    mensaje=notif.mensaje,
-                    plantilla=notif.plantilla,
-                    payload=notif.payload
-                )
-
 
 # Instancia global del servicio
 notification_service = NotificationService()
\ No newline at end of file
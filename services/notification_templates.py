@@ -0,0 +1,172 @@
+"""
+Plantillas de notificación precompiladas
+Cada PlantillaNotificacionEnum registrada tiene un asunto y un cuerpo HTML con
+campos {campo} / {campo:formato} que se resuelven contra el payload de la
+notificación. Se compilan una vez al importar el módulo (string.Formatter
+parsea el texto y queda un formato posicional más una tupla de
+formateadores), así que renderizar es una sola llamada a str.format. Cada
+formateador cachea sus últimos valores (LRU), y los valores del cuerpo se
+escapan con html.escape; el asunto es texto plano.
+
+Las notificaciones guardan solo plantilla + payload (mensaje NULL) y se
+renderizan al enviarlas, también en bloque (renderizar_lote).
+"""
+import html
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from models.notificaciones import PlantillaNotificacionEnum
+
+
+def _fecha(valor: Any) -> str:
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.strftime("%d/%m/%Y %H:%M")
+
+
+# Formatos con nombre ({fecha_cita:fecha}); cualquier otro se pasa a format()
+FORMATOS: Dict[str, Callable[[Any], str]] = {
+    "fecha": _fecha,
+}
+
+# Valores formateados cacheados por campo: fecha, profesional, unidad... se
+# repiten entre miles de destinatarios
+TAMANO_CACHE_VALORES = 4096
+
+
+def _formateador(formato: str, escapar: bool) -> Callable[[Any], str]:
+    if formato in FORMATOS:
+        convertir = FORMATOS[formato]
+    elif formato:
+        def convertir(valor: Any) -> str:
+            # Montos guardados como texto en el payload ({total:.2f})
+            if isinstance(valor, str) and formato[-1:] in "eEfFgGn%":
+                valor = float(valor)
+            return format(valor, formato)
+    else:
+        convertir = str
+    formatear = (lambda valor: html.escape(convertir(valor))) if escapar else convertir
+    cacheado = lru_cache(maxsize=TAMANO_CACHE_VALORES)(formatear)
+
+    def formatear_cacheado(valor: Any) -> str:
+        try:
+            return cacheado(valor)
+        except TypeError:  # listas/dicts en el payload: no hashables
+            return formatear(valor)
+    return formatear_cacheado
+
+
+class PlantillaCompilada:
+    """Texto compilado: formato posicional + (campo, formateador) por hueco"""
+
+    __slots__ = ("nombre", "formato", "campos")
+
+    def __init__(self, nombre: str, texto: str, escapar: bool):
+        self.nombre = nombre
+        partes: List[str] = []
+        campos: List[Tuple[str, Callable[[Any], str]]] = []
+        for literal, campo, formato, conversion in Formatter().parse(texto):
+            partes.append(literal.replace("{", "{{").replace("}", "}}"))
+            if campo is not None:
+                if not campo or conversion:
+                    raise ValueError(f"Plantilla {nombre}: campo inválido '{{{campo}}}'")
+                partes.append(f"{{{len(campos)}}}")
+                campos.append((campo, _formateador(formato or "", escapar)))
+        self.formato = "".join(partes)
+        self.campos = tuple(campos)
+
+    def renderizar(self, payload: Dict[str, Any]) -> str:
+        try:
+            return self.formato.format(*[formatear(payload[campo]) for campo, formatear in self.campos])
+        except KeyError as e:
+            raise ValueError(f"Plantilla {self.nombre}: falta {e} en el payload") from None
+
+
+# Textos fuente: asunto (texto plano) y cuerpo HTML
+PLANTILLAS: Dict[PlantillaNotificacionEnum, Tuple[str, str]] = {
+    PlantillaNotificacionEnum.CONFIRMACION_CITA: (
+        "Confirmación de Cita Médica",
+        """
+        <h2>Confirmación de Cita</h2>
+        <p>Estimado/a {nombre_paciente},</p>
+        <p>Su cita ha sido confirmada con los siguientes detalles:</p>
+        <ul>
+            <li><strong>Fecha y hora:</strong> {fecha_cita:fecha}</li>
+            <li><strong>Profesional:</strong> {profesional}</li>
+            <li><strong>Ubicación:</strong> {unidad}</li>
+        </ul>
+        <p>Por favor llegue 15 minutos antes de su cita.</p>
+        <p>Saludos,<br>Sistema Médico</p>
+        """
+    ),
+    PlantillaNotificacionEnum.RECORDATORIO_CITA: (
+        "Recordatorio de Cita Médica",
+        """
+        <h2>Recordatorio de Cita</h2>
+        <p>Estimado/a {nombre_paciente},</p>
+        <p>Le recordamos su próxima cita:</p>
+        <ul>
+            <li><strong>Fecha y hora:</strong> {fecha_cita:fecha}</li>
+            <li><strong>Profesional:</strong> {profesional}</li>
+            <li><strong>Ubicación:</strong> {unidad}</li>
+        </ul>
+        <p>Si no puede asistir, por favor cancele su cita con anticipación.</p>
+        <p>Saludos,<br>Sistema Médico</p>
+        """
+    ),
+    PlantillaNotificacionEnum.RESULTADO_DISPONIBLE: (
+        "Resultados Disponibles",
+        """
+        <h2>Resultados de Examen Disponibles</h2>
+        <p>Estimado/a {nombre_paciente},</p>
+        <p>Sus resultados de <strong>{tipo_examen}</strong> ya están disponibles.</p>
+        <p>Por favor acceda a su portal de paciente o comuníquese con nosotros para obtenerlos.</p>
+        <p>Saludos,<br>Sistema Médico</p>
+        """
+    ),
+    PlantillaNotificacionEnum.FACTURA_EMITIDA: (
+        "Factura {numero_factura} Emitida",
+        """
+        <h2>Nueva Factura Emitida</h2>
+        <p>Estimado/a {nombre},</p>
+        <p>Se ha emitido la factura <strong>{numero_factura}</strong> por un monto de <strong>{moneda} {total:.2f}</strong>.</p>
+        <p>Por favor proceda con el pago a la brevedad posible.</p>
+        <p>Saludos,<br>Departamento de Facturación</p>
+        """
+    ),
+}
+
+
+class RegistroPlantillas:
+    """Plantillas compiladas por PlantillaNotificacionEnum"""
+
+    def __init__(self, fuentes: Dict[PlantillaNotificacionEnum, Tuple[str, str]] = PLANTILLAS):
+        self._compiladas: Dict[PlantillaNotificacionEnum, Tuple[PlantillaCompilada, PlantillaCompilada]] = {
+            plantilla: (
+                PlantillaCompilada(f"{plantilla.value}.asunto", asunto, escapar=False),
+                PlantillaCompilada(f"{plantilla.value}.cuerpo", cuerpo, escapar=True),
+            )
+            for plantilla, (asunto, cuerpo) in fuentes.items()
+        }
+
+    def tiene(self, plantilla: Optional[PlantillaNotificacionEnum]) -> bool:
+        return plantilla in self._compiladas
+
+    def renderizar(self, plantilla: PlantillaNotificacionEnum, payload: Dict[str, Any]) -> Tuple[str, str]:
+        """(asunto, mensaje HTML)"""
+        asunto, cuerpo = self._compiladas[plantilla]
+        return asunto.renderizar(payload), cuerpo.renderizar(payload)
+
+    def renderizar_lote(
+        self,
+        plantilla: PlantillaNotificacionEnum,
+        payloads: Iterable[Dict[str, Any]]
+    ) -> List[Tuple[str, str]]:
+        asunto, cuerpo = self._compiladas[plantilla]
+        return [(asunto.renderizar(p), cuerpo.renderizar(p)) for p in payloads]
+
+
+# Instancia global: compila todas las plantillas al importar
+plantillas = RegistroPlantillas()
@@ -0,0 +1,219 @@
+"""
+Despachador del outbox de notificaciones
+Las peticiones solo insertan filas PENDIENTE (NotificationService.encolar)
+en su propia transacción. Este worker reclama las inmediatas (las que
+tienen fecha_programada las dispara services.reminder_scheduler) por lotes con
+SELECT ... FOR UPDATE SKIP LOCKED, las envía y actualiza su estado con un
+solo commit por lote. Los emails se agrupan en peticiones multi-destinatario
+(NotificationService.enviar_lote); SMS, WhatsApp y Push salen por los pools de
+services.notification_channels, y cada canal tiene su propio despachador
+(channel_workers) para que uno lento no frene a los demás. Varios workers (tareas en este proceso o
+en otros procesos de uvicorn) no se pisan: cada uno salta las filas que otro
+tiene bloqueadas.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_
+from config import settings
+from database import SessionLocal
+from models.notificaciones import Notificacion, EstadoNotificacionEnum, TipoNotificacionEnum
+from services.notification_channels import ChannelDispatcher, channel_dispatcher
+from services.notification_service import NotificationService, notification_service
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationWorker:
+    """
+    Pool de tareas que vacían el outbox
+    - Cada tarea procesa un lote en un hilo (el envío es bloqueante)
+    - Con lote lleno sigue de inmediato; si no, espera poll_interval
+    - Las filas quedan bloqueadas mientras se envían: si el proceso cae,
+      la transacción se revierte y vuelven a estar PENDIENTE
+    """
+
+    def __init__(
+        self,
+        service: NotificationService = notification_service,
+        session_factory: Callable = SessionLocal,
+        workers: int = settings.NOTIFICATION_WORKERS,
+        batch_size: int = settings.NOTIFICATION_BATCH_SIZE,
+        poll_interval: float = settings.NOTIFICATION_POLL_INTERVAL_SECONDS,
+        tipos: Optional[Sequence[TipoNotificacionEnum]] = None,
+        canales: ChannelDispatcher = channel_dispatcher
+    ):
+        self.service = service
+        self.canales = canales
+        self.tipos = list(tipos) if tipos else None
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Contadores
+        self.lotes = 0
+        self.enviadas = 0
+        self.fallidas = 0
+        self.errores_lote = 0
+        self.ultimo_lote_ms = 0.0
+
+    # ==================== LOTE ====================
+
+    def procesar_lote(self, ids: Optional[List[int]] = None) -> int:
+        """
+        Reclama, envía y actualiza hasta batch_size notificaciones; retorna cuántas procesó
+        Sin ids toma las inmediatas (sin fecha_programada) de sus tipos; con
+        ids, las programadas ya vencidas que indique services.reminder_scheduler
+        """
+        if ids is None:
+            filtro = Notificacion.fecha_programada.is_(None)
+            if self.tipos:
+                filtro = and_(Notificacion.tipo.in_(self.tipos), filtro)
+        else:
+            filtro = and_(
+                Notificacion.id.in_(ids),
+                Notificacion.fecha_programada <= datetime.utcnow(),
+                Notificacion.is_active == True
+            )
+        return self._procesar(
+            and_(Notificacion.estado == EstadoNotificacionEnum.PENDIENTE, filtro), Notificacion.id
+        )
+
+    def procesar_reintentos(self) -> int:
+        """
+        Reintenta hasta batch_size notificaciones en ERROR de sus tipos cuyo
+        próximo intento ya venció, en su propia fila (índice estado +
+        fecha_proximo_intento)
+        """
+        condicion = and_(
+            Notificacion.estado == EstadoNotificacionEnum.ERROR,
+            Notificacion.fecha_proximo_intento <= datetime.utcnow()
+        )
+        if self.tipos:
+            condicion = and_(condicion, Notificacion.tipo.in_(self.tipos))
+        return self._procesar(condicion, Notificacion.fecha_proximo_intento)
+
+    def _procesar(self, condicion, orden) -> int:
+        db = self.session_factory()
+        inicio = time.perf_counter()
+        try:
+            pendientes = (
+                db.query(Notificacion)
+                .filter(condicion)
+                .order_by(orden)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not pendientes:
+                db.rollback()
+                return 0
+
+            # Emails: peticiones multi-destinatario y un solo UPDATE para todos
+            emails = [n for n in pendientes if n.tipo == TipoNotificacionEnum.EMAIL]
+            resultado = self.service.enviar_lote(db, emails)
+            self.enviadas += resultado["enviadas"]
+            self.fallidas += resultado["fallidas"]
+
+            # Resto de canales: pools con límites propios (en el event loop)
+            otras = [n for n in pendientes if n.tipo != TipoNotificacionEnum.EMAIL]
+            resultados = self.canales.entregar(otras)
+            for notificacion in otras:
+                notificacion.intentos += 1
+                resultado = resultados[notificacion.id]
+                if isinstance(resultado, Exception):
+                    self.service.reintentos.registrar_fallo(notificacion, str(resultado))
+                    self.fallidas += 1
+                    logger.error(f"Error enviando notificación {notificacion.id}: {resultado}")
+                    continue
+                notificacion.proveedor_id = resultado
+                notificacion.estado = EstadoNotificacionEnum.ENVIADO
+                notificacion.fecha_enviado = datetime.utcnow()
+                notificacion.error_mensaje = None
+                notificacion.fecha_proximo_intento = None
+                self.enviadas += 1
+
+            db.commit()
+            self.lotes += 1
+            return len(pendientes)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            self.ultimo_lote_ms = (time.perf_counter() - inicio) * 1000
+
+    # ==================== TAREAS ====================
+
+    def despertar(self) -> None:
+        """Adelanta el próximo sondeo (p. ej. tras encolar desde este proceso; seguro desde otros hilos)"""
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                procesadas = await asyncio.to_thread(self.procesar_lote)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores_lote += 1
+                procesadas = 0
+                logger.error(f"Error en el lote de notificaciones: {e}", exc_info=True)
+
+            if procesadas < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def start(self) -> None:
+        """Arranca las tareas (llamar dentro del event loop)"""
+        if self._tasks or self.workers <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        canales = ", ".join(t.value for t in self.tipos) if self.tipos else "todos los canales"
+        logger.info(
+            f"Despachador de notificaciones ({canales}): {self.workers} workers, lotes de {self.batch_size}"
+        )
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._tasks),
+            "batch_size": self.batch_size,
+            "batches": self.lotes,
+            "sent": self.enviadas,
+            "failed": self.fallidas,
+            "batch_errors": self.errores_lote,
+            "last_batch_ms": round(self.ultimo_lote_ms, 3)
+        }
+
+
+# Instancia global del despachador de emails (y de los recordatorios)
+notification_worker = NotificationWorker(tipos=[TipoNotificacionEnum.EMAIL])
+
+# Un despachador por canal; cada reclamo llena las peticiones en vuelo de su pool
+channel_workers: Dict[TipoNotificacionEnum, NotificationWorker] = {
+    tipo: NotificationWorker(tipos=[tipo], workers=1, batch_size=pool.batch_size * pool.concurrencia)
+    for tipo, pool in channel_dispatcher.pools.items()
+}
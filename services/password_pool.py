@@ -0,0 +1,146 @@
+"""
+Pool de procesos para hash y verificación de contraseñas
+bcrypt consume ~100 ms de CPU por operación: se ejecuta en procesos
+dedicados con una cola de admisión acotada. Si la cola está llena la
+petición se rechaza de inmediato con 503 en lugar de acumularse.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Contexto de encriptación (también se usa dentro de los procesos hijos)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verificar(plain_password: str, hashed_password: str, enviado: float):
+    """Se ejecuta en el proceso hijo; retorna (resultado, segundos en cola)"""
+    espera = time.time() - enviado
+    return pwd_context.verify(plain_password, hashed_password), espera
+
+
+def _generar_hash(password: str, enviado: float):
+    """Se ejecuta en el proceso hijo; retorna (hash, segundos en cola)"""
+    espera = time.time() - enviado
+    return pwd_context.hash(password), espera
+
+
+class PasswordHasherPool:
+    """
+    Ejecuta bcrypt en un ProcessPoolExecutor
+    - max_pending limita las operaciones admitidas (en cola + en ejecución)
+    - workers=0 ejecuta en línea (scripts, tests)
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING,
+        timeout_seconds: float = settings.PASSWORD_HASH_TIMEOUT_SECONDS
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+        # Métricas
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def start(self) -> None:
+        """Crea los procesos por adelantado para no pagar el arranque en el primer login"""
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        warmup = [executor.submit(_generar_hash, "warmup", time.time()) for _ in range(self.workers)]
+        for future in warmup:
+            future.result()
+        logger.info(f"Pool de contraseñas iniciado ({self.workers} procesos)")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _ejecutar(self, funcion, *args):
+        if self.workers <= 0:
+            resultado, _ = funcion(*args, time.time())
+            return resultado
+
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de autenticación saturado, intente nuevamente",
+                headers={"Retry-After": "1"}
+            )
+
+        with self._stats_lock:
+            self.in_flight += 1
+        try:
+            future = self._get_executor().submit(funcion, *args, time.time())
+            try:
+                resultado, espera = future.result(timeout=self.timeout_seconds)
+            except FutureTimeoutError:
+                future.cancel()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Tiempo de espera agotado en autenticación",
+                    headers={"Retry-After": "1"}
+                )
+            with self._stats_lock:
+                self.completed += 1
+                self.total_wait_seconds += espera
+                self.max_wait_seconds = max(self.max_wait_seconds, espera)
+            return resultado
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._ejecutar(_verificar, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._ejecutar(_generar_hash, password)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": round(self.total_wait_seconds * 1000 / self.completed, 3) if self.completed else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_seconds * 1000, 3)
+        }
+
+
+# Instancia global del pool
+password_pool = PasswordHasherPool()
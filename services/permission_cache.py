@@ -0,0 +1,209 @@
+"""
+Caché de permisos por usuario
+Caché LRU con TTL, local al proceso: usuario_id -> roles y claves de permiso.
+Se invalida con eventos de SQLAlchemy sobre usuario_rol, rol_permiso,
+Usuario.estado y Permiso.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, NamedTuple, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session, selectinload
+from config import settings
+from models.auditoria import Usuario, Rol, Permiso
+
+
+class PermisosUsuario(NamedTuple):
+    """Entrada de la caché"""
+    usuario_id: int
+    username: str
+    email: str
+    estado: bool
+    roles: FrozenSet[str]
+    permisos: FrozenSet[str]
+
+
+class PermissionCache:
+    """
+    Caché LRU con expiración por TTL
+    Segura para hilos: los endpoints síncronos corren en el threadpool
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = settings.PERMISSION_CACHE_TTL_SECONDS,
+        max_size: int = settings.PERMISSION_CACHE_MAX_SIZE
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, usuario_id: int) -> Optional[PermisosUsuario]:
+        with self._lock:
+            item = self._data.get(usuario_id)
+            if item is None:
+                self.misses += 1
+                return None
+            expira, entrada = item
+            if expira < time.monotonic():
+                del self._data[usuario_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(usuario_id)
+            self.hits += 1
+            return entrada
+
+    def set(self, entrada: PermisosUsuario) -> None:
+        with self._lock:
+            self._data[entrada.usuario_id] = (time.monotonic() + self.ttl_seconds, entrada)
+            self._data.move_to_end(entrada.usuario_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, usuario_id: int) -> None:
+        with self._lock:
+            if self._data.pop(usuario_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def obtener(self, db: Session, usuario_id: int) -> Optional[PermisosUsuario]:
+        """Devuelve la entrada desde la caché o la carga de la BD"""
+        entrada = self.get(usuario_id)
+        if entrada is not None:
+            return entrada
+
+        # Usuario, roles y permisos en 3 consultas fijas (sin lazy loads)
+        usuario = db.query(Usuario).options(
+            selectinload(Usuario.roles).selectinload(Rol.permisos)
+        ).filter(Usuario.id == usuario_id).first()
+
+        if not usuario:
+            return None
+
+        entrada = PermisosUsuario(
+            usuario_id=usuario.id,
+            username=usuario.username,
+            email=usuario.email,
+            estado=usuario.estado,
+            roles=frozenset(r.nombre for r in usuario.roles),
+            permisos=frozenset(p.clave for r in usuario.roles for p in r.permisos)
+        )
+        self.set(entrada)
+        return entrada
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Instancia global de la caché
+permission_cache = PermissionCache()
+
+
+# ==================== INVALIDACIÓN POR EVENTOS ====================
+# Se invalida en cuanto cambia el objeto y otra vez tras el commit, para que
+# una lectura concurrente previa al commit no deje datos viejos en la caché.
+
+_TODOS = "*"
+
+
+def _marcar(target, usuario_id) -> None:
+    if usuario_id is None:
+        return
+    if usuario_id == _TODOS:
+        permission_cache.clear()
+    else:
+        permission_cache.invalidate(usuario_id)
+
+    session = object_session(target)
+    if session is not None:
+        pendientes: Set = session.info.setdefault("permisos_invalidar", set())
+        pendientes.add(usuario_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(session):
+    pendientes = session.info.pop("permisos_invalidar", None)
+    if not pendientes:
+        return
+    if _TODOS in pendientes:
+        permission_cache.clear()
+        return
+    for usuario_id in pendientes:
+        permission_cache.invalidate(usuario_id)
+
+
+# usuario_rol: cambios desde cualquiera de los dos lados de la relación
+@event.listens_for(Usuario.roles, "append")
+@event.listens_for(Usuario.roles, "remove")
+def _usuario_roles_cambio(target, value, initiator):
+    _marcar(target, target.id)
+
+
+@event.listens_for(Usuario.roles, "bulk_replace")
+def _usuario_roles_reemplazo(target, values, initiator):
+    _marcar(target, target.id)
+
+
+@event.listens_for(Rol.usuarios, "append")
+@event.listens_for(Rol.usuarios, "remove")
+def _rol_usuarios_cambio(target, value, initiator):
+    _marcar(target, value.id)
+
+
+# rol_permiso: afecta a todos los usuarios del rol
+@event.listens_for(Rol.permisos, "append")
+@event.listens_for(Rol.permisos, "remove")
+@event.listens_for(Permiso.roles, "append")
+@event.listens_for(Permiso.roles, "remove")
+def _rol_permisos_cambio(target, value, initiator):
+    _marcar(target, _TODOS)
+
+
+@event.listens_for(Rol.permisos, "bulk_replace")
+@event.listens_for(Permiso.roles, "bulk_replace")
+def _rol_permisos_reemplazo(target, values, initiator):
+    _marcar(target, _TODOS)
+
+
+# Usuario.estado
+@event.listens_for(Usuario.estado, "set")
+def _usuario_estado_cambio(target, value, oldvalue, initiator):
+    if value != oldvalue:
+        _marcar(target, target.id)
+
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _usuario_cambio(mapper, connection, target):
+    _marcar(target, target.id)
+
+
+# Permiso y Rol: cualquier cambio invalida toda la caché
+@event.listens_for(Permiso, "after_insert")
+@event.listens_for(Permiso, "after_update")
+@event.listens_for(Permiso, "after_delete")
+@event.listens_for(Rol, "after_update")
+@event.listens_for(Rol, "after_delete")
+def _catalogo_cambio(mapper, connection, target):
+    _marcar(target, _TODOS)
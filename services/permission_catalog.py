@@ -0,0 +1,97 @@
+"""
+Catálogo versionado de permisos
+Asigna a cada Permiso.clave una posición fija (orden alfabético) para
+codificar los permisos de un usuario como un bitset compacto dentro del
+access token. La versión es un hash de las claves: si el catálogo cambia,
+los tokens emitidos con la versión anterior vuelven a resolverse en la BD.
+"""
+import base64
+import hashlib
+import threading
+import time
+from typing import FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import settings
+from models.auditoria import Permiso
+
+
+class PermissionCatalog:
+    """Catálogo de claves de permiso con índice de bits"""
+
+    def __init__(self, ttl_seconds: float = settings.PERMISSION_CATALOG_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.claves: Tuple[str, ...] = ()
+        self.indice = {}
+        self.version: Optional[str] = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def calcular_version(claves: Iterable[str]) -> str:
+        return hashlib.sha256("\n".join(claves).encode("utf-8")).hexdigest()[:12]
+
+    def cargar(self, db: Session) -> None:
+        """Carga el catálogo desde la tabla permisos"""
+        claves = tuple(sorted(c for (c,) in db.query(Permiso.clave).all()))
+        with self._lock:
+            self.claves = claves
+            self.indice = {clave: i for i, clave in enumerate(claves)}
+            self.version = self.calcular_version(claves)
+            self._expira = time.monotonic() + self.ttl_seconds
+
+    def vigente(self) -> bool:
+        return self.version is not None and time.monotonic() < self._expira
+
+    def asegurar(self, db: Session) -> None:
+        """Recarga el catálogo si no está cargado o expiró"""
+        if not self.vigente():
+            self.cargar(db)
+
+    def invalidar(self) -> None:
+        self._expira = 0.0
+
+    def codificar(self, permisos: Iterable[str]) -> str:
+        """Convierte un conjunto de claves en un bitset base64url"""
+        bits = 0
+        for clave in permisos:
+            posicion = self.indice.get(clave)
+            if posicion is not None:
+                bits |= 1 << posicion
+        data = bits.to_bytes((len(self.claves) + 7) // 8 or 1, "little")
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+    def decodificar(self, bitset: str) -> FrozenSet[str]:
+        """Convierte un bitset base64url en el conjunto de claves"""
+        data = base64.urlsafe_b64decode(bitset + "=" * (-len(bitset) % 4))
+        bits = int.from_bytes(data, "little")
+        claves = self.claves
+        return frozenset(
+            claves[i] for i in range(min(bits.bit_length(), len(claves)))
+            if bits >> i & 1
+        )
+
+    def permisos_desde_claims(self, payload: dict) -> Optional[FrozenSet[str]]:
+        """
+        Devuelve los permisos embebidos en el token si su versión coincide
+        con el catálogo vigente; None si hay que resolverlos en la BD
+        """
+        bitset = payload.get("perm")
+        if bitset is None or not self.vigente() or payload.get("pv") != self.version:
+            return None
+        try:
+            return self.decodificar(bitset)
+        except (ValueError, TypeError):
+            return None
+
+
+# Instancia global del catálogo
+permission_catalog = PermissionCatalog()
+
+
+@event.listens_for(Permiso, "after_insert")
+@event.listens_for(Permiso, "after_update")
+@event.listens_for(Permiso, "after_delete")
+def _catalogo_modificado(mapper, connection, target):
+    permission_catalog.invalidar()
@@ -0,0 +1,230 @@
+"""
+Rate limiting por token bucket
+Cada clave (usuario o IP) tiene un bucket de `capacidad` tokens que se
+recarga a `capacidad / periodo` tokens por segundo. Un bucket inactivo el
+tiempo suficiente para llenarse equivale a uno nuevo, así que se puede
+descartar sin perder información (eviction perezosa).
+
+Backends:
+- MemoryRateLimitBackend: dict LRU en el proceso (un solo worker)
+- SQLiteRateLimitBackend: archivo SQLite compartido entre workers de uvicorn
+  (si el archivo no responde a tiempo la petición se deja pasar: fail open)
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Union
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResultadoLimite(NamedTuple):
+    """Resultado de consumir un token"""
+    permitido: bool
+    restantes: int
+    retry_after: float
+
+
+class TokenBucket:
+    """Aritmética del token bucket (sin estado propio)"""
+
+    def __init__(self, capacidad: float, periodo_segundos: float = 60.0):
+        self.capacidad = capacidad
+        self.tasa = capacidad / periodo_segundos
+        # Tiempo para llenar un bucket vacío: pasado esto la entrada sobra
+        self.tiempo_lleno = periodo_segundos
+
+    def consumir(self, tokens: float, actualizado: float, ahora: float, costo: float = 1.0):
+        """Retorna (tokens_nuevos, ResultadoLimite)"""
+        tokens = min(self.capacidad, tokens + (ahora - actualizado) * self.tasa)
+        if tokens >= costo:
+            tokens -= costo
+            return tokens, ResultadoLimite(True, int(tokens), 0.0)
+        return tokens, ResultadoLimite(False, int(tokens), (costo - tokens) / self.tasa)
+
+
+class MemoryRateLimitBackend:
+    """Buckets en memoria del proceso, O(1) por petición"""
+
+    bloqueante = False
+
+    def __init__(self, bucket: TokenBucket, max_claves: int = settings.RATE_LIMIT_MAX_KEYS):
+        self.bucket = bucket
+        self.max_claves = max_claves
+        self._data: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.permitidas = 0
+        self.rechazadas = 0
+        self.descartadas = 0
+
+    def _evictar(self, ahora: float) -> None:
+        # La entrada más antigua es la que más tiempo lleva sin uso
+        while self._data:
+            clave, (_, actualizado) = next(iter(self._data.items()))
+            if len(self._data) <= self.max_claves and ahora - actualizado < self.bucket.tiempo_lleno:
+                break
+            del self._data[clave]
+            self.descartadas += 1
+
+    def consumir(self, clave: str, costo: float = 1.0) -> ResultadoLimite:
+        ahora = time.monotonic()
+        with self._lock:
+            estado = self._data.get(clave)
+            if estado is None:
+                estado = [self.bucket.capacidad, ahora]
+                self._data[clave] = estado
+            else:
+                self._data.move_to_end(clave)
+
+            estado[0], resultado = self.bucket.consumir(estado[0], estado[1], ahora, costo)
+            estado[1] = ahora
+            self._evictar(ahora)
+
+            if resultado.permitido:
+                self.permitidas += 1
+            else:
+                self.rechazadas += 1
+        return resultado
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "keys": len(self._data),
+            "allowed": self.permitidas,
+            "limited": self.rechazadas,
+            "evicted": self.descartadas
+        }
+
+
+class SQLiteRateLimitBackend:
+    """
+    Buckets en un archivo SQLite compartido por todos los workers
+    Cada consumo es una transacción BEGIN IMMEDIATE (lectura + escritura
+    atómica entre procesos). El estado se puede perder sin consecuencias,
+    por eso se usa WAL con synchronous=OFF. Si SQLite falla (bloqueo que
+    supera el timeout, disco lleno) la petición se permite y se cuenta.
+    """
+
+    bloqueante = True
+
+    # Limpieza de buckets llenos cada N consumos
+    LIMPIEZA_CADA = 1000
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        path: str = settings.RATE_LIMIT_SQLITE_PATH,
+        timeout_seconds: float = 1.0
+    ):
+        self.bucket = bucket
+        self.path = path
+        self.timeout_seconds = timeout_seconds
+        self._local = threading.local()
+        self._contador = 0
+
+        # Contadores (de este proceso)
+        self.permitidas = 0
+        self.rechazadas = 0
+        self.errores = 0
+
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conn = self._conexion()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "clave TEXT PRIMARY KEY, tokens REAL NOT NULL, actualizado REAL NOT NULL)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout_seconds, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def consumir(self, clave: str, costo: float = 1.0) -> ResultadoLimite:
+        try:
+            return self._consumir(clave, costo)
+        except sqlite3.OperationalError as e:
+            self.errores += 1
+            logger.warning(f"Rate limit SQLite no disponible, se permite la petición: {e}")
+            return ResultadoLimite(True, int(self.bucket.capacidad), 0.0)
+
+    def _consumir(self, clave: str, costo: float) -> ResultadoLimite:
+        # Reloj de pared: monotonic no es comparable entre procesos
+        ahora = time.time()
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conn.execute(
+                "SELECT tokens, actualizado FROM rate_limit_buckets WHERE clave = ?", (clave,)
+            ).fetchone()
+            tokens, actualizado = fila if fila else (self.bucket.capacidad, ahora)
+            tokens, resultado = self.bucket.consumir(tokens, actualizado, ahora, costo)
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (clave, tokens, actualizado) VALUES (?, ?, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET tokens = excluded.tokens, actualizado = excluded.actualizado",
+                (clave, tokens, ahora)
+            )
+
+            self._contador += 1
+            if self._contador % self.LIMPIEZA_CADA == 0:
+                conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE actualizado < ?",
+                    (ahora - self.bucket.tiempo_lleno,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        if resultado.permitido:
+            self.permitidas += 1
+        else:
+            self.rechazadas += 1
+        return resultado
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "allowed": self.permitidas,
+            "limited": self.rechazadas,
+            "errors": self.errores
+        }
+
+
+def crear_backend(
+    por_minuto: int = settings.RATE_LIMIT_PER_MINUTE,
+    tipo: str = settings.RATE_LIMIT_BACKEND
+):
+    """Crea el backend configurado; None si el rate limiting está desactivado"""
+    if por_minuto <= 0:
+        return None
+    bucket = TokenBucket(capacidad=por_minuto, periodo_segundos=60.0)
+    if tipo == "sqlite":
+        return SQLiteRateLimitBackend(bucket)
+    if tipo == "memory":
+        return MemoryRateLimitBackend(bucket)
+    raise ValueError(f"RATE_LIMIT_BACKEND no soportado: {tipo}")
+
+
+def segundos_retry_after(resultado: ResultadoLimite) -> int:
+    """Valor entero para la cabecera Retry-After"""
+    return max(1, math.ceil(resultado.retry_after))
+
+
+# Instancia global del backend
+rate_limit_backend: Optional[Union[MemoryRateLimitBackend, SQLiteRateLimitBackend]] = crear_backend()
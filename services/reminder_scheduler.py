@@ -0,0 +1,218 @@
+"""
+Programador de recordatorios de cita
+Cada ventana (REMINDER_WINDOW_SECONDS):
+1. Materializa en bloque los recordatorios de las citas CONFIRMADA que
+   empiezan antes de ahora + REMINDER_LEAD_HOURS + la ventana: un SELECT con
+   anti-join por clave_idempotencia y un INSERT IGNORE multi-fila
+2. Carga en un heap (fecha_programada, id) las notificaciones programadas
+   PENDIENTE que vencen antes del fin de la ventana
+Entre ventanas duerme hasta el tope del heap y dispara lo vencido
+reclamándolo por id (NotificationWorker.procesar_lote), sin recorrer la tabla.
+
+Idempotencia: la clave única impide duplicar un recordatorio aunque varios
+workers materialicen la misma ventana o el proceso se reinicie, y el reclamo
+con SKIP LOCKED + estado PENDIENTE impide enviarlo dos veces aunque el mismo
+id esté en el heap de varios procesos.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, cast, exists, insert, literal
+from config import settings
+from database import SessionLocal
+from models.agenda_citas import Cita, EstadoCitaEnum
+from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
+from models.notificaciones import Notificacion, EstadoNotificacionEnum, TipoNotificacionEnum
+from services.notification_service import NotificationService, PREFIJO_RECORDATORIO
+from services.notification_worker import NotificationWorker, notification_worker
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """Materializa recordatorios por ventana y los dispara desde un heap"""
+
+    def __init__(
+        self,
+        worker: NotificationWorker = notification_worker,
+        session_factory: Callable = SessionLocal,
+        enabled: bool = settings.REMINDER_SCHEDULER_ENABLED,
+        lead_hours: float = settings.REMINDER_LEAD_HOURS,
+        window_seconds: float = settings.REMINDER_WINDOW_SECONDS
+    ):
+        self.worker = worker
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.anticipacion = timedelta(hours=lead_hours)
+        self.ventana = timedelta(seconds=window_seconds)
+        self._heap: List[Tuple[datetime, int]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # Contadores
+        self.ventanas = 0
+        self.materializados = 0
+        self.disparados = 0
+        self.errores = 0
+
+    # ==================== VENTANA ====================
+
+    def materializar(self, ahora: Optional[datetime] = None) -> int:
+        """Inserta los recordatorios que falten para las citas de la ventana; retorna cuántos insertó"""
+        ahora = ahora or datetime.utcnow()
+        hasta = ahora + self.anticipacion + self.ventana
+
+        db = self.session_factory()
+        try:
+            citas = (
+                db.query(
+                    Cita.id, Cita.inicio,
+                    PersonaAtendida.correo, PersonaAtendida.nombres, PersonaAtendida.apellidos,
+                    Profesional.nombres.label("profesional_nombres"),
+                    Profesional.apellidos.label("profesional_apellidos"),
+                    UnidadAtencion.nombre.label("unidad")
+                )
+                .join(Cita.persona).join(Cita.profesional).join(Cita.unidad)
+                .filter(
+                    Cita.estado == EstadoCitaEnum.CONFIRMADA,
+                    Cita.inicio > ahora,
+                    Cita.inicio <= hasta,
+                    ~exists().where(
+                        Notificacion.clave_idempotencia == literal(PREFIJO_RECORDATORIO) + cast(Cita.id, String)
+                    )
+                )
+                .all()
+            )
+            if not citas:
+                return 0
+
+            filas = []
+            for c in citas:
+                inicio = c.inicio.replace(tzinfo=None)
+                contenido = NotificationService.contenido_recordatorio_cita(
+                    nombre_paciente=f"{c.nombres} {c.apellidos}",
+                    fecha_cita=inicio,
+                    profesional=f"{c.profesional_nombres} {c.profesional_apellidos}",
+                    unidad=c.unidad
+                )
+                filas.append({
+                    "tipo": TipoNotificacionEnum.EMAIL,
+                    "destinatario": c.correo,
+                    "estado": EstadoNotificacionEnum.PENDIENTE,
+                    "fecha_programada": max(inicio - self.anticipacion, ahora),
+                    "clave_idempotencia": NotificationService.clave_recordatorio(c.id),
+                    **contenido
+                })
+
+            # Otro worker pudo insertar la misma clave entre el SELECT y el INSERT
+            insertados = db.execute(
+                insert(Notificacion.__table__)
+                .prefix_with("IGNORE", dialect="mysql")
+                .prefix_with("OR IGNORE", dialect="sqlite"),
+                filas
+            ).rowcount
+            db.commit()
+            self.materializados += insertados
+            return insertados
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def cargar(self, ahora: Optional[datetime] = None) -> int:
+        """Reconstruye el heap con las programadas PENDIENTE que vencen en la ventana"""
+        hasta = (ahora or datetime.utcnow()) + self.ventana
+        db = self.session_factory()
+        try:
+            filas = (
+                db.query(Notificacion.fecha_programada, Notificacion.id)
+                .filter(
+                    Notificacion.estado == EstadoNotificacionEnum.PENDIENTE,
+                    Notificacion.is_active == True,
+                    Notificacion.fecha_programada <= hasta
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        heap = [(fecha.replace(tzinfo=None), id_) for fecha, id_ in filas]
+        heapq.heapify(heap)
+        self._heap = heap
+        return len(heap)
+
+    def procesar_ventana(self) -> None:
+        self.materializar()
+        self.cargar()
+        self.ventanas += 1
+
+    def vencidas(self, ahora: Optional[datetime] = None) -> List[int]:
+        """Saca del heap los ids cuya fecha_programada ya pasó"""
+        ahora = ahora or datetime.utcnow()
+        ids = []
+        while self._heap and self._heap[0][0] <= ahora:
+            ids.append(heapq.heappop(self._heap)[1])
+        return ids
+
+    # ==================== TAREA ====================
+
+    async def _run(self) -> None:
+        proxima_ventana = 0.0
+        while True:
+            try:
+                if time.monotonic() >= proxima_ventana:
+                    proxima_ventana = time.monotonic() + self.ventana.total_seconds()
+                    await asyncio.to_thread(self.procesar_ventana)
+
+                ids = self.vencidas()
+                for i in range(0, len(ids), self.worker.batch_size):
+                    self.disparados += await asyncio.to_thread(
+                        self.worker.procesar_lote, ids[i:i + self.worker.batch_size]
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Error en el programador de recordatorios: {e}", exc_info=True)
+
+            espera = proxima_ventana - time.monotonic()
+            if self._heap:
+                espera = min(espera, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            await asyncio.sleep(max(espera, 0.05))
+
+    def start(self) -> None:
+        """Arranca la tarea (llamar dentro del event loop)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Programador de recordatorios: {self.anticipacion.total_seconds() / 3600:.0f} h de anticipación, "
+            f"ventanas de {self.ventana.total_seconds():.0f} s"
+        )
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "windows": self.ventanas,
+            "materialized": self.materializados,
+            "fired": self.disparados,
+            "scheduled": len(self._heap),
+            "errors": self.errores
+        }
+
+
+# Instancia global del programador
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,244 @@
+"""
+Almacén de sesiones de refresh token
+Cada login crea una SesionUsuario indexada por jti. Las revocaciones se
+reflejan en un filtro de Bloom en memoria que se consulta antes de tocar
+la BD: si el jti no está en el filtro la sesión no fue revocada y el
+refresh no hace ninguna consulta; sólo un positivo (real o falso) se
+confirma en la tabla.
+
+Una tarea en segundo plano sincroniza las revocaciones hechas por otros
+workers, purga en bloque las sesiones expiradas y reconstruye el filtro.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.auditoria import SesionUsuario
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray con hashes derivados de blake2b"""
+
+    def __init__(self, capacidad: int, tasa_error: float):
+        self.num_bits = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Doble hashing (Kirsch-Mitzenmacher)
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._posiciones(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.elementos += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(item))
+
+
+class SessionStore:
+    """
+    Sesiones de refresh token con revocación por jti
+    El filtro de Bloom es local al proceso: una revocación hecha en otro
+    worker se ve aquí tras el siguiente ciclo de sincronización
+    """
+
+    def __init__(
+        self,
+        capacidad_bloom: int = settings.SESSION_BLOOM_CAPACITY,
+        tasa_error_bloom: float = settings.SESSION_BLOOM_ERROR_RATE,
+        intervalo_sync: float = settings.SESSION_SYNC_INTERVAL_SECONDS,
+        intervalo_purga: float = settings.SESSION_PURGE_INTERVAL_SECONDS
+    ):
+        self.capacidad_bloom = capacidad_bloom
+        self.tasa_error_bloom = tasa_error_bloom
+        self.intervalo_sync = intervalo_sync
+        self.intervalo_purga = intervalo_purga
+
+        self.bloom = BloomFilter(capacidad_bloom, tasa_error_bloom)
+        self._ultimo_sync: Optional[datetime] = None
+        self._ultima_purga = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        # Contadores
+        self.creadas = 0
+        self.revocadas = 0
+        self.verificaciones = 0
+        self.consultas_bd = 0
+        self.falsos_positivos = 0
+        self.purgadas = 0
+
+    # ==================== OPERACIONES ====================
+
+    def crear(self, db: Session, usuario_id: int) -> Tuple[str, datetime]:
+        """Registra una sesión nueva (el commit lo hace quien llama)"""
+        jti = uuid.uuid4().hex
+        expira_en = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        db.add(SesionUsuario(jti=jti, usuario_id=usuario_id, expira_en=expira_en))
+        self.creadas += 1
+        return jti, expira_en
+
+    def revocar(self, db: Session, jti: str) -> bool:
+        """Revoca una sesión por jti (el commit lo hace quien llama)"""
+        resultado = db.execute(
+            update(SesionUsuario)
+            .where(SesionUsuario.jti == jti, SesionUsuario.revocada.is_(False))
+            .values(revocada=True, revocada_en=datetime.utcnow())
+        )
+        self.bloom.add(jti)
+        if resultado.rowcount:
+            self.revocadas += 1
+        return bool(resultado.rowcount)
+
+    def revocar_usuario(self, db: Session, usuario_id: int) -> int:
+        """Revoca todas las sesiones vigentes de un usuario"""
+        jtis = db.execute(
+            select(SesionUsuario.jti).where(
+                SesionUsuario.usuario_id == usuario_id,
+                SesionUsuario.revocada.is_(False)
+            )
+        ).scalars().all()
+        if jtis:
+            db.execute(
+                update(SesionUsuario)
+                .where(SesionUsuario.jti.in_(jtis))
+                .values(revocada=True, revocada_en=datetime.utcnow())
+            )
+            for jti in jtis:
+                self.bloom.add(jti)
+            self.revocadas += len(jtis)
+        return len(jtis)
+
+    def esta_revocada(self, db: Session, jti: str) -> bool:
+        """
+        Consulta el filtro y sólo ante un positivo confirma en la BD.
+        Una sesión ya purgada (expirada) cuenta como revocada.
+        """
+        self.verificaciones += 1
+        if jti not in self.bloom:
+            return False
+
+        self.consultas_bd += 1
+        revocada = db.execute(
+            select(SesionUsuario.revocada).where(SesionUsuario.jti == jti)
+        ).scalar()
+        if revocada is False:
+            self.falsos_positivos += 1
+            return False
+        return True
+
+    # ==================== MANTENIMIENTO ====================
+
+    def _agregar(self, jtis: Iterable[str], bloom: Optional[BloomFilter] = None) -> int:
+        bloom = bloom or self.bloom
+        total = 0
+        for jti in jtis:
+            bloom.add(jti)
+            total += 1
+        return total
+
+    def sincronizar(self, db: Session) -> int:
+        """Agrega al filtro las revocaciones recientes de todos los workers"""
+        ahora = datetime.utcnow()
+        consulta = select(SesionUsuario.jti).where(SesionUsuario.revocada.is_(True))
+        if self._ultimo_sync is not None:
+            # Margen para transacciones que confirmaron tarde
+            consulta = consulta.where(
+                SesionUsuario.revocada_en >= self._ultimo_sync - timedelta(seconds=self.intervalo_sync * 2)
+            )
+        total = self._agregar(db.execute(consulta).scalars())
+        self._ultimo_sync = ahora
+        return total
+
+    def purgar(self, db: Session) -> int:
+        """Elimina en bloque las sesiones expiradas y reconstruye el filtro"""
+        ahora = datetime.utcnow()
+        resultado = db.execute(
+            delete(SesionUsuario).where(SesionUsuario.expira_en < ahora)
+        )
+        db.commit()
+        self.purgadas += resultado.rowcount or 0
+
+        # Filtro nuevo con las revocadas vigentes; se reemplaza de una vez
+        nuevo = BloomFilter(self.capacidad_bloom, self.tasa_error_bloom)
+        self._agregar(
+            db.execute(
+                select(SesionUsuario.jti).where(SesionUsuario.revocada.is_(True))
+            ).scalars(),
+            nuevo
+        )
+        self.bloom = nuevo
+        # Revocaciones ocurridas mientras se construía el filtro nuevo
+        self._ultimo_sync = ahora
+        self.sincronizar(db)
+        return resultado.rowcount or 0
+
+    def _ciclo(self) -> None:
+        db = SessionLocal()
+        try:
+            if time.monotonic() - self._ultima_purga >= self.intervalo_purga:
+                purgadas = self.purgar(db)
+                self._ultima_purga = time.monotonic()
+                if purgadas:
+                    logger.info(f"Sesiones expiradas purgadas: {purgadas}")
+            else:
+                self.sincronizar(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Error en mantenimiento de sesiones: {e}")
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self._ciclo)
+            await asyncio.sleep(self.intervalo_sync)
+
+    def start(self) -> None:
+        """Arranca la tarea de mantenimiento (llamar dentro del event loop)"""
+        if self._task is None:
+            self._ultima_purga = 0.0
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "bloom_bits": self.bloom.num_bits,
+            "bloom_hashes": self.bloom.num_hashes,
+            "bloom_items": self.bloom.elementos,
+            "created": self.creadas,
+            "revoked": self.revocadas,
+            "checks": self.verificaciones,
+            "db_checks": self.consultas_bd,
+            "false_positives": self.falsos_positivos,
+            "purged": self.purgadas
+        }
+
+
+# Instancia global del almacén
+session_store = SessionStore()
@@ -0,0 +1,209 @@
+"""
+Perfilado de SQL por petición
+Eventos before/after_cursor_execute sobre el engine y un ContextVar con el
+perfil de la petición en curso (se propaga al threadpool de los endpoints
+síncronos). Por petición registra número de sentencias, tiempo total en BD,
+las más lentas y las formas repetidas (patrón N+1: la misma sentencia
+parametrizada ejecutada muchas veces). Además acumula un reporte por ruta.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_ESPACIOS = re.compile(r"\s+")
+# IN (%s, %s, ...) / IN (?, ?, ...) -> IN (?): la cantidad de elementos no cambia la forma
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:%s|\?|%\(\w+\)s)\s*,)+\s*(?:%s|\?|%\(\w+\)s)\s*\)")
+
+
+def forma_sentencia(sql: str) -> str:
+    """Forma normalizada de una sentencia (los valores ya van como parámetros)"""
+    return _LISTA_PARAMETROS.sub("(?)", _ESPACIOS.sub(" ", sql).strip())
+
+
+class PerfilConsultas:
+    """Sentencias ejecutadas durante una petición"""
+
+    __slots__ = ("sentencias", "segundos", "lentas", "formas")
+
+    def __init__(self):
+        self.sentencias = 0
+        self.segundos = 0.0
+        self.lentas: List[Tuple[float, str]] = []  # min-heap de (segundos, forma)
+        self.formas: Counter = Counter()
+
+    def registrar(self, forma: str, segundos: float, top: int) -> None:
+        self.sentencias += 1
+        self.segundos += segundos
+        self.formas[forma] += 1
+        if len(self.lentas) < top:
+            heapq.heappush(self.lentas, (segundos, forma))
+        elif segundos > self.lentas[0][0]:
+            heapq.heapreplace(self.lentas, (segundos, forma))
+
+    def repetidas(self, umbral: int) -> Dict[str, int]:
+        """Formas ejecutadas al menos `umbral` veces (sospechosas de N+1)"""
+        return {forma: n for forma, n in self.formas.items() if n >= umbral}
+
+    def resumen(self, umbral: int) -> dict:
+        return {
+            "sentencias": self.sentencias,
+            "ms": round(self.segundos * 1000, 2),
+            "lentas": [
+                {"ms": round(s * 1000, 2), "sql": forma}
+                for s, forma in sorted(self.lentas, reverse=True)
+            ],
+            "n_mas_1": self.repetidas(umbral),
+        }
+
+
+_perfil_actual: ContextVar[Optional[PerfilConsultas]] = ContextVar("perfil_sql", default=None)
+
+
+class SQLProfiler:
+    """
+    Instrumentación del engine y reporte agregado por ruta
+    - instalar(engine): registra los eventos (una vez por engine)
+    - iniciar()/finalizar(): delimitan el perfil de una petición
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.SQL_PROFILING_ENABLED,
+        top_lentas: int = settings.SQL_PROFILING_TOP_SLOW,
+        umbral_n_mas_1: int = settings.SQL_PROFILING_N1_THRESHOLD
+    ):
+        self.enabled = enabled
+        self.top_lentas = top_lentas
+        self.umbral_n_mas_1 = umbral_n_mas_1
+        self._lock = threading.Lock()
+        self._rutas: Dict[str, dict] = {}
+        self._lentas: List[Tuple[float, str, str]] = []  # min-heap global (segundos, ruta, forma)
+        self._formas: Dict[str, str] = {}  # sql -> forma (evita normalizar cada vez)
+        self.fuera_de_peticion = 0
+
+    # ==================== EVENTOS DEL ENGINE ====================
+
+    def instalar(self, engine: Engine) -> None:
+        if not self.enabled or event.contains(engine, "before_cursor_execute", self._antes):
+            return
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+        logger.info("Perfilado SQL activo")
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("perfil_sql_inicio", []).append(time.perf_counter())
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("perfil_sql_inicio")
+        if not inicios:
+            return
+        segundos = time.perf_counter() - inicios.pop()
+
+        perfil = _perfil_actual.get()
+        if perfil is None:
+            self.fuera_de_peticion += 1
+            return
+
+        forma = self._formas.get(statement)
+        if forma is None:
+            forma = forma_sentencia(statement)
+            if len(self._formas) < 10000:
+                self._formas[statement] = forma
+        perfil.registrar(forma, segundos, self.top_lentas)
+
+    # ==================== PETICIONES ====================
+
+    def iniciar(self) -> Tuple[PerfilConsultas, object]:
+        perfil = PerfilConsultas()
+        return perfil, _perfil_actual.set(perfil)
+
+    def finalizar(self, ruta: str, perfil: PerfilConsultas, token) -> None:
+        """Cierra el perfil y lo suma al reporte de la ruta"""
+        _perfil_actual.reset(token)
+        repetidas = perfil.repetidas(self.umbral_n_mas_1)
+        if repetidas:
+            logger.warning(
+                f"Posible N+1 en {ruta}: "
+                + "; ".join(f"{n}x {forma[:120]}" for forma, n in repetidas.items())
+            )
+
+        with self._lock:
+            agregado = self._rutas.get(ruta)
+            if agregado is None:
+                agregado = self._rutas[ruta] = {
+                    "peticiones": 0, "sentencias": 0, "max_sentencias": 0,
+                    "segundos": 0.0, "max_segundos": 0.0,
+                    "peticiones_n_mas_1": 0, "formas_n_mas_1": Counter(),
+                }
+            agregado["peticiones"] += 1
+            agregado["sentencias"] += perfil.sentencias
+            agregado["max_sentencias"] = max(agregado["max_sentencias"], perfil.sentencias)
+            agregado["segundos"] += perfil.segundos
+            agregado["max_segundos"] = max(agregado["max_segundos"], perfil.segundos)
+            if repetidas:
+                agregado["peticiones_n_mas_1"] += 1
+                agregado["formas_n_mas_1"].update(repetidas.keys())
+
+            for segundos, forma in perfil.lentas:
+                if len(self._lentas) < self.top_lentas:
+                    heapq.heappush(self._lentas, (segundos, ruta, forma))
+                elif segundos > self._lentas[0][0]:
+                    heapq.heapreplace(self._lentas, (segundos, ruta, forma))
+
+    # ==================== REPORTE ====================
+
+    def reporte(self) -> dict:
+        with self._lock:
+            rutas = {
+                ruta: {
+                    "peticiones": a["peticiones"],
+                    "sentencias_promedio": round(a["sentencias"] / a["peticiones"], 2),
+                    "max_sentencias": a["max_sentencias"],
+                    "ms_promedio": round(a["segundos"] * 1000 / a["peticiones"], 2),
+                    "max_ms": round(a["max_segundos"] * 1000, 2),
+                    "peticiones_n_mas_1": a["peticiones_n_mas_1"],
+                    "formas_n_mas_1": dict(a["formas_n_mas_1"].most_common(5)),
+                }
+                for ruta, a in sorted(self._rutas.items(), key=lambda r: -r[1]["segundos"])
+            }
+            lentas = [
+                {"ms": round(s * 1000, 2), "ruta": ruta, "sql": forma}
+                for s, ruta, forma in sorted(self._lentas, reverse=True)
+            ]
+        return {
+            "enabled": self.enabled,
+            "umbral_n_mas_1": self.umbral_n_mas_1,
+            "fuera_de_peticion": self.fuera_de_peticion,
+            "rutas": rutas,
+            "lentas": lentas,
+        }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._rutas.clear()
+            self._lentas.clear()
+            self.fuera_de_peticion = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rutas": len(self._rutas),
+                "peticiones": sum(a["peticiones"] for a in self._rutas.values()),
+                "peticiones_n_mas_1": sum(a["peticiones_n_mas_1"] for a in self._rutas.values()),
+            }
+
+
+# Instancia global
+sql_profiler = SQLProfiler()
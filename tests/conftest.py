@@ -0,0 +1,74 @@
+# tests/conftest.py
+"""
+Fixtures compartidas
+Cada módulo de pruebas declara en TABLAS los modelos que necesita; se crean
+en un SQLite de archivo temporal, compartido por los hilos de la app.
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Base, get_db
+from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def SessionTest(request, engine):
+    """Sessionmaker sobre las TABLAS del módulo de pruebas"""
+    Base.metadata.create_all(engine, tables=[m.__table__ for m in request.module.TABLAS])
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def datos_base(SessionTest):
+    """Persona 1 (Ana Gomez), profesional 1 (Luis Rojas) y unidad 1 (Sede Norte)"""
+    db = SessionTest()
+    db.add(PersonaAtendida(
+        tipo_documento="CEDULA", numero_documento="1000111222", nombres="Ana", apellidos="Gomez",
+        fecha_nacimiento=date(1990, 5, 15), sexo="FEMENINO", correo="ana@mail.com",
+        telefono="3001234567", direccion="Calle 10", contacto_emergencia="Juan"
+    ))
+    db.add(Profesional(
+        nombres="Luis", apellidos="Rojas", registro_profesional="RP-1", especialidad="Medicina General",
+        correo="luis@mail.com", telefono="3000000000"
+    ))
+    db.add(UnidadAtencion(nombre="Sede Norte", tipo="SEDE", direccion="Calle 1", telefono="6010000"))
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def crear_app(SessionTest):
+    """crear_app(*routers): FastAPI mínima con get_db apuntando al SQLite de la prueba"""
+    def override_get_db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _crear(*routers) -> FastAPI:
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router)
+        app.dependency_overrides[get_db] = override_get_db
+        return app
+
+    return _crear
@@ -0,0 +1,36 @@
+# tests/test_agenda_recurrencia.py
+from datetime import date, time
+
+import pytest
+from pydantic import ValidationError
+
+from routers.agenda import AgendaService
+from schemas.agenda import ReglaRecurrenciaAgenda
+
+
+def regla(**campos):
+    datos = dict(
+        profesional_ids=[1], unidad_id=1, fecha_inicio=date(2030, 1, 1), fecha_fin=date(2030, 1, 31),
+        hora_inicio=time(8, 0), hora_fin=time(12, 0), duracion_minutos=20
+    )
+    datos.update(campos)
+    return ReglaRecurrenciaAgenda(**datos)
+
+
+@pytest.mark.parametrize("campos", [
+    {},
+    {"duracion_minutos": None},
+    {"duracion_minutos": 45, "hora_fin": time(12, 10)},
+    {"dias_semana": [5, 6], "fecha_inicio": date(2030, 2, 27), "fecha_fin": date(2030, 3, 12)},
+    {"dias_semana": [2], "fecha_fin": date(2030, 1, 1)},
+    {"fecha_fin": date(2030, 12, 31), "dias_semana": [0, 1, 2, 3, 4, 5, 6]},
+])
+def test_contar_bloques_coincide_con_la_expansion(campos):
+    r = regla(**campos)
+    assert AgendaService.contar_bloques(r) == len(AgendaService.expandir_regla(r))
+
+
+def test_regla_rechaza_rangos_de_mas_de_un_anio():
+    assert regla(fecha_inicio=date(2032, 1, 1), fecha_fin=date(2032, 12, 31))
+    with pytest.raises(ValidationError, match="366"):
+        regla(fecha_inicio=date(2025, 1, 1), fecha_fin=date(9999, 12, 31), duracion_minutos=5)
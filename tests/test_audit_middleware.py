@@ -0,0 +1,28 @@
+# tests/test_audit_middleware.py
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+import middleware.audit as audit
+from middleware.audit import AuditASGIMiddleware, AuditMiddleware
+
+RUTAS = ["/health", "/health/ready", "/metrics", "/healthz", "/recursos"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("middleware_cls", [AuditMiddleware, AuditASGIMiddleware])
+async def test_sondas_no_se_auditan(monkeypatch, middleware_cls):
+    """Ambos middlewares omiten /health, /metrics y sus subrutas, y solo esas."""
+    registradas = []
+    monkeypatch.setattr(audit.audit_writer, "enqueue", registradas.append)
+
+    app = FastAPI()
+    app.add_middleware(middleware_cls)
+    for ruta in RUTAS:
+        app.add_api_route(ruta, lambda: {"status": "ok"})
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for ruta in RUTAS:
+            assert (await ac.get(ruta)).status_code == 200
+
+    assert [r["recurso"] for r in registradas] == ["/healthz", "/recursos"]
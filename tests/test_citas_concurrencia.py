@@ -0,0 +1,157 @@
+# tests/test_citas_concurrencia.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from anyio import to_thread
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from dependencies import get_current_user
+from models.agenda_citas import BloqueAgenda, Cita, HistorialCita, EstadoCitaEnum
+from models.auditoria import Usuario
+from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
+from models.notificaciones import Notificacion
+from routers.citas import router
+from services.availability_index import AvailabilityIndex
+
+TABLAS = (Usuario, PersonaAtendida, Profesional, UnidadAtencion, BloqueAgenda, Cita, HistorialCita, Notificacion)
+SOLICITUDES = 300
+CAPACIDAD = 7
+
+
+@pytest.fixture
+def engine(engine):
+    """
+    SQLite ignora FOR UPDATE: BEGIN IMMEDIATE toma el bloqueo de escritura al
+    iniciar cada transacción y serializa las reservas como el bloqueo de fila
+    """
+    @event.listens_for(engine, "connect")
+    def _sin_begin_implicito(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+@pytest.fixture
+def entorno(SessionTest, datos_base, crear_app):
+    """App mínima con el router de citas y un bloque de 4 horas con capacidad CAPACIDAD"""
+    db = SessionTest()
+    inicio = datetime(2030, 1, 15, 8, 0)
+    db.add(BloqueAgenda(profesional_id=1, unidad_id=1, inicio=inicio, fin=inicio + timedelta(hours=4), capacidad=CAPACIDAD))
+    db.commit()
+    db.close()
+
+    app = crear_app(router)
+    app.dependency_overrides[get_current_user] = lambda: {"usuario_id": None, "username": "test"}
+
+    return app, SessionTest, inicio
+
+
+@pytest.mark.asyncio
+async def test_reservas_concurrentes_no_exceden_capacidad(entorno):
+    """Cientos de POST /citas/ simultáneos contra un bloque: nunca más citas que capacidad."""
+    app, SessionTest, inicio = entorno
+    params = {
+        "persona_id": 1, "profesional_id": 1, "unidad_id": 1, "bloque_agenda_id": 1,
+        "inicio": (inicio + timedelta(minutes=30)).isoformat(),
+        "fin": (inicio + timedelta(minutes=50)).isoformat(),
+        "motivo": "Control"
+    }
+
+    # Con la escritura serializada, la petición que tiene el bloqueo necesita
+    # un hilo libre para terminar: un hilo por solicitud evita el interbloqueo
+    to_thread.current_default_thread_limiter().total_tokens = SOLICITUDES
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        respuestas = await asyncio.gather(*[ac.post("/citas/", params=params) for _ in range(SOLICITUDES)])
+
+    codigos = [r.status_code for r in respuestas]
+    assert codigos.count(201) == CAPACIDAD
+    assert all(c in (201, 400, 409) for c in codigos)
+
+    db = SessionTest()
+    assert db.query(Cita).filter(Cita.bloque_agenda_id == 1).count() == CAPACIDAD
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelar_libera_cupo(entorno):
+    """Cancelar una cita devuelve el cupo al bloque."""
+    app, SessionTest, inicio = entorno
+    params = {
+        "persona_id": 1, "profesional_id": 1, "unidad_id": 1, "bloque_agenda_id": 1,
+        "inicio": inicio.isoformat(), "fin": (inicio + timedelta(minutes=20)).isoformat(),
+        "motivo": "Control"
+    }
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for _ in range(CAPACIDAD):
+            assert (await ac.post("/citas/", params=params)).status_code == 201
+        lleno = await ac.post("/citas/", params=params)
+        assert lleno.status_code == 400
+
+        cancelada = await ac.patch("/citas/1/cancelar", params={"motivo": "Viaje"})
+        assert cancelada.status_code == 200
+        assert (await ac.post("/citas/", params=params)).status_code == 201
+
+    db = SessionTest()
+    assert db.query(Cita).filter(Cita.estado != EstadoCitaEnum.CANCELADA).count() == CAPACIDAD
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_capacidad_cuenta_citas_simultaneas(entorno):
+    """Capacidad 1 en un bloque de 4 horas admite citas consecutivas, no solapadas."""
+    app, SessionTest, inicio = entorno
+    db = SessionTest()
+    db.add(BloqueAgenda(profesional_id=1, unidad_id=1, inicio=inicio, fin=inicio + timedelta(hours=4), capacidad=1))
+    db.commit()
+    db.close()
+
+    def params(desde: datetime, minutos: int = 20) -> dict:
+        return {
+            "persona_id": 1, "profesional_id": 1, "unidad_id": 1, "bloque_agenda_id": 2,
+            "inicio": desde.isoformat(), "fin": (desde + timedelta(minutes=minutos)).isoformat(),
+            "motivo": "Control"
+        }
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for i in range(12):
+            assert (await ac.post("/citas/", params=params(inicio + timedelta(minutes=20 * i)))).status_code == 201
+        solapada = await ac.post("/citas/", params=params(inicio + timedelta(minutes=10)))
+        assert solapada.status_code == 400
+
+    db = SessionTest()
+    assert db.query(Cita).filter(Cita.bloque_agenda_id == 2).count() == 12
+    db.close()
+
+
+def test_indice_disponibilidad_usa_citas_simultaneas(entorno):
+    """Un bloque de capacidad 1 con una cita sigue ofreciendo sus tramos libres."""
+    _, SessionTest, inicio = entorno
+    db = SessionTest()
+    db.add(BloqueAgenda(
+        profesional_id=1, unidad_id=1, inicio=inicio + timedelta(days=1),
+        fin=inicio + timedelta(days=1, hours=1), capacidad=1
+    ))
+    db.flush()
+    db.add(Cita(
+        persona_id=1, profesional_id=1, unidad_id=1, bloque_agenda_id=2,
+        inicio=inicio + timedelta(days=1), fin=inicio + timedelta(days=1, minutes=20),
+        motivo="Control", estado=EstadoCitaEnum.CONFIRMADA
+    ))
+    db.commit()
+
+    indice = AvailabilityIndex(ttl_seconds=60, horizonte_dias=36500)
+    libres = indice.buscar(
+        db, desde=inicio + timedelta(days=1), hasta=inicio + timedelta(days=2), profesional_id=1
+    )
+    db.close()
+    assert [(l["bloque_agenda_id"], l["inicio"], l["fin"]) for l in libres] == [
+        (2, inicio + timedelta(days=1, minutes=20), inicio + timedelta(days=1, hours=1))
+    ]
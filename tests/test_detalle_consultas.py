@@ -0,0 +1,83 @@
+# tests/test_detalle_consultas.py
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from models.agenda_citas import BloqueAgenda, Cita
+from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
+from models.ordenes import Orden
+from models.registro_clinico import Diagnostico, EpisodioAtencion, NotaClinica
+from routers.episodios import router_episodios
+from routers.personas import router as router_personas
+from routers.profesionales import router as router_profesionales
+
+TABLAS = (
+    PersonaAtendida, Profesional, UnidadAtencion, BloqueAgenda, Cita,
+    EpisodioAtencion, NotaClinica, Diagnostico, Orden
+)
+MAX_CONSULTAS = 2
+
+
+@pytest.fixture(params=[1, 40], ids=["historial_corto", "historial_largo"])
+def entorno(request, engine, SessionTest, datos_base, crear_app):
+    """App con los routers de detalle y una persona/profesional/episodio con `n` registros de historial"""
+    n = request.param
+    db = SessionTest()
+    db.add(EpisodioAtencion(persona_id=1, fecha_apertura=datetime(2030, 1, 1), motivo="Control", tipo="CONSULTA"))
+    inicio = datetime(2030, 1, 15, 8, 0)
+    for i in range(n):
+        hora = inicio + timedelta(hours=i)
+        db.add(BloqueAgenda(profesional_id=1, unidad_id=1, inicio=hora, fin=hora + timedelta(minutes=50)))
+        db.add(Cita(
+            persona_id=1, profesional_id=1, unidad_id=1, inicio=hora,
+            fin=hora + timedelta(minutes=20), motivo="Control"
+        ))
+        db.add(EpisodioAtencion(persona_id=1, fecha_apertura=hora, motivo="Control", tipo="CONSULTA"))
+        db.add(NotaClinica(episodio_id=1, profesional_id=1, fecha=hora, subjetivo="Sin novedad"))
+        db.add(Diagnostico(episodio_id=1, codigo="Z00.0", descripcion="Control general", tipo="PRESUNTIVO"))
+        db.add(Orden(episodio_id=1, tipo="LABORATORIO", fecha_emision=hora))
+    db.commit()
+    db.close()
+
+    consultas = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: consultas.append(sql))
+
+    app = crear_app(router_personas, router_profesionales, router_episodios)
+    return TestClient(app), consultas, n
+
+
+def _get(cliente, consultas, url):
+    consultas.clear()
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    return respuesta.json()["data"], len(consultas)
+
+
+def test_detalle_persona_consultas_acotadas(entorno):
+    """obtener_persona no carga citas ni episodios para contarlos."""
+    cliente, consultas, n = entorno
+    data, total = _get(cliente, consultas, "/personas/1")
+    assert data["total_citas"] == n
+    assert data["total_episodios"] == n + 1
+    assert total <= MAX_CONSULTAS
+
+
+def test_detalle_profesional_consultas_acotadas(entorno):
+    """obtener_profesional no carga bloques ni citas para contarlos."""
+    cliente, consultas, n = entorno
+    data, total = _get(cliente, consultas, "/profesionales/1")
+    assert data["total_bloques_agenda"] == n
+    assert data["total_citas"] == n
+    assert total <= MAX_CONSULTAS
+
+
+def test_detalle_episodio_consultas_acotadas(entorno):
+    """obtener_episodio no carga notas, diagnósticos ni órdenes para contarlos."""
+    cliente, consultas, n = entorno
+    data, total = _get(cliente, consultas, "/episodios/1")
+    assert data["total_notas"] == n
+    assert data["total_diagnosticos"] == n
+    assert data["total_ordenes"] == n
+    assert total <= MAX_CONSULTAS
@@ -0,0 +1,50 @@
+# tests/test_health.py
+import threading
+
+import pytest
+
+from services.health import HealthChecker
+
+
+class EngineColgado:
+    """connect() queda bloqueado hasta liberar(); luego falla como una BD caída"""
+
+    class pool:
+        @staticmethod
+        def checkedout():
+            return 0
+
+        @staticmethod
+        def size():
+            return 10
+
+    def __init__(self):
+        self._liberada = threading.Event()
+        self.conexiones = 0
+
+    def connect(self):
+        self.conexiones += 1
+        self._liberada.wait(5)
+        raise ConnectionError("BD no responde")
+
+    def liberar(self):
+        self._liberada.set()
+
+
+@pytest.mark.asyncio
+async def test_bd_colgada_no_acumula_hilos():
+    """Tras un timeout no se lanza otro SELECT 1 mientras el anterior siga bloqueado."""
+    engine = EngineColgado()
+    checker = HealthChecker(engine, cache_seconds=0, timeout_seconds=0.1)
+
+    motivos = [(await checker.listo())["motivos"] for _ in range(5)]
+
+    assert motivos[0] == ["SELECT 1 sin respuesta en 0.1 s"]
+    assert all(m == ["SELECT 1 anterior aún sin respuesta"] for m in motivos[1:])
+    assert engine.conexiones == 1
+    assert sum(t.name == "health-db" for t in threading.enumerate()) == 1
+
+    engine.liberar()
+    checker._consulta.exception(timeout=1)
+    assert (await checker.listo())["motivos"] == ["BD no disponible: ConnectionError"]
+    assert engine.conexiones == 2
@@ -0,0 +1,44 @@
+# tests/test_migrar_notificaciones.py
+from sqlalchemy import inspect, text
+
+from models.notificaciones import Notificacion
+from scripts.migrar_notificaciones import migrar
+
+TABLAS = (Notificacion,)
+
+# Tabla notificaciones tal como la creaba create_all antes de los reintentos
+TABLA_ANTERIOR = """
+CREATE TABLE notificaciones (
+    tipo VARCHAR(8) NOT NULL, destinatario VARCHAR(255) NOT NULL, plantilla VARCHAR(21),
+    asunto VARCHAR(255), mensaje TEXT NOT NULL, payload JSON, estado VARCHAR(10) NOT NULL,
+    intentos INTEGER NOT NULL, max_intentos INTEGER NOT NULL, fecha_programada DATETIME,
+    fecha_enviado DATETIME, fecha_entregado DATETIME, proveedor_id VARCHAR(255), error_mensaje TEXT,
+    id INTEGER NOT NULL PRIMARY KEY, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, is_active BOOLEAN NOT NULL
+)
+"""
+
+
+def test_migrar_respeta_tabla_creada_por_create_all(SessionTest, engine):
+    assert migrar(engine) == []
+
+
+def test_migrar_agrega_columnas_e_indices_una_sola_vez(engine):
+    with engine.begin() as conn:
+        conn.execute(text(TABLA_ANTERIOR))
+        conn.execute(text(
+            "INSERT INTO notificaciones (tipo, destinatario, mensaje, estado, intentos, max_intentos, is_active) "
+            "VALUES ('EMAIL', 'ana@mail.com', 'hola', 'ERROR', 1, 3, 1)"
+        ))
+
+    ejecutadas = migrar(engine)
+    assert len(ejecutadas) == 4
+    assert migrar(engine) == []
+
+    insp = inspect(engine)
+    assert "fecha_proximo_intento" in {c["name"] for c in insp.get_columns("notificaciones")}
+    assert "ix_notificaciones_estado_proximo_intento" in {i["name"] for i in insp.get_indexes("notificaciones")}
+    unicos = {i["name"]: i["column_names"] for i in insp.get_indexes("notificaciones") if i["unique"]}
+    assert unicos["uq_notificaciones_clave_idempotencia"] == ["clave_idempotencia"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT estado, fecha_proximo_intento FROM notificaciones")).all() == [("ERROR", None)]
@@ -0,0 +1,161 @@
+# tests/test_notificaciones_lote.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from models.notificaciones import Notificacion, EstadoNotificacionEnum, TipoNotificacionEnum
+from services.notification_service import LIMITE_SUSTITUCIONES, NotificationService, PoliticaReintentos
+
+TABLAS = (Notificacion,)
+
+
+class SendGridFalso:
+    """Cliente que responde X-Message-Id y falla en las llamadas indicadas (1 = la primera)"""
+
+    def __init__(self, fallar_en=()):
+        self.fallar_en = set(fallar_en)
+        self.llamadas = []
+
+    def send(self, mensaje):
+        self.llamadas.append(mensaje)
+        if len(self.llamadas) in self.fallar_en:
+            raise RuntimeError(f"HTTP 503 en la llamada {len(self.llamadas)}")
+        return SimpleNamespace(headers={"X-Message-Id": f"msg-{len(self.llamadas)}"})
+
+
+@pytest.fixture
+def servicio():
+    service = NotificationService()
+    service.sg_client = SendGridFalso()
+    service.reintentos = PoliticaReintentos(base_seconds=30, max_seconds=3600, jitter=0.5)
+    return service
+
+
+def crear(SessionTest, mensajes, **campos):
+    """Inserta un email PENDIENTE por mensaje y retorna sus ids"""
+    db = SessionTest()
+    filas = [
+        Notificacion(
+            tipo=TipoNotificacionEnum.EMAIL, destinatario=f"paciente{i}@mail.com", asunto="Aviso",
+            mensaje=mensaje, estado=EstadoNotificacionEnum.PENDIENTE, **campos
+        )
+        for i, mensaje in enumerate(mensajes)
+    ]
+    db.add_all(filas)
+    db.commit()
+    ids = [n.id for n in filas]
+    db.close()
+    return ids
+
+
+def enviar(SessionTest, servicio, ids):
+    db = SessionTest()
+    resultado = servicio.enviar_lote(db, db.query(Notificacion).filter(Notificacion.id.in_(ids)).order_by(Notificacion.id).all())
+    db.commit()
+    db.close()
+    db = SessionTest()
+    filas = {n.id: n for n in db.query(Notificacion).filter(Notificacion.id.in_(ids)).all()}
+    db.close()
+    return resultado, filas
+
+
+def test_mensajes_grandes_se_envian_y_registran_uno_a_uno(SessionTest, servicio):
+    """Un fallo al enviar un mensaje grande no marca ERROR a los ya entregados ni al resto del bloque."""
+    grande = "<p>" + "x" * LIMITE_SUSTITUCIONES + "</p>"
+    grandes = crear(SessionTest, [grande] * 4)
+    normales = crear(SessionTest, ["<p>hola</p>"] * 2)
+    servicio.sg_client.fallar_en = {3}
+
+    resultado, filas = enviar(SessionTest, servicio, grandes + normales)
+
+    assert resultado == {"enviadas": 5, "fallidas": 1}
+    # 4 envíos individuales + 1 petición con las 2 personalizations
+    assert len(servicio.sg_client.llamadas) == 5
+    assert [filas[i].estado for i in grandes] == [
+        EstadoNotificacionEnum.ENVIADO, EstadoNotificacionEnum.ENVIADO,
+        EstadoNotificacionEnum.ERROR, EstadoNotificacionEnum.ENVIADO
+    ]
+    assert [filas[i].proveedor_id for i in grandes] == ["msg-1", "msg-2", None, "msg-4"]
+    assert "llamada 3" in filas[grandes[2]].error_mensaje
+    assert all(filas[i].estado == EstadoNotificacionEnum.ENVIADO and filas[i].proveedor_id == "msg-5" for i in normales)
+    assert all(n.intentos == 1 for n in filas.values())
+
+
+def test_lote_mixto_actualiza_cada_columna(SessionTest, servicio):
+    """Un solo UPDATE deja enviadas, fallidas (con backoff) y agotadas (DESCARTADO) con sus columnas correctas."""
+    servicio.max_personalizaciones = 2
+    servicio.sg_client.fallar_en = {2}
+    enviadas = crear(SessionTest, ["<p>a</p>", "<p>b</p>"])
+    fallida = crear(SessionTest, ["<p>c</p>"], proveedor_id="msg-anterior", intentos=0)[0]
+    agotada = crear(SessionTest, ["<p>d</p>"], intentos=2, max_intentos=3)[0]
+    sin_payload = crear(SessionTest, [None], plantilla="CONFIRMACION_CITA", payload={"nombre_paciente": "Ana"})[0]
+
+    antes = datetime.utcnow()
+    resultado, filas = enviar(SessionTest, servicio, enviadas + [fallida, agotada, sin_payload])
+    despues = datetime.utcnow()
+
+    assert resultado == {"enviadas": 2, "fallidas": 3}
+
+    for i in enviadas:
+        n = filas[i]
+        assert n.estado == EstadoNotificacionEnum.ENVIADO
+        assert n.intentos == 1
+        assert n.proveedor_id == "msg-1"
+        assert antes <= n.fecha_enviado <= despues
+        assert n.error_mensaje is None
+        assert n.fecha_proximo_intento is None
+
+    n = filas[fallida]
+    assert n.estado == EstadoNotificacionEnum.ERROR
+    assert n.intentos == 1
+    assert n.proveedor_id == "msg-anterior"
+    assert n.fecha_enviado is None
+    assert "llamada 2" in n.error_mensaje
+    # Primer fallo: base (30 s) reducida como mucho por el jitter (0.5)
+    assert antes + timedelta(seconds=15) <= n.fecha_proximo_intento <= despues + timedelta(seconds=30)
+
+    n = filas[agotada]
+    assert n.estado == EstadoNotificacionEnum.DESCARTADO
+    assert n.intentos == 3
+    assert n.fecha_proximo_intento is None
+    assert "llamada 2" in n.error_mensaje
+
+    n = filas[sin_payload]
+    assert n.estado == EstadoNotificacionEnum.ERROR
+    assert n.intentos == 1
+    assert "falta" in n.error_mensaje
+    assert n.fecha_proximo_intento is not None
+
+
+def test_reintento_exitoso_limpia_error(SessionTest, servicio):
+    """Sin fallos en el lote, la fila reintentada queda ENVIADO sin error ni próximo intento."""
+    reintento = crear(
+        SessionTest, ["<p>a</p>"], intentos=1, error_mensaje="HTTP 503",
+        fecha_proximo_intento=datetime(2030, 1, 1)
+    )[0]
+
+    resultado, filas = enviar(SessionTest, servicio, [reintento])
+
+    n = filas[reintento]
+    assert resultado == {"enviadas": 1, "fallidas": 0}
+    assert n.estado == EstadoNotificacionEnum.ENVIADO
+    assert n.intentos == 2
+    assert n.proveedor_id == "msg-1"
+    assert n.error_mensaje is None
+    assert n.fecha_proximo_intento is None
+    assert n.fecha_enviado is not None
+
+
+def test_politica_reintentos_backoff_y_descarte():
+    """Espera exponencial con tope y jitter; al llegar a max_intentos pasa a DESCARTADO."""
+    politica = PoliticaReintentos(base_seconds=30, max_seconds=100, jitter=0.5)
+    assert all(15 <= politica.retraso(1) <= 30 for _ in range(50))
+    assert all(30 <= politica.retraso(2) <= 60 for _ in range(50))
+    assert all(50 <= politica.retraso(10) <= 100 for _ in range(50))
+
+    ahora = datetime(2030, 1, 1)
+    n = Notificacion(max_intentos=3)
+    estado, proximo = politica.estado_fallo(n, 2, ahora)
+    assert estado == EstadoNotificacionEnum.ERROR and proximo > ahora
+    assert politica.estado_fallo(n, 3, ahora) == (EstadoNotificacionEnum.DESCARTADO, None)
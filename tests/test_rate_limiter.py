@@ -0,0 +1,26 @@
+# tests/test_rate_limiter.py
+import sqlite3
+
+from services.rate_limiter import SQLiteRateLimitBackend, TokenBucket
+
+
+def test_sqlite_bloqueado_deja_pasar_y_cuenta_el_error(tmp_path):
+    """Si otro proceso retiene el archivo más allá del timeout la petición se permite."""
+    path = str(tmp_path / "rate_limit.db")
+    backend = SQLiteRateLimitBackend(TokenBucket(capacidad=1), path=path, timeout_seconds=0.05)
+    assert backend.consumir("ip:1").permitido
+    assert not backend.consumir("ip:1").permitido
+
+    otro = sqlite3.connect(path, isolation_level=None)
+    otro.execute("BEGIN IMMEDIATE")
+    try:
+        resultado = backend.consumir("ip:1")
+    finally:
+        otro.execute("ROLLBACK")
+        otro.close()
+
+    assert resultado.permitido
+    assert backend.stats()["errors"] == 1
+    # Liberado el archivo vuelve a limitar con el estado guardado
+    assert not backend.consumir("ip:1").permitido
+    assert backend.stats()["errors"] == 1
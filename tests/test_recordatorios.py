@@ -0,0 +1,100 @@
+# tests/test_recordatorios.py
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models.agenda_citas import BloqueAgenda, Cita, EstadoCitaEnum
+from models.identidades import PersonaAtendida, Profesional, UnidadAtencion
+from models.notificaciones import Notificacion
+from services.notification_service import NotificationService
+from services.reminder_scheduler import ReminderScheduler
+
+TABLAS = (PersonaAtendida, Profesional, UnidadAtencion, BloqueAgenda, Cita, Notificacion)
+AHORA = datetime(2030, 1, 15, 8, 0)
+
+
+@pytest.fixture
+def citas(SessionTest, datos_base):
+    """3 citas CONFIRMADA dentro de la ventana, una SOLICITADA y una fuera de la ventana"""
+    db = SessionTest()
+    for horas, estado in [(20, EstadoCitaEnum.CONFIRMADA), (24, EstadoCitaEnum.CONFIRMADA),
+                          (24.5, EstadoCitaEnum.CONFIRMADA), (22, EstadoCitaEnum.SOLICITADA),
+                          (48, EstadoCitaEnum.CONFIRMADA)]:
+        inicio = AHORA + timedelta(hours=horas)
+        db.add(Cita(
+            persona_id=1, profesional_id=1, unidad_id=1, inicio=inicio, fin=inicio + timedelta(minutes=20),
+            motivo="Control", estado=estado
+        ))
+    db.commit()
+    db.close()
+    return [1, 2, 3]
+
+
+def programador(SessionTest) -> ReminderScheduler:
+    return ReminderScheduler(session_factory=SessionTest, enabled=False, lead_hours=24, window_seconds=3600)
+
+
+def recordatorios(SessionTest) -> Counter:
+    db = SessionTest()
+    claves = Counter(c for (c,) in db.query(Notificacion.clave_idempotencia))
+    db.close()
+    return claves
+
+
+def test_dos_programadores_materializan_un_recordatorio_por_cita(SessionTest, citas):
+    a, b = programador(SessionTest), programador(SessionTest)
+
+    assert a.materializar(AHORA) == 3
+    assert b.materializar(AHORA) == 0
+    assert a.materializar(AHORA) == 0
+
+    esperadas = {NotificationService.clave_recordatorio(i): 1 for i in citas}
+    assert recordatorios(SessionTest) == esperadas
+    assert a.stats()["materialized"] == 3 and b.stats()["materialized"] == 0
+
+
+def test_insert_ignore_descarta_la_clave_insertada_por_otro(SessionTest, engine, citas):
+    """Otro programador inserta entre el SELECT y el INSERT: la clave única descarta las repetidas."""
+    a, b = programador(SessionTest), programador(SessionTest)
+
+    adelantados = []
+
+    def adelantar_otro(conn, cursor, sentencia, parametros, contexto, executemany):
+        # Solo el primer INSERT (el de b); el de a pasa sin interceptar
+        if sentencia.startswith("INSERT OR IGNORE") and not adelantados:
+            adelantados.append(None)
+            adelantados[0] = a.materializar(AHORA)
+
+    event.listen(engine, "before_cursor_execute", adelantar_otro)
+    try:
+        assert b.materializar(AHORA) == 0
+    finally:
+        event.remove(engine, "before_cursor_execute", adelantar_otro)
+
+    assert adelantados == [3]
+    assert recordatorios(SessionTest) == {NotificationService.clave_recordatorio(i): 1 for i in citas}
+
+
+def test_recordatorio_descartado_no_se_vuelve_a_crear(SessionTest, citas):
+    a, b = programador(SessionTest), programador(SessionTest)
+    assert a.materializar(AHORA) == 3
+
+    db = SessionTest()
+    db.get(Cita, 2).estado = EstadoCitaEnum.CANCELADA
+    NotificationService().descartar_recordatorio(db, 2)
+    db.commit()
+    db.close()
+
+    assert b.materializar(AHORA) == 0
+    assert b.cargar(AHORA + timedelta(hours=1)) == 2
+
+    db = SessionTest()
+    activos = {n.clave_idempotencia: n.is_active for n in db.query(Notificacion)}
+    db.close()
+    assert activos == {
+        NotificationService.clave_recordatorio(1): True,
+        NotificationService.clave_recordatorio(2): False,
+        NotificationService.clave_recordatorio(3): True,
+    }
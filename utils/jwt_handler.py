@@ -3,12 +3,18 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
+from utils.token_cache import TokenCache, decodificar_jwt
 import os
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "tu-clave-secreta-super-segura")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+JWT_CACHE_ENABLED = os.getenv("JWT_CACHE_ENABLED", "False").lower() == "true"
+JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+
+# Caché de tokens decodificados (opcional)
+_token_cache = TokenCache(JWT_CACHE_MAX_SIZE) if JWT_CACHE_ENABLED else None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea token de acceso"""
@@ -27,7 +33,7 @@ def create_refresh_token(data: dict):
 def decode_token(token: str) -> dict:
     """Decodifica y valida token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decodificar_jwt(token, SECRET_KEY, [ALGORITHM], _token_cache)
         return payload
     except JWTError:
         raise HTTPException(
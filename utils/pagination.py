@@ -0,0 +1,180 @@
+"""
+Utilidades de paginación
+- Por página (page/page_size + OFFSET): modo original, compatible
+- Por cursor (keyset/seek): ordena por (columna, id) y continúa desde la
+  última fila vista con un predicado indexable, sin OFFSET. El costo de
+  una página no depende de su profundidad.
+
+El total es opcional: exacto (COUNT), aproximado (estadísticas de la tabla
+o conteo acotado) o ninguno.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Date, DateTime, and_, func, or_, text
+from sqlalchemy.orm import Query, Session
+from config import settings
+from schemas.base import CursorPaginatedResponse, PaginatedResponse
+from utils.serializacion import RespuestaJSON, serializar_lista
+
+
+class ModoConteo(str, Enum):
+    """Cómo calcular el total de registros"""
+    EXACTO = "exacto"
+    APROXIMADO = "aproximado"
+    NINGUNO = "ninguno"
+
+
+# ==================== CURSORES ====================
+
+def codificar_cursor(clave: str, valores: Sequence[Any]) -> str:
+    """Cursor opaco: base64url de JSON con la clave del listado y los valores de orden"""
+    datos = {
+        "k": clave,
+        "v": [v.isoformat() if isinstance(v, (datetime, date)) else v for v in valores]
+    }
+    crudo = json.dumps(datos, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).rstrip(b"=").decode("ascii")
+
+
+def decodificar_cursor(cursor: str, clave: str, columnas: Sequence) -> List[Any]:
+    """Valida el cursor y convierte los valores al tipo de cada columna"""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        datos = json.loads(crudo)
+        valores = datos["v"]
+        if datos["k"] != clave or len(valores) != len(columnas):
+            raise ValueError("cursor de otro listado")
+        convertidos = []
+        for columna, valor in zip(columnas, valores):
+            if valor is not None and isinstance(columna.type, DateTime):
+                valor = datetime.fromisoformat(valor)
+            elif valor is not None and isinstance(columna.type, Date):
+                valor = date.fromisoformat(valor)
+            convertidos.append(valor)
+        return convertidos
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+def predicado_keyset(columnas: Sequence, valores: Sequence[Any], descendente: bool):
+    """
+    (c1, c2, ...) > (v1, v2, ...) expandido en OR/AND para que MySQL use el índice:
+    c1 > v1 OR (c1 = v1 AND c2 > v2) OR ...
+    """
+    condiciones = []
+    for i, (columna, valor) in enumerate(zip(columnas, valores)):
+        iguales = [c == v for c, v in zip(columnas[:i], valores[:i])]
+        siguiente = columna < valor if descendente else columna > valor
+        condiciones.append(and_(*iguales, siguiente))
+    return or_(*condiciones)
+
+
+# ==================== CONTEO ====================
+
+def contar(db: Session, query: Query, modo: ModoConteo) -> Tuple[Optional[int], bool]:
+    """
+    Retorna (total, es_aproximado)
+    - aproximado sin filtros: TABLE_ROWS de information_schema (MySQL)
+    - aproximado con filtros: COUNT sobre a lo sumo PAGINATION_COUNT_LIMIT filas
+    """
+    if modo == ModoConteo.NINGUNO:
+        return None, False
+
+    query = query.order_by(None)
+    if modo == ModoConteo.EXACTO:
+        return query.count(), False
+
+    entidad = query.column_descriptions[0]["entity"]
+    if query.whereclause is None and db.get_bind().dialect.name == "mysql":
+        estimado = db.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla"
+            ),
+            {"tabla": entidad.__tablename__}
+        ).scalar()
+        if estimado is not None:
+            return int(estimado), True
+
+    limite = settings.PAGINATION_COUNT_LIMIT
+    acotado = db.query(func.count()).select_from(query.limit(limite).subquery()).scalar()
+    return acotado, acotado >= limite
+
+
+# ==================== PAGINADORES ====================
+
+def paginar_por_pagina(
+    db: Session,
+    query: Query,
+    page: int,
+    page_size: int,
+    conteo: Optional[ModoConteo] = None,
+    serializar: Callable = serializar_lista
+) -> RespuestaJSON:
+    """
+    Paginación clásica por OFFSET (el conteo por defecto es exacto)
+    `serializar` recibe la lista de registros de la página
+    """
+    total, aproximado = contar(db, query, conteo or ModoConteo.EXACTO)
+    registros = query.offset((page - 1) * page_size).limit(page_size).all()
+
+    return RespuestaJSON(PaginatedResponse(
+        success=True,
+        data=serializar(registros),
+        total=total,
+        page=page,
+        page_size=page_size,
+        total_pages=(total + page_size - 1) // page_size if total is not None else None,
+        total_aproximado=aproximado
+    ))
+
+
+def paginar_por_cursor(
+    db: Session,
+    query: Query,
+    clave: str,
+    columnas: Sequence,
+    cursor: str,
+    page_size: int,
+    descendente: bool = False,
+    conteo: Optional[ModoConteo] = None,
+    serializar: Callable = serializar_lista
+) -> RespuestaJSON:
+    """
+    Paginación keyset sobre `columnas` (la última debe ser única, normalmente id)
+    cursor vacío = primera página; el conteo por defecto es ninguno
+    """
+    total, aproximado = contar(db, query, conteo or ModoConteo.NINGUNO)
+
+    if cursor:
+        valores = decodificar_cursor(cursor, clave, columnas)
+        query = query.filter(predicado_keyset(columnas, valores, descendente))
+
+    orden = [c.desc() if descendente else c.asc() for c in columnas]
+    registros = query.order_by(None).order_by(*orden).limit(page_size + 1).all()
+
+    hay_mas = len(registros) > page_size
+    registros = registros[:page_size]
+    siguiente = None
+    if hay_mas:
+        ultimo = registros[-1]
+        siguiente = codificar_cursor(clave, [getattr(ultimo, c.key) for c in columnas])
+
+    return RespuestaJSON(CursorPaginatedResponse(
+        success=True,
+        data=serializar(registros),
+        page_size=page_size,
+        next_cursor=siguiente,
+        has_more=hay_mas,
+        total=total,
+        total_aproximado=aproximado
+    ))
@@ -1,12 +1,10 @@
-"""Utilidad para hash de contraseñas usando bcrypt"""
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+"""Utilidad para hash de contraseñas usando bcrypt (en el pool de procesos)"""
+from services.password_pool import password_pool
 
 def hash_password(password: str) -> str:
     """Genera hash de contraseña"""
-    return pwd_context.hash(password)
+    return password_pool.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica contraseña contra hash"""
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return password_pool.verify(plain_password, hashed_password)
\ No newline at end of file
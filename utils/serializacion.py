@@ -0,0 +1,191 @@
+"""
+Serialización rápida de modelos a JSON
+- Un serializador por modelo, compilado una sola vez: nombres de columna,
+  un attrgetter con todos los atributos y codificadores solo para las
+  columnas que los necesitan (Enum, Numeric y, sin orjson, fechas)
+- Mismo formato que Pydantic en modo JSON (Decimal como texto, UTC con "Z"),
+  así las respuestas no cambian respecto a jsonable_encoder
+- Escritura directa a bytes con orjson si está instalado (json estándar si no)
+- RespuestaJSON evita el paso por jsonable_encoder de FastAPI
+- Proyecciones parciales (?fields=): serializador restringido a las columnas
+  pedidas y load_only para que la consulta tampoco traiga las demás
+"""
+import datetime
+import decimal
+import enum
+import json
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from sqlalchemy import Date, DateTime, Enum, Numeric, Time, inspect
+from sqlalchemy.orm import Query, load_only
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+# ==================== CODIFICADORES ====================
+
+def codificar_decimal(valor: decimal.Decimal) -> str:
+    """Igual que Pydantic en modo JSON: texto, sin perder precisión"""
+    return str(valor)
+
+
+def codificar_enum(valor):
+    return valor.value if isinstance(valor, enum.Enum) else valor
+
+
+def codificar_fecha(valor) -> str:
+    """ISO 8601 con "Z" para UTC, como Pydantic (y orjson con OPT_UTC_Z)"""
+    texto = valor.isoformat()
+    if texto.endswith("+00:00"):
+        return texto[:-6] + "Z"
+    return texto
+
+
+def _por_defecto(valor: Any):
+    """Tipos que ni orjson ni json conocen (valores fuera de columnas compiladas)"""
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return codificar_fecha(valor)
+    if isinstance(valor, decimal.Decimal):
+        return codificar_decimal(valor)
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if hasattr(valor, "model_dump"):
+        return valor.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def _codificador_columna(tipo) -> Optional[Callable]:
+    """Codificador para el tipo de la columna; None si el backend lo escribe directo"""
+    if isinstance(tipo, Enum):
+        return codificar_enum
+    if isinstance(tipo, Numeric) and getattr(tipo, "asdecimal", True):
+        return codificar_decimal
+    if orjson is None and isinstance(tipo, (DateTime, Date, Time)):
+        return codificar_fecha
+    return None
+
+
+def dumps(contenido: Any) -> bytes:
+    """JSON compacto en bytes (UTF-8, sin escapar no-ASCII)"""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(
+        contenido, default=_por_defecto, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# ==================== SERIALIZADORES POR MODELO ====================
+
+class SerializadorModelo:
+    """Accesores y codificadores precompilados de las columnas de un modelo"""
+
+    def __init__(self, modelo: Type, campos: Optional[Tuple[str, ...]] = None):
+        mapper = inspect(modelo)
+        columnas = [
+            c for c in modelo.__table__.columns
+            if mapper.get_property_by_column(c) is not None and (campos is None or c.name in campos)
+        ]
+        self.nombres: Tuple[str, ...] = tuple(c.name for c in columnas)
+        claves = [mapper.get_property_by_column(c).key for c in columnas]
+        self.atributos = tuple(getattr(modelo, clave) for clave in claves)
+        obtener = attrgetter(*claves)
+        # attrgetter con una sola clave retorna el valor, no una tupla
+        self.valores: Callable = obtener if len(claves) > 1 else (lambda obj: (obtener(obj),))
+        self.codificadores: Tuple[Tuple[int, Callable], ...] = tuple(
+            (i, codificador)
+            for i, c in enumerate(columnas)
+            if (codificador := _codificador_columna(c.type)) is not None
+        )
+
+    def a_dict(self, obj) -> Dict[str, Any]:
+        """Valores crudos de las columnas (equivalente al to_dict original)"""
+        return dict(zip(self.nombres, self.valores(obj)))
+
+    def a_json(self, obj) -> Dict[str, Any]:
+        """Valores listos para el backend JSON"""
+        valores = self.valores(obj)
+        if self.codificadores:
+            valores = list(valores)
+            for i, codificador in self.codificadores:
+                valor = valores[i]
+                if valor is not None:
+                    valores[i] = codificador(valor)
+        return dict(zip(self.nombres, valores))
+
+
+_serializadores: Dict[Tuple[Type, Optional[Tuple[str, ...]]], SerializadorModelo] = {}
+
+
+def serializador(modelo: Type, campos: Optional[Tuple[str, ...]] = None) -> SerializadorModelo:
+    """Serializador compilado del modelo o de una proyección (se construye en el primer uso)"""
+    clave = (modelo, campos)
+    compilado = _serializadores.get(clave)
+    if compilado is None:
+        compilado = _serializadores[clave] = SerializadorModelo(modelo, campos)
+    return compilado
+
+
+def serializar(obj) -> Dict[str, Any]:
+    """Un registro ORM a dict listo para JSON"""
+    return serializador(type(obj)).a_json(obj)
+
+
+def serializar_lista(registros: Iterable, campos: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+    """Registros del mismo modelo a dicts listos para JSON (solo `campos` si se indican)"""
+    registros = list(registros)
+    if not registros:
+        return []
+    a_json = serializador(type(registros[0]), campos).a_json
+    return [a_json(r) for r in registros]
+
+
+# ==================== PROYECCIONES (?fields=) ====================
+
+def parsear_campos(modelo: Type, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    "id,nombres,apellidos" -> tupla canónica (orden de la tabla) o None = todos
+    id siempre se incluye; un campo desconocido es un 400
+    """
+    if fields is None or not fields.strip():
+        return None
+    pedidos = {f.strip() for f in fields.split(",") if f.strip()}
+    disponibles = serializador(modelo).nombres
+    desconocidos = sorted(pedidos - set(disponibles))
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(disponibles)}"
+        )
+    pedidos.add("id")
+    return tuple(n for n in disponibles if n in pedidos)
+
+
+def proyectar(query: Query, modelo: Type, campos: Optional[Tuple[str, ...]], *extra) -> Query:
+    """
+    Restringe el SELECT a las columnas de la proyección
+    `extra`: atributos que se cargan sin serializarse (p. ej. la clave del cursor)
+    """
+    if campos is None:
+        return query
+    return query.options(load_only(*serializador(modelo, campos).atributos, *extra))
+
+
+# ==================== RESPUESTA ====================
+
+class RespuestaJSON(Response):
+    """
+    JSONResponse sin jsonable_encoder: acepta dicts, listas o schemas de
+    Pydantic (se vuelcan con model_dump) y escribe bytes con dumps()
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if hasattr(content, "model_dump"):
+            content = content.model_dump()
+        return dumps(content)
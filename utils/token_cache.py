@@ -0,0 +1,99 @@
+"""
+Caché de JWT decodificados
+LRU acotada indexada por el SHA-256 del token: evita verificar la firma
+HMAC y parsear los claims cada vez que el front-end reenvía el mismo
+token. Cada acierto compara `exp` con el reloj, así que nunca se sirve
+un token expirado.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from jose import jwt
+
+
+class TokenCache:
+    """LRU de payloads JWT válidos hasta su exp"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def _clave(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        clave = self._clave(token)
+        with self._lock:
+            item = self._data.get(clave)
+            if item is None:
+                self.misses += 1
+                return None
+            exp, payload = item
+            if time.time() >= exp:
+                del self._data[clave]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(clave)
+            self.hits += 1
+        # Copia: quien llama puede modificar el dict
+        return dict(payload)
+
+    def set(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            # Sin exp no hay forma segura de saber cuándo descartarlo
+            return
+        clave = self._clave(token)
+        with self._lock:
+            self._data[clave] = (exp, dict(payload))
+            self._data.move_to_end(clave)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def decodificar_jwt(
+    token: str,
+    secret_key: str,
+    algorithms: List[str],
+    cache: Optional[TokenCache] = None
+) -> dict:
+    """
+    Decodifica y valida el token, usando la caché si está habilitada
+    Lanza JWTError igual que jose.jwt.decode
+    """
+    if cache is not None:
+        payload = cache.get(token)
+        if payload is not None:
+            return payload
+
+    payload = jwt.decode(token, secret_key, algorithms=algorithms)
+
+    if cache is not None:
+        cache.set(token, payload)
+    return payload